@@ -1,8 +1,15 @@
 import streamlit as st
+from pm_os import jobs
 from pm_os.config import settings
 from pm_os.db import init_db
 from pm_os.mock_data import seed_from_csv
-import os
+from pm_os.services.search import search
+from pm_os.services.near_duplicates import library_version
+from pm_os.services.vectors import SEARCH_KINDS, semantic_search, vector_index
+from pm_os.singleflight import singleflight_stats
+from pm_os.telemetry import usage_summary
+from pm_os.ui.jobs import poll_job, submit_job
+from pm_os.ui.session import render_session_memory
 from dotenv import load_dotenv
 
 load_dotenv(".env")
@@ -17,8 +24,7 @@ st.set_page_config(
 @st.cache_resource
 def bootstrap():
     init_db()
-    if not os.path.exists(settings.db_path) or os.path.getsize(settings.db_path) < 5_000:
-        seed_from_csv()
+    seed_from_csv()
 
 bootstrap()
 
@@ -39,6 +45,8 @@ with st.sidebar:
     st.page_link("pages/5_Deal_Room.py", label="Deal Detective", icon="📁")
     st.markdown("---")
 
+render_session_memory()
+
 st.title(f"{settings.firm_name}")
 st.subheader("Accelerate deal flow, origination, and portfolio monitoring")
 
@@ -95,5 +103,107 @@ with tab3:
         st.switch_page("pages/3_Inbox_Agent.py")
 
 st.markdown("---")
-st.caption(f"{settings.firm_name} | Private Markets OS v1.0 MVP")
 
+st.subheader("Quick Search")
+search_query = st.text_input("Search documents, inbox and market intel", placeholder="e.g. minimum liquidity", key="quick_search")
+search_mode = st.radio("Match", ["Keywords", "Meaning"], horizontal=True, key="quick_search_mode",
+                       help="Meaning finds related wording (e.g. \"leverage test\" and \"Debt to EBITDA\") using the local vector index.")
+
+if search_query:
+    hits = None
+    if search_mode == "Meaning":
+        # The index is built and kept current by a background job, one per library version.
+        version = {"version": library_version(SEARCH_KINDS)}
+        if vector_index.count:
+            jobs.submit("vectors.update", version)
+            hits = semantic_search(search_query, limit=15)
+        else:
+            submit_job("vector_index", "vectors.update", version)
+            poll_job("vector_index", label="Building the semantic index")
+            st.caption("Showing keyword matches until the semantic index is ready.")
+    if hits is None:
+        hits = search(search_query, limit=15)
+    if hits:
+        st.caption(f"{len(hits)} result(s)")
+        for hit in hits:
+            with st.container(border=True):
+                label = {"document": "📄 Document", "email": "✉️ Email", "snippet": "📰 Market Intel"}[hit["kind"]]
+                date_note = f" • {hit['date']:%Y-%m-%d}" if hit["date"] else ""
+                st.markdown(f"**{label}: {hit['title']}**{date_note}")
+                st.markdown(hit["snippet"].replace("$", r"\$"))
+    else:
+        st.info("No matches found.")
+
+st.markdown("---")
+
+with st.expander("LLM usage"):
+    window = st.selectbox("Window", ["Last 24 hours", "Last 7 days", "Last 30 days"], index=1, key="llm_usage_window")
+    usage = usage_summary(hours={"Last 24 hours": 24, "Last 7 days": 24 * 7, "Last 30 days": 24 * 30}[window])
+    if usage:
+        total_cost = sum(u["cost_usd"] for u in usage)
+        total_calls = sum(u["calls"] for u in usage)
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Calls", f"{total_calls:,}")
+        m2.metric("Estimated cost", f"${total_cost:,.2f}")
+        m3.metric("Cache hit rate", f"{sum(u['cache_hits'] for u in usage) / total_calls:.0%}")
+        m4.metric("Merged in-flight", f"{sum(u['merged'] for u in usage):,}")
+        st.dataframe(
+            [
+                {
+                    "Service": u["service"],
+                    "Calls": u["calls"],
+                    "Cache hit rate": f"{u['cache_hit_rate']:.0%}",
+                    "Merged": u["merged"],
+                    "p50 latency (ms)": round(u["p50_ms"] or 0),
+                    "p95 latency (ms)": round(u["p95_ms"] or 0),
+                    "Prompt tokens": u["prompt_tokens"],
+                    "Completion tokens": u["completion_tokens"],
+                    "Est. cost ($)": u["cost_usd"],
+                    "Retries": u["retries"],
+                    "Errors": u["errors"],
+                }
+                for u in usage
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.info("No LLM calls recorded in this window.")
+    flights = singleflight_stats()
+    if flights:
+        st.caption("Single-flight since process start: " + " • ".join(
+            f"{name}: {s['merged']} of {s['calls']} merged" for name, s in sorted(flights.items())
+        ))
+
+with st.expander("Background jobs"):
+    recent_jobs = jobs.recent(limit=50)
+    if recent_jobs:
+        counts = {status: sum(j["status"] == status for j in recent_jobs)
+                  for status in ("queued", "running", "done", "failed")}
+        j1, j2, j3, j4 = st.columns(4)
+        j1.metric("Queued", counts["queued"])
+        j2.metric("Running", counts["running"])
+        j3.metric("Done", counts["done"])
+        j4.metric("Failed", counts["failed"])
+        st.dataframe(
+            [
+                {
+                    "Job": j["id"],
+                    "Kind": j["kind"],
+                    "Status": j["status"],
+                    "Progress": f"{j['progress']:.0%}",
+                    "Note": j["note"],
+                    "Attempts": j["attempts"],
+                    "Created": j["created_at"],
+                    "Error": j["error"] or "",
+                }
+                for j in recent_jobs
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.info("No background jobs yet.")
+
+st.markdown("---")
+st.caption(f"{settings.firm_name} | Private Markets OS v1.0 MVP")
@@ -0,0 +1,108 @@
+"""
+Read/write throughput of the pm_os SQLite engine under concurrent sessions.
+
+    python benchmarks/bench_db.py [--seconds 3] [--write-ratio 0.2] [--baseline]
+
+Each worker thread owns a scoped session and loops over a mix of point
+reads ("emails for deal X") and single-row insert+commit writes. --baseline
+runs the same workload against a bare create_engine() with default
+journal mode for comparison.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker, scoped_session
+from pm_os.db import create_db_engine
+from pm_os.models import Base, Email
+
+def _prepare(db_path: str, baseline: bool):
+    if baseline:
+        eng = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    else:
+        eng = create_db_engine(db_path, pool_size=32)
+    Base.metadata.create_all(eng)
+    Session = scoped_session(sessionmaker(bind=eng))
+    db = Session()
+    db.add_all([
+        Email(sender=f"s{i}@bank.com", subject=f"Update {i}", body="Weekly market update " * 20,
+              received_at=datetime(2024, 1, 1), linked_deal_id=i % 50)
+        for i in range(5_000)
+    ])
+    db.commit()
+    Session.remove()
+    return eng, Session
+
+def run(concurrency: int, seconds: float, write_ratio: float, baseline: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        eng, Session = _prepare(os.path.join(tmp, "bench.sqlite"), baseline)
+        counts = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        stop = time.perf_counter() + seconds
+
+        def worker(seed: int):
+            rng = random.Random(seed)
+            reads = writes = locked = 0
+            db = Session()
+            while time.perf_counter() < stop:
+                try:
+                    if rng.random() < write_ratio:
+                        db.add(Email(sender="bench@bank.com", subject="bench", body="x" * 400,
+                                     linked_deal_id=rng.randrange(50)))
+                        db.commit()
+                        writes += 1
+                    else:
+                        deal = rng.randrange(50)
+                        db.execute(select(Email.id, Email.subject)
+                                   .where(Email.linked_deal_id == deal).limit(20)).all()
+                        db.commit()
+                        reads += 1
+                except OperationalError:
+                    db.rollback()
+                    locked += 1
+            Session.remove()
+            with lock:
+                counts["reads"] += reads
+                counts["writes"] += writes
+                counts["locked"] += locked
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        eng.dispose()
+    return {
+        "sessions": concurrency,
+        "reads_per_s": counts["reads"] / elapsed,
+        "writes_per_s": counts["writes"] / elapsed,
+        "locked_errors": counts["locked"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--baseline", action="store_true", help="bare engine, default journal mode")
+    args = parser.parse_args()
+
+    label = "baseline" if args.baseline else "pm_os engine (WAL)"
+    print(f"{label}: {args.seconds:.0f}s per run, write ratio {args.write_ratio:.0%}")
+    print(f"{'sessions':>8} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+    for n in (1, 8, 32):
+        r = run(n, args.seconds, args.write_ratio, args.baseline)
+        print(f"{r['sessions']:>8} {r['reads_per_s']:>10.0f} {r['writes_per_s']:>10.0f} {r['locked_errors']:>8}")
+
+if __name__ == "__main__":
+    main()
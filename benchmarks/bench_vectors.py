@@ -0,0 +1,81 @@
+"""
+Semantic search over the memory-mapped vector index at library scale.
+
+    python benchmarks/bench_vectors.py [--rows 1000000] [--dim 128] [--k 10] [--queries 32]
+
+Fits a model on synthetic credit text, appends ``--rows`` unit vectors to a
+temporary index through VectorIndex.append (in batches, as incremental
+updates do), then times single-query and batched top-k scans on the
+memory-mapped matrix and checks them against a brute-force argsort.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from pm_os.services.vectors import TextEmbedder, VectorIndex, pack_keys
+
+WORDS = ("borrower lender covenant leverage ratio ebitda facility maturity collateral amendment "
+         "consolidated interest coverage liquidity section agreement quarterly default cure solar "
+         "power grid charging fundraising capital call distribution valuation revenue margin").split()
+
+def synthetic_texts(n: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(60)) for _ in range(n)]
+
+def _percentile(values: list[float], p: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * p))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=32, help="queries per batched scan")
+    parser.add_argument("--batch", type=int, default=100_000, help="rows per append")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(os.path.join(tmp, "vectors"))
+        embedder = TextEmbedder.fit(synthetic_texts(max(args.dim + 1, 500)), dim=args.dim)
+        index.create(embedder)
+        dim = embedder.dim
+
+        t0 = time.perf_counter()
+        for start in range(0, args.rows, args.batch):
+            n = min(args.batch, args.rows - start)
+            vectors = rng.standard_normal((n, dim), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            index.append(pack_keys("document", np.arange(start + 1, start + n + 1)), vectors)
+        append_s = time.perf_counter() - t0
+        stats = index.stats()
+        print(f"{stats['rows']:,} vectors x {dim} dims ({stats['mb']:,.0f} MB) appended in {append_s:.1f}s "
+              f"({stats['rows'] / append_s:,.0f} rows/s)")
+
+        queries = embedder.embed(synthetic_texts(args.queries, seed=11))
+        single = []
+        for q in queries:
+            t0 = time.perf_counter()
+            index.top_k(q, args.k)
+            single.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        batched = index.top_k(queries, args.k)
+        batch_s = time.perf_counter() - t0
+
+        matrix = np.memmap(index._file("vectors.f32"), dtype=np.float32, mode="r", shape=(args.rows, dim))
+        exact = np.argsort(-(matrix @ queries[0]))[:args.k] + 1
+        found = [key & ((1 << 40) - 1) for key, _ in batched[0]]
+        print(f"{'scan':<22} {'p50 ms':>8} {'p95 ms':>8} {'queries/s':>10}")
+        print(f"{'single query':<22} {_percentile(single, 0.5) * 1e3:>8.1f} {_percentile(single, 0.95) * 1e3:>8.1f} "
+              f"{len(single) / sum(single):>10.1f}")
+        print(f"{f'batch of {args.queries}':<22} {batch_s * 1e3:>8.1f} {'':>8} {args.queries / batch_s:>10.1f}")
+        print(f"top-{args.k} matches brute force: {list(exact) == found}")
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ from pm_os.models import MarketSnippet, Deal, Company
 from pm_os.services.tagging import tag_text
 from pm_os.services.scoring import score_idea
 from pm_os.llm.client import LLMClient
-from pm_os.services.web_search import search_portfolio_news
+from pm_os.ui.jobs import job_active, poll_job, submit_job
 from pm_os.config import settings
 import json
 import os
@@ -28,7 +28,7 @@ with st.sidebar:
     st.page_link("pages/5_Deal_Room.py", label="Deal Detective", icon="📁")
     st.markdown("---")
 
-llm = LLMClient()
+llm = LLMClient(service="market_intel")
 st.title("Market Intelligence - Idea Scoring")
 st.subheader("Automate data capture and scoring of new investments")
 
@@ -56,7 +56,8 @@ with col_main1:
     if not settings.openai_api_key:
         st.warning("API key not configured")
     
-    if st.button("Run Market Data Search", type="primary", use_container_width=True):
+    if st.button("Run Market Data Search", type="primary", use_container_width=True,
+                 disabled=job_active("portfolio_news")):
         portfolio_data = load_portfolio_companies()
         
         if portfolio_data:
@@ -67,20 +68,23 @@ with col_main1:
                 if c.get("themes"):
                     company_themes.extend(c["themes"])
             
-            with st.spinner("Searching trusted financial sources..."):
-                result = search_portfolio_news(company_list, company_themes, verticals_filter)
-                
-                if result.get("error"):
-                    st.error(result["error"])
-                elif result.get("success"):
-                    st.session_state['search_results'] = result
-                    st.success("Search completed!")
-                    st.rerun()
-                else:
-                    st.error("Search failed.")
+            submit_job("portfolio_news", "web_search.portfolio_news",
+                       {"company_names": company_list, "themes": company_themes, "verticals": verticals_filter})
         else:
             st.error("Portfolio companies file not found")
     
+    finished = poll_job("portfolio_news", label="Searching trusted financial sources")
+    if finished is not None:
+        result = finished["result"]
+        if result.get("error"):
+            st.error(result["error"])
+        elif result.get("success"):
+            st.session_state['search_results'] = result
+            st.success("Search completed!")
+            st.rerun()
+        else:
+            st.error("Search failed.")
+    
     if 'search_results' in st.session_state:
         result = st.session_state['search_results']
         with st.expander("Search Results", expanded=True):
@@ -121,32 +125,33 @@ with col_main2:
         default=["North America", "Europe"]
     )
     
-    if st.button("Discover Companies", type="primary", use_container_width=True):
-        with st.spinner("Searching for opportunities..."):
-            from pm_os.services.web_search import search_investment_opportunities
-            
-            portfolio_data = load_portfolio_companies()
+    if st.button("Discover Companies", type="primary", use_container_width=True,
+                 disabled=job_active("company_discovery")):
+        portfolio_data = load_portfolio_companies()
+        
+        if portfolio_data:
+            companies = portfolio_data.get("companies", [])
             
-            if portfolio_data:
-                companies = portfolio_data.get("companies", [])
-                
-                result_companies = search_investment_opportunities(
-                    thesis=thesis_input,
-                    sectors=sectors_filter,
-                    regions=regions_filter,
-                    portfolio_companies=companies
-                )
-                
-                if result_companies.get("success"):
-                    st.session_state['company_search_results'] = result_companies
-                    st.success("Discovery complete!")
-                    st.rerun()
-                elif result_companies.get("error"):
-                    st.error(result_companies["error"])
-                else:
-                    st.error("Company search failed.")
-            else:
-                st.error("Could not load portfolio data")
+            submit_job("company_discovery", "web_search.investment_opportunities", {
+                "thesis": thesis_input,
+                "sectors": sectors_filter,
+                "regions": regions_filter,
+                "portfolio_companies": companies,
+            })
+        else:
+            st.error("Could not load portfolio data")
+    
+    finished = poll_job("company_discovery", label="Searching for opportunities")
+    if finished is not None:
+        result_companies = finished["result"]
+        if result_companies.get("success"):
+            st.session_state['company_search_results'] = result_companies
+            st.success("Discovery complete!")
+            st.rerun()
+        elif result_companies.get("error"):
+            st.error(result_companies["error"])
+        else:
+            st.error("Company search failed.")
     
     if 'company_search_results' in st.session_state:
         result_co = st.session_state['company_search_results']
@@ -1,9 +1,10 @@
 import streamlit as st
 from pm_os.db import SessionLocal
 from pm_os.models import Email
-import time
 import json
 import os
+from pm_os.ui.jobs import job_active, poll_job, submit_job, submit_parse_upload
+from pm_os.ui.session import render_session_memory
 
 st.set_page_config(page_title="Reporting Agent - Private Markets OS", layout="wide", page_icon="📊")
 
@@ -24,12 +25,14 @@ with st.sidebar:
     st.page_link("pages/5_Deal_Room.py", label="Deal Detective", icon="📁")
     st.markdown("---")
 
+render_session_memory()
+
 st.title("Reporting Agent - Portfolio & Investor Updates")
 st.subheader("Automated portfolio reporting and investor communication")
 
 st.markdown("---")
 
-with st.expander("📤 Upload Portfolio Report or Financial Document", expanded=False):
+with st.expander("📤 Upload Portfolio Report or Financial Document", expanded=job_active("portfolio_parse")):
     uploaded_portfolio_file = st.file_uploader(
         "Upload PDF document (portfolio report, quarterly update, financial statement)",
         type=['pdf'],
@@ -37,43 +40,40 @@ with st.expander("📤 Upload Portfolio Report or Financial Document", expanded=
         help="Upload a portfolio report to extract company performance metrics"
     )
     
-    if uploaded_portfolio_file is not None:
+    def render_companies(partial: dict):
+        companies = partial.get('companies') or []
+        if companies:
+            st.markdown("**Extracted Companies:**")
+            for company in companies[:3]:
+                st.markdown(f"- {company.get('company', 'N/A')} - {company.get('sector', 'N/A')}")
+            if len(companies) > 3:
+                st.caption(f"+{len(companies) - 3} more companies")
+
+    if uploaded_portfolio_file is not None and not job_active("portfolio_parse"):
         if st.button("Process Document", type="primary", key="process_portfolio_doc"):
-            with st.spinner("Extracting text from PDF..."):
-                try:
-                    from pm_os.services.document_parser import extract_text_from_pdf, parse_portfolio_report
-                    
-                    extracted_text = extract_text_from_pdf(uploaded_portfolio_file)
-                    st.success(f"✓ Extracted {len(extracted_text)} characters from {uploaded_portfolio_file.name}")
-                    
-                    with st.spinner("Parsing portfolio metrics with AI..."):
-                        parsed_data = parse_portfolio_report(extracted_text)
-                        
-                        if "error" in parsed_data:
-                            st.error(parsed_data["error"])
-                        else:
-                            if 'uploaded_portfolio_docs' not in st.session_state:
-                                st.session_state['uploaded_portfolio_docs'] = []
-                            
-                            st.session_state['uploaded_portfolio_docs'].append({
-                                'filename': uploaded_portfolio_file.name,
-                                'text': extracted_text,
-                                'parsed_data': parsed_data
-                            })
-                            
-                            st.success("✓ Document parsed successfully!")
-                            
-                            if parsed_data.get('companies'):
-                                st.markdown("**Extracted Companies:**")
-                                for company in parsed_data['companies'][:3]:
-                                    st.markdown(f"- {company.get('company', 'N/A')} - {company.get('sector', 'N/A')}")
-                                if len(parsed_data['companies']) > 3:
-                                    st.caption(f"+{len(parsed_data['companies']) - 3} more companies")
-                            
-                            st.rerun()
-                            
-                except Exception as e:
-                    st.error(f"Error processing document: {str(e)}")
+            try:
+                submit_parse_upload("portfolio_parse", uploaded_portfolio_file, "portfolio_report")
+            except Exception as e:
+                st.error(f"Error processing document: {str(e)}")
+
+    finished = poll_job("portfolio_parse", label="Parsing portfolio report", render_partial=render_companies)
+    if finished is not None:
+        parsed = finished["result"]
+        if parsed.get("error"):
+            st.error(parsed["error"])
+        else:
+            if 'uploaded_portfolio_docs' not in st.session_state:
+                st.session_state['uploaded_portfolio_docs'] = []
+
+            st.session_state['uploaded_portfolio_docs'].append({
+                'filename': finished['payload']['name'],
+                'digest': parsed['digest'],
+                'pages': parsed['pages'],
+                'parsed_data': parsed['result']
+            })
+
+            st.success(f"✓ Document parsed successfully! {parsed['summary']}")
+            st.rerun()
 
 if st.session_state.get('uploaded_portfolio_docs'):
     st.info(f"📄 {len(st.session_state['uploaded_portfolio_docs'])} uploaded document(s) available")
@@ -227,15 +227,11 @@ with col_report2:
     st.subheader("Generate Fundraising Email")
     st.markdown("Weekly investor update email with upcoming calls")
     
-    if st.button("Generate Weekly Update Email", type="primary", use_container_width=True, key="generate_email_btn"):
-        progress_placeholder = st.empty()
-        
-        with progress_placeholder.container():
-            st.info("Extracting investor calls from Salesforce...")
-            time.sleep(3)
-        
-        progress_placeholder.empty()
-        
+    if st.button("Generate Weekly Update Email", type="primary", use_container_width=True, key="generate_email_btn",
+                 disabled=job_active("weekly_update")):
+        submit_job("weekly_update", "reporting.weekly_update", {"week_of": "2024-12-16"}, priority=1)
+
+    if poll_job("weekly_update", label="Weekly update email") is not None:
         st.session_state['generated_email'] = True
         st.rerun()
     
@@ -1,5 +1,15 @@
+import textwrap
 import streamlit as st
 import pandas as pd
+from sqlalchemy import select
+from pm_os.db import SessionLocal
+from pm_os.models import Company, Covenant, Deal, Document
+from pm_os.services.docqa import library_documents
+from pm_os.services.document_store import load_text
+from pm_os.services.near_duplicates import library_version
+from pm_os.services.terms import term_changes
+from pm_os.ui.jobs import job_active, poll_job, submit_job, submit_parse_upload
+from pm_os.ui.session import render_session_memory
 
 st.set_page_config(page_title="Credit Origination - Private Markets OS", layout="wide", page_icon="💰")
 
@@ -20,11 +30,13 @@ with st.sidebar:
     st.page_link("pages/5_Deal_Room.py", label="Deal Detective", icon="📁")
     st.markdown("---")
 
+render_session_memory()
+
 st.title("Credit Origination - Document Analysis & Monitoring")
 
 st.markdown("---")
 
-with st.expander("📤 Upload Credit Agreement or Amendment", expanded=False):
+with st.expander("📤 Upload Credit Agreement or Amendment", expanded=job_active("credit_parse")):
     uploaded_credit_file = st.file_uploader(
         "Upload PDF document (credit agreement, amendment, term sheet)",
         type=['pdf'],
@@ -32,54 +44,52 @@ with st.expander("📤 Upload Credit Agreement or Amendment", expanded=False):
         help="Upload a credit agreement to extract covenants, terms, and amendments"
     )
     
-    if uploaded_credit_file is not None:
+    def render_credit_terms(partial: dict):
+        if partial.get('covenants'):
+            st.markdown("**Extracted Covenants:**")
+            for cov in partial['covenants'][:3]:
+                st.markdown(f"- {cov.get('type', 'N/A')}: {cov.get('threshold', 'N/A')}")
+            if len(partial['covenants']) > 3:
+                st.caption(f"+{len(partial['covenants']) - 3} more covenants")
+
+        if partial.get('financial_terms'):
+            st.markdown("**Financial Terms:**")
+            terms = partial['financial_terms']
+            if terms.get('facility_size'):
+                st.markdown(f"- Facility Size: {terms['facility_size']}")
+            if terms.get('interest_rate'):
+                st.markdown(f"- Interest Rate: {terms['interest_rate']}")
+
+    if uploaded_credit_file is not None and not job_active("credit_parse"):
         if st.button("Process Credit Document", type="primary", key="process_credit_doc"):
-            with st.spinner("Extracting text from PDF..."):
-                try:
-                    from pm_os.services.document_parser import extract_text_from_pdf, parse_credit_agreement
-                    
-                    extracted_text = extract_text_from_pdf(uploaded_credit_file)
-                    st.success(f"✓ Extracted {len(extracted_text)} characters from {uploaded_credit_file.name}")
-                    
-                    with st.spinner("Parsing credit agreement with AI..."):
-                        parsed_data = parse_credit_agreement(extracted_text)
-                        
-                        if "error" in parsed_data:
-                            st.error(parsed_data["error"])
-                        else:
-                            st.session_state['uploaded_credit_doc'] = {
-                                'filename': uploaded_credit_file.name,
-                                'text': extracted_text,
-                                'covenants': parsed_data.get('covenants', []),
-                                'terms': parsed_data.get('financial_terms', {}),
-                                'amendments': parsed_data.get('amendments', [])
-                            }
-                            
-                            st.success("✓ Credit document parsed successfully!")
-                            
-                            if parsed_data.get('covenants'):
-                                st.markdown("**Extracted Covenants:**")
-                                for cov in parsed_data['covenants'][:3]:
-                                    st.markdown(f"- {cov.get('type', 'N/A')}: {cov.get('threshold', 'N/A')}")
-                                if len(parsed_data['covenants']) > 3:
-                                    st.caption(f"+{len(parsed_data['covenants']) - 3} more covenants")
-                            
-                            if parsed_data.get('financial_terms'):
-                                st.markdown("**Financial Terms:**")
-                                terms = parsed_data['financial_terms']
-                                if terms.get('facility_size'):
-                                    st.markdown(f"- Facility Size: {terms['facility_size']}")
-                                if terms.get('interest_rate'):
-                                    st.markdown(f"- Interest Rate: {terms['interest_rate']}")
-                            
-                            st.rerun()
-                            
-                except Exception as e:
-                    st.error(f"Error processing document: {str(e)}")
+            try:
+                submit_parse_upload("credit_parse", uploaded_credit_file, "credit_agreement")
+            except Exception as e:
+                st.error(f"Error processing document: {str(e)}")
+
+    finished = poll_job("credit_parse", label="Parsing credit document", render_partial=render_credit_terms)
+    if finished is not None:
+        parsed = finished["result"]
+        if parsed.get("error"):
+            st.error(parsed["error"])
+        else:
+            parsed_data = parsed['result']
+            st.session_state['uploaded_credit_doc'] = {
+                'filename': finished['payload']['name'],
+                'digest': parsed['digest'],
+                'pages': parsed['pages'],
+                'covenants': parsed_data.get('covenants', []),
+                'terms': parsed_data.get('financial_terms', {}),
+                'amendments': parsed_data.get('amendments', []),
+                'numeric_terms': parsed.get('terms', [])
+            }
+
+            st.success(f"✓ Credit document parsed successfully! {parsed['summary']}")
+            st.rerun()
 
 if st.session_state.get('uploaded_credit_doc'):
     doc_info = st.session_state['uploaded_credit_doc']
-    st.info(f"📄 Uploaded: {doc_info['filename']} | {len(doc_info.get('covenants', []))} covenants | {len(doc_info.get('amendments', []))} amendments")
+    st.info(f"📄 Uploaded: {doc_info['filename']} | {len(doc_info.get('covenants', []))} covenants | {len(doc_info.get('amendments', []))} amendments | {len(doc_info.get('numeric_terms', []))} numeric terms")
     if st.button("Clear Uploaded Document", key="clear_credit_upload"):
         del st.session_state['uploaded_credit_doc']
         st.rerun()
@@ -414,6 +424,46 @@ Analysis Lens: {memo_lens}
                 if st.button("Export to Word", use_container_width=True, key="export_word"):
                     st.toast("Word export coming soon!", icon="📄")
 
+def comparison_text(source: tuple[str, int | str]) -> str | None:
+    kind, ref = source
+    if kind == "upload":
+        return load_text(ref)
+    with SessionLocal() as session:
+        document = session.get(Document, ref)
+        return document.text if document else None
+
+CHANGE_ICONS = {"tightened": "🔴", "loosened": "🟢", "added": "🆕", "removed": "❌", "unchanged": "⚪"}
+
+def term_rows(rows: list[dict]) -> pd.DataFrame:
+    return pd.DataFrame([{
+        "Term": r['term'], "Type": r['kind'], "Section": r['section'] or "-",
+        "Before": r['before'] or "-", "After": r['after'] or "-",
+        "Change": f"{CHANGE_ICONS.get(r['change'], '🟡')} {r['change'].title()}",
+    } for r in rows])
+
+def render_term_changes(source_a: tuple, source_b: tuple):
+    text_a, text_b = comparison_text(source_a), comparison_text(source_b)
+    if text_a is None or text_b is None:
+        st.warning("The text of one of these documents is no longer available; please upload it again.")
+        return
+    result = term_changes(text_a, text_b)
+    stats = result['stats']
+    changed = [r for r in result['changes'] if r['change'] != "unchanged"]
+    unchanged = [r for r in result['changes'] if r['change'] == "unchanged"]
+    scope = " (amendment: terms it does not restate are left out)" if stats['partial'] else ""
+    st.success(f"Comparison complete - {len(changed)} term change(s) from {stats['terms_a']} and "
+               f"{stats['terms_b']} extracted terms in {stats['elapsed_ms']:.0f} ms{scope}")
+    st.markdown("### Term Changes")
+    if changed:
+        st.dataframe(term_rows(changed), use_container_width=True, hide_index=True)
+    else:
+        st.info("No numeric terms changed between these versions.")
+    if unchanged:
+        with st.expander(f"Unchanged terms ({len(unchanged)})"):
+            st.dataframe(term_rows(unchanged), use_container_width=True, hide_index=True)
+    st.download_button("Download Term Changes (CSV)", term_rows(result['changes']).to_csv(index=False),
+                       file_name="term_changes.csv", mime="text/csv", use_container_width=True)
+
 # TAB 2: Amendment Comparison
 with credit_tabs[1]:
     st.subheader("Amendment / Version Comparison")
@@ -423,9 +473,13 @@ with credit_tabs[1]:
     
     doc_options = ["Credit Agreement v1.0 - GridPower (June 2023)", "Credit Agreement v1.0 - SolarFlex (March 2024)"]
     amended_options = ["Credit Agreement v2.0 - GridPower (Amendment #1, Nov 2024)", "Credit Agreement v2.0 - SolarFlex (Amendment #1, Sept 2024)"]
+    comparison_sources = {f"🗄 {d['title']}": ("document", d['id']) for d in library_documents()}
+    doc_options += list(comparison_sources)
+    amended_options += list(comparison_sources)[::-1]
     
     if st.session_state.get('uploaded_credit_doc'):
         uploaded_name = f"📎 {st.session_state['uploaded_credit_doc']['filename']} (Uploaded)"
+        comparison_sources[uploaded_name] = ("upload", st.session_state['uploaded_credit_doc']['digest'])
         doc_options.append(uploaded_name)
         amended_options.append(uploaded_name)
     
@@ -468,180 +522,184 @@ with credit_tabs[1]:
                     
                     st.markdown("---")
             
-            st.success("Comparison complete - 8 changes identified")
-            
-            st.markdown("### What Changed")
-            
-            changes = [
-                {
-                    "section": "Section 6.1 - Financial Reporting",
-                    "change": "Compliance certificate deadline extended",
-                    "detail": "Quarterly compliance certificates due within **45 days** (previously 30 days)",
-                    "impact": "neutral",
-                    "citation": "Credit Agreement v2.0, §6.1(b)"
-                },
-                {
-                    "section": "Section 7.11 - DSCR Covenant",
-                    "change": "DSCR threshold reduced",
-                    "detail": "Minimum Debt Service Coverage Ratio reduced to **1.20x** (previously 1.25x)",
-                    "impact": "neutral",
-                    "citation": "Credit Agreement v2.0, §7.11"
-                },
-                {
-                    "section": "Section 7.14 - Minimum Liquidity",
-                    "change": "Liquidity covenant tightened",
-                    "detail": "Minimum cash balance increased to **$15M** (previously $10M)",
-                    "impact": "adverse",
-                    "citation": "Credit Agreement v2.0, §7.14"
-                },
-                {
-                    "section": "Section 1.1 - EBITDA Definition",
-                    "change": "EBITDA add-back cap introduced",
-                    "detail": "Non-recurring expenses add-back now capped at **$2M per fiscal year** (previously unlimited with lender approval)",
-                    "impact": "adverse",
-                    "citation": "Credit Agreement v2.0, §1.1 (EBITDA)"
-                },
-                {
-                    "section": "Section 7.2 - CapEx Basket",
-                    "change": "CapEx basket increased",
-                    "detail": "Annual maintenance CapEx limit increased to **$25M** (previously $20M)",
-                    "impact": "neutral",
-                    "citation": "Credit Agreement v2.0, §7.2(c)"
-                },
-                {
-                    "section": "Section 2.8 - Prepayment Provisions",
-                    "change": "Prepayment penalty period extended",
-                    "detail": "Make-whole prepayment period extended to **24 months** (previously 18 months)",
-                    "impact": "adverse",
-                    "citation": "Credit Agreement v2.0, §2.8"
-                },
-                {
-                    "section": "Section 8.1(h) - Covenant Default Cure Period",
-                    "change": "Financial covenant cure period shortened",
-                    "detail": "Cure period for financial covenant breaches reduced to **15 days** (previously 30 days)",
-                    "impact": "adverse",
-                    "citation": "Credit Agreement v2.0, §8.1(h)"
-                },
-                {
-                    "section": "Section 9.12 - Governing Law",
-                    "change": "Jurisdiction changed",
-                    "detail": "Governing law changed to **Delaware** (previously New York)",
-                    "impact": "neutral",
-                    "citation": "Credit Agreement v2.0, §9.12"
-                }
-            ]
-            
-            for idx, ch in enumerate(changes, 1):
-                if ch["impact"] == "adverse":
-                    icon = "🔴"
-                    color = "#ffebee"
-                elif ch["impact"] == "favorable":
-                    icon = "🟢"
-                    color = "#e8f5e9"
-                else:
-                    icon = "🟡"
-                    color = "#fff9e6"
+            if comp_doc1 in comparison_sources and comp_doc2 in comparison_sources:
+                render_term_changes(comparison_sources[comp_doc1], comparison_sources[comp_doc2])
+            else:
+                st.success("Comparison complete - 8 changes identified")
+            
+                st.markdown("### What Changed")
+            
+                changes = [
+                    {
+                        "section": "Section 6.1 - Financial Reporting",
+                        "change": "Compliance certificate deadline extended",
+                        "detail": "Quarterly compliance certificates due within **45 days** (previously 30 days)",
+                        "impact": "neutral",
+                        "citation": "Credit Agreement v2.0, §6.1(b)"
+                    },
+                    {
+                        "section": "Section 7.11 - DSCR Covenant",
+                        "change": "DSCR threshold reduced",
+                        "detail": "Minimum Debt Service Coverage Ratio reduced to **1.20x** (previously 1.25x)",
+                        "impact": "neutral",
+                        "citation": "Credit Agreement v2.0, §7.11"
+                    },
+                    {
+                        "section": "Section 7.14 - Minimum Liquidity",
+                        "change": "Liquidity covenant tightened",
+                        "detail": "Minimum cash balance increased to **$15M** (previously $10M)",
+                        "impact": "adverse",
+                        "citation": "Credit Agreement v2.0, §7.14"
+                    },
+                    {
+                        "section": "Section 1.1 - EBITDA Definition",
+                        "change": "EBITDA add-back cap introduced",
+                        "detail": "Non-recurring expenses add-back now capped at **$2M per fiscal year** (previously unlimited with lender approval)",
+                        "impact": "adverse",
+                        "citation": "Credit Agreement v2.0, §1.1 (EBITDA)"
+                    },
+                    {
+                        "section": "Section 7.2 - CapEx Basket",
+                        "change": "CapEx basket increased",
+                        "detail": "Annual maintenance CapEx limit increased to **$25M** (previously $20M)",
+                        "impact": "neutral",
+                        "citation": "Credit Agreement v2.0, §7.2(c)"
+                    },
+                    {
+                        "section": "Section 2.8 - Prepayment Provisions",
+                        "change": "Prepayment penalty period extended",
+                        "detail": "Make-whole prepayment period extended to **24 months** (previously 18 months)",
+                        "impact": "adverse",
+                        "citation": "Credit Agreement v2.0, §2.8"
+                    },
+                    {
+                        "section": "Section 8.1(h) - Covenant Default Cure Period",
+                        "change": "Financial covenant cure period shortened",
+                        "detail": "Cure period for financial covenant breaches reduced to **15 days** (previously 30 days)",
+                        "impact": "adverse",
+                        "citation": "Credit Agreement v2.0, §8.1(h)"
+                    },
+                    {
+                        "section": "Section 9.12 - Governing Law",
+                        "change": "Jurisdiction changed",
+                        "detail": "Governing law changed to **Delaware** (previously New York)",
+                        "impact": "neutral",
+                        "citation": "Credit Agreement v2.0, §9.12"
+                    }
+                ]
+            
+                for idx, ch in enumerate(changes, 1):
+                    if ch["impact"] == "adverse":
+                        icon = "🔴"
+                        color = "#ffebee"
+                    elif ch["impact"] == "favorable":
+                        icon = "🟢"
+                        color = "#e8f5e9"
+                    else:
+                        icon = "🟡"
+                        color = "#fff9e6"
                 
-                with st.container(border=True):
-                    st.markdown(f"**{icon} Change #{idx}: {ch['section']}**")
-                    st.markdown(f"**{ch['change']}**")
-                    st.markdown(ch['detail'])
-                    st.caption(f"*Source: {ch['citation']}*")
+                    with st.container(border=True):
+                        st.markdown(f"**{icon} Change #{idx}: {ch['section']}**")
+                        st.markdown(f"**{ch['change']}**")
+                        st.markdown(ch['detail'])
+                        st.caption(f"*Source: {ch['citation']}*")
             
-            st.markdown("---")
-            st.markdown("### Risk Implications")
+                st.markdown("---")
+                st.markdown("### Risk Implications")
             
-            col_risk1, col_risk2 = st.columns([2, 1])
-            with col_risk1:
-                st.markdown("#### Key Risk Changes")
+                col_risk1, col_risk2 = st.columns([2, 1])
+                with col_risk1:
+                    st.markdown("#### Key Risk Changes")
                 
-                st.error("""
-**🔴 HIGH PRIORITY: Reduced Covenant Headroom**
+                    st.error("""
+    **🔴 HIGH PRIORITY: Reduced Covenant Headroom**
 
-The combination of (1) tightened liquidity covenant (+$5M) and (2) EBITDA add-back cap ($2M) meaningfully reduces covenant headroom:
+    The combination of (1) tightened liquidity covenant (+$5M) and (2) EBITDA add-back cap ($2M) meaningfully reduces covenant headroom:
 
-- **Liquidity Headroom:** Reduced from 150% to 67% ($25M actual vs. $15M minimum)
-- **DSCR Headroom:** Reduced from 44% to 37% due to EBITDA add-back cap impact
-- **Cure Period:** Shortened from 30 to 15 days, reducing reaction time
+    - **Liquidity Headroom:** Reduced from 150% to 67% ($25M actual vs. $15M minimum)
+    - **DSCR Headroom:** Reduced from 44% to 37% due to EBITDA add-back cap impact
+    - **Cure Period:** Shortened from 30 to 15 days, reducing reaction time
 
-**Implication:** Company now has less financial flexibility to absorb shocks. In downside case (revenue -20%), liquidity covenant could breach.
-                """)
+    **Implication:** Company now has less financial flexibility to absorb shocks. In downside case (revenue -20%), liquidity covenant could breach.
+                    """)
                 
-                st.warning("""
-**🟡 MEDIUM PRIORITY: Increased Monitoring Burden**
+                    st.warning("""
+    **🟡 MEDIUM PRIORITY: Increased Monitoring Burden**
 
-- Compliance certificate deadline extension (30→45 days) reduces reporting frequency transparency
-- Prepayment penalty extension (18→24 months) limits refinancing optionality
-- Net impact: Reduced visibility and flexibility
+    - Compliance certificate deadline extension (30→45 days) reduces reporting frequency transparency
+    - Prepayment penalty extension (18→24 months) limits refinancing optionality
+    - Net impact: Reduced visibility and flexibility
 
-**Implication:** Lenders should increase quarterly monitoring touchpoints with management.
-                """)
+    **Implication:** Lenders should increase quarterly monitoring touchpoints with management.
+                    """)
                 
-                st.info("""
-**🟢 LOW PRIORITY: Operational Flexibility**
+                    st.info("""
+    **🟢 LOW PRIORITY: Operational Flexibility**
 
-- DSCR covenant relief (1.25x→1.20x) provides modest cushion  
-- CapEx basket increase ($20M→$25M) allows for necessary maintenance
-- Net impact: Slight improvement in operational flexibility
+    - DSCR covenant relief (1.25x→1.20x) provides modest cushion  
+    - CapEx basket increase ($20M→$25M) allows for necessary maintenance
+    - Net impact: Slight improvement in operational flexibility
 
-**Implication:** Management has room for necessary capital investments.
-                """)
+    **Implication:** Management has room for necessary capital investments.
+                    """)
             
-            with col_risk2:
-                st.markdown("#### Summary Stats")
+                with col_risk2:
+                    st.markdown("#### Summary Stats")
                 
-                st.metric("Total Changes", "8")
-                st.metric("Adverse", "4", delta="-50%", delta_color="inverse")
-                st.metric("Neutral", "3")
-                st.metric("Favorable", "1", delta="+12.5%")
+                    st.metric("Total Changes", "8")
+                    st.metric("Adverse", "4", delta="-50%", delta_color="inverse")
+                    st.metric("Neutral", "3")
+                    st.metric("Favorable", "1", delta="+12.5%")
                 
-                st.markdown("---")
-                st.markdown("**Change Distribution**")
-                st.markdown("🔴 Adverse: 50%")
-                st.progress(0.5)
-                st.markdown("🟡 Neutral: 37.5%")
-                st.progress(0.375)
-                st.markdown("🟢 Favorable: 12.5%")
-                st.progress(0.125)
+                    st.markdown("---")
+                    st.markdown("**Change Distribution**")
+                    st.markdown("🔴 Adverse: 50%")
+                    st.progress(0.5)
+                    st.markdown("🟡 Neutral: 37.5%")
+                    st.progress(0.375)
+                    st.markdown("🟢 Favorable: 12.5%")
+                    st.progress(0.125)
             
-            st.markdown("---")
-            st.markdown("### Covenant Update Summary")
+                st.markdown("---")
+                st.markdown("### Covenant Update Summary")
             
-            covenant_changes = {
-                "Covenant": ["DSCR", "Minimum Liquidity", "EBITDA Add-backs", "CapEx Limit", "Cure Period"],
-                "v1.0": ["≥ 1.25x", "≥ $10M", "Unlimited (w/ approval)", "≤ $20M", "30 days"],
-                "v2.0": ["≥ 1.20x", "≥ $15M", "≤ $2M/year", "≤ $25M", "15 days"],
-                "Impact": ["🟢 Favorable", "🔴 Adverse", "🔴 Adverse", "🟢 Favorable", "🔴 Adverse"]
-            }
+                covenant_changes = {
+                    "Covenant": ["DSCR", "Minimum Liquidity", "EBITDA Add-backs", "CapEx Limit", "Cure Period"],
+                    "v1.0": ["≥ 1.25x", "≥ $10M", "Unlimited (w/ approval)", "≤ $20M", "30 days"],
+                    "v2.0": ["≥ 1.20x", "≥ $15M", "≤ $2M/year", "≤ $25M", "15 days"],
+                    "Impact": ["🟢 Favorable", "🔴 Adverse", "🔴 Adverse", "🟢 Favorable", "🔴 Adverse"]
+                }
             
-            df_cov_changes = pd.DataFrame(covenant_changes)
-            st.dataframe(df_cov_changes, use_container_width=True, hide_index=True)
+                df_cov_changes = pd.DataFrame(covenant_changes)
+                st.dataframe(df_cov_changes, use_container_width=True, hide_index=True)
             
-            st.markdown("---")
+                st.markdown("---")
             
-            st.markdown("### Recommended Actions")
-            st.markdown("""
-1. **Request financial projections** reflecting new covenant thresholds to assess headroom
-2. **Increase monitoring frequency** to quarterly calls (vs. annual)
-3. **Model downside scenarios** with new liquidity covenant ($15M minimum)
-4. **Clarify EBITDA add-back cap** - obtain list of add-backs taken in prior periods
-5. **Review exit strategy** given extended prepayment penalty period
-            """)
+                st.markdown("### Recommended Actions")
+                st.markdown("""
+    1. **Request financial projections** reflecting new covenant thresholds to assess headroom
+    2. **Increase monitoring frequency** to quarterly calls (vs. annual)
+    3. **Model downside scenarios** with new liquidity covenant ($15M minimum)
+    4. **Clarify EBITDA add-back cap** - obtain list of add-backs taken in prior periods
+    5. **Review exit strategy** given extended prepayment penalty period
+                """)
             
-            comparison_report = """# Amendment Comparison Report
-## GridPower Holdings Credit Agreement
-### v1.0 (June 2023) vs. v2.0 (Amendment #1, November 2024)
+                comparison_report = textwrap.dedent("""\
+    # Amendment Comparison Report
+    ## GridPower Holdings Credit Agreement
+    ### v1.0 (June 2023) vs. v2.0 (Amendment #1, November 2024)
 
-[Full comparison would be exported here]
-"""
+    [Full comparison would be exported here]
+    """)
             
-            st.download_button(
-                "Download Comparison Report",
-                comparison_report,
-                file_name="amendment_comparison_gridpower.md",
-                mime="text/markdown",
-                use_container_width=True
-            )
+                st.download_button(
+                    "Download Comparison Report",
+                    comparison_report,
+                    file_name="amendment_comparison_gridpower.md",
+                    mime="text/markdown",
+                    use_container_width=True
+                )
 
 # TAB 1: Covenant Extraction + Auto-Reminders
 with credit_tabs[0]:
@@ -684,6 +742,38 @@ with credit_tabs[0]:
             st.caption(f"*Extracted from {st.session_state['uploaded_credit_doc']['filename']} using AI*")
             st.markdown("---")
     
+    with st.expander("📑 Covenants Extracted from the Library", expanded=job_active("covenant_extraction")):
+        st.caption("Reads financial covenants from every stored credit agreement and amendment into the covenant "
+                   "table; only clauses the rules cannot read go to the LLM.")
+        use_llm = st.checkbox("Ask the LLM about clauses the rules cannot read", value=True, key="covenant_use_llm")
+        if not job_active("covenant_extraction") and st.button("Extract Covenants from Library",
+                                                               key="extract_covenants"):
+            submit_job("covenant_extraction", "covenants.extract",
+                       {"use_llm": use_llm, "version": library_version(("document",))})
+        finished = poll_job("covenant_extraction", label="Reading covenant clauses")
+        if finished is not None:
+            st.session_state['covenant_extraction'] = finished["result"]
+        report = st.session_state.get('covenant_extraction')
+        if report:
+            st.caption(f"{report['documents']:,} document(s) • {report['clauses']:,} covenant clause(s): "
+                       f"{report['rule']:,} read by rules, {report['llm']:,} by the LLM "
+                       f"({report['llm_requests']:,} request(s)), {report['unresolved']:,} unresolved • "
+                       f"{report['written']:,} covenant(s) written, {report.get('kept', 0):,} already tracked "
+                       f"in {report['elapsed_s']}s")
+            for conflict in report.get('conflicts', []):
+                st.warning(f"Tracked covenant differs from the documents: {conflict}")
+        with SessionLocal() as db:
+            extracted = db.execute(
+                select(Company.name, Covenant.covenant_type, Covenant.threshold, Covenant.test_frequency,
+                       Covenant.next_due_date, Covenant.extraction, Covenant.source_note)
+                .join(Deal, Deal.id == Covenant.deal_id).join(Company, Company.id == Deal.company_id)
+                .where(Covenant.extraction != "").order_by(Company.name, Covenant.covenant_type)
+            ).all()
+        if extracted:
+            st.dataframe(pd.DataFrame(extracted, columns=["Company", "Covenant", "Threshold", "Test Frequency",
+                                                          "Next Test", "Read By", "Source"]),
+                         use_container_width=True, hide_index=True)
+
     st.markdown("### Covenant Summary Table")
     
     if "GridPower" in deal_select:
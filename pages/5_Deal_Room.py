@@ -1,8 +1,9 @@
 import streamlit as st
-from pm_os.db import SessionLocal
-from pm_os.models import Document, Covenant
-from pm_os.services.docqa import generate_ic_memo_outline, answer_question
-from pm_os.services.compare import compare_docs, similarity
+from pm_os.services.docqa import answer_question, answer_library_question, library_companies
+from pm_os.services.compare import compare_docs
+from pm_os.services.near_duplicates import library_version
+from pm_os.ui.jobs import job_active, poll_job, submit_job, submit_parse_upload
+from pm_os.ui.session import render_session_memory
 
 st.set_page_config(page_title="Deal Detective - Private Markets OS", layout="wide", page_icon="📁")
 
@@ -23,6 +24,8 @@ with st.sidebar:
     st.page_link("pages/5_Deal_Room.py", label="Deal Detective", icon="📁")
     st.markdown("---")
 
+render_session_memory()
+
 st.title("Deal Detective - Document Management & Analysis")
 
 st.markdown("---")
@@ -102,7 +105,7 @@ with col2:
 
 st.markdown("---")
 
-with st.expander("📤 Upload New Document", expanded=False):
+with st.expander("📤 Upload New Document", expanded=job_active("deal_parse")):
     uploaded_deal_file = st.file_uploader(
         f"Upload PDF document for {selected_company}",
         type=['pdf'],
@@ -110,54 +113,53 @@ with st.expander("📤 Upload New Document", expanded=False):
         help="Upload a CIM, IC memo, financial report, or other deal document"
     )
     
-    if uploaded_deal_file is not None:
+    def render_deal_summary(partial: dict):
+        if partial.get('deal_summary'):
+            st.markdown("**Deal Summary:**")
+            summary = partial['deal_summary']
+            if summary.get('company_name'):
+                st.markdown(f"- Company: {summary['company_name']}")
+            if summary.get('sector'):
+                st.markdown(f"- Sector: {summary['sector']}")
+
+        if partial.get('tags'):
+            st.markdown(f"**Tags:** {', '.join(partial['tags'][:5])}")
+
+    if uploaded_deal_file is not None and not job_active("deal_parse"):
         if st.button("Process Deal Document", type="primary", key="process_deal_doc"):
-            with st.spinner("Extracting text from PDF..."):
-                try:
-                    from pm_os.services.document_parser import extract_text_from_pdf, parse_deal_document
-                    
-                    extracted_text = extract_text_from_pdf(uploaded_deal_file)
-                    st.success(f"✓ Extracted {len(extracted_text)} characters from {uploaded_deal_file.name}")
-                    
-                    with st.spinner("Parsing deal document with AI..."):
-                        parsed_data = parse_deal_document(extracted_text)
-                        
-                        if "error" in parsed_data:
-                            st.error(parsed_data["error"])
-                        else:
-                            if 'uploaded_deal_docs' not in st.session_state:
-                                st.session_state['uploaded_deal_docs'] = {}
-                            
-                            if selected_company not in st.session_state['uploaded_deal_docs']:
-                                st.session_state['uploaded_deal_docs'][selected_company] = []
-                            
-                            st.session_state['uploaded_deal_docs'][selected_company].append({
-                                'name': uploaded_deal_file.name,
-                                'uploaded': "2024-12-14",
-                                'extracted_tables': parsed_data.get('extracted_tables', []),
-                                'extracted_data': [f"{k}: {v}" for k, v in parsed_data.get('financial_data', {}).items() if v],
-                                'tags': parsed_data.get('tags', []),
-                                'text': extracted_text,
-                                'parsed_data': parsed_data
-                            })
-                            
-                            st.success("✓ Document parsed and added to library!")
-                            
-                            if parsed_data.get('deal_summary'):
-                                st.markdown("**Deal Summary:**")
-                                summary = parsed_data['deal_summary']
-                                if summary.get('company_name'):
-                                    st.markdown(f"- Company: {summary['company_name']}")
-                                if summary.get('sector'):
-                                    st.markdown(f"- Sector: {summary['sector']}")
-                            
-                            if parsed_data.get('tags'):
-                                st.markdown(f"**Tags:** {', '.join(parsed_data['tags'][:5])}")
-                            
-                            st.rerun()
-                            
-                except Exception as e:
-                    st.error(f"Error processing document: {str(e)}")
+            try:
+                submit_parse_upload("deal_parse", uploaded_deal_file, "deal_document")
+                st.session_state['deal_parse_company'] = selected_company
+            except Exception as e:
+                st.error(f"Error processing document: {str(e)}")
+
+    finished = poll_job("deal_parse", label="Parsing deal document", render_partial=render_deal_summary)
+    if finished is not None:
+        parsed = finished["result"]
+        if parsed.get("error"):
+            st.error(parsed["error"])
+        else:
+            parsed_data = parsed['result']
+            company = st.session_state.pop('deal_parse_company', selected_company)
+            if 'uploaded_deal_docs' not in st.session_state:
+                st.session_state['uploaded_deal_docs'] = {}
+
+            if company not in st.session_state['uploaded_deal_docs']:
+                st.session_state['uploaded_deal_docs'][company] = []
+
+            st.session_state['uploaded_deal_docs'][company].append({
+                'name': finished['payload']['name'],
+                'uploaded': "2024-12-14",
+                'extracted_tables': parsed_data.get('extracted_tables', []),
+                'extracted_data': [f"{k}: {v}" for k, v in (parsed_data.get('financial_data') or {}).items() if v],
+                'tags': parsed_data.get('tags', []),
+                'digest': parsed['digest'],
+                'pages': parsed['pages'],
+                'parsed_data': parsed_data
+            })
+
+            st.success(f"✓ Document parsed and added to library! {parsed['summary']}")
+            st.rerun()
 
 if st.session_state.get('uploaded_deal_docs', {}).get(selected_company):
     uploaded_count = len(st.session_state['uploaded_deal_docs'][selected_company])
@@ -219,6 +221,91 @@ if view_mode == "Documents":
 
 st.markdown("---")
 
+st.markdown("### Ask Across the Library")
+st.caption("Searches every stored document of a company (base agreements, amendments, CIMs) and cites each one it uses.")
+library = library_companies()
+if library:
+    col_lq1, col_lq2 = st.columns([1, 2])
+    with col_lq1:
+        library_company = st.selectbox("Company", library, key="library_company",
+                                       format_func=lambda c: f"{c['name']} ({c['documents']} document(s))")
+    with col_lq2:
+        library_q = st.text_input("Question", "How did minimum liquidity change across the documents?",
+                                  key="library_question")
+    if st.button("Ask Library", type="primary", key="ask_library"):
+        with st.spinner("Searching the library..."):
+            answer = answer_library_question(library_q, company_id=library_company['id'])
+        if "error" in answer:
+            st.error(answer["error"])
+        else:
+            cache_note = " • cached answer" if answer['cached'] else ""
+            st.caption(f"Searched {answer['searched']} document(s), {answer['matched']} matched{cache_note}")
+            st.info(answer['answer'])
+            for source in answer['documents']:
+                with st.expander(f"📄 {source['title']} ({len(source['citations'])} passage(s))"):
+                    for cite in source['citations']:
+                        page = f" • page {cite['page']}" if cite['page'] else ""
+                        st.markdown(f"**[{cite['n']}]**{page}")
+                        st.write(cite['snippet'])
+else:
+    st.info("No stored documents yet; ingest a data room with `python -m pm_os ingest <dir>`.")
+
+with st.expander("🔁 Near-Duplicates in the Library", expanded=job_active("near_duplicates")):
+    st.caption("Finds re-sent drafts, duplicate uploads and forwarded copies among stored documents and emails.")
+    dup_threshold = st.slider("Minimum similarity", 0.7, 1.0, 0.9, 0.01, key="dup_threshold")
+    if not job_active("near_duplicates") and st.button("Find Near-Duplicates", key="find_near_duplicates"):
+        kinds = ["document", "email"]
+        submit_job("near_duplicates", "library.near_duplicates",
+                   {"kinds": kinds, "threshold": dup_threshold, "version": library_version(tuple(kinds))})
+    finished = poll_job("near_duplicates", label="Scanning the library")
+    if finished is not None:
+        st.session_state['near_duplicates'] = finished["result"]
+    found = st.session_state.get('near_duplicates')
+    if found:
+        st.caption(f"{len(found['clusters'])} cluster(s) among {found['rows']:,} item(s) • {found['elapsed_s']}s")
+        for cluster in found['clusters']:
+            st.markdown(f"**{cluster['kind'].title()}s** • {len(cluster['members'])} copies • "
+                        f"similarity ≥ {cluster['similarity']:.0%}")
+            for member in cluster['members']:
+                st.markdown(f"- #{member['id']} {member['title']}")
+
+st.markdown("---")
+
+def render_comparison(doc_a: dict, doc_b: dict):
+    from pm_os.services.document_store import load_text
+    text_a, text_b = load_text(doc_a['digest']), load_text(doc_b['digest'])
+    if text_a is None or text_b is None:
+        st.warning("The text of one of these documents is no longer in the document store; please upload it again.")
+        return
+    with st.spinner("Aligning sections and summarising changes..."):
+        result = compare_docs(text_a, text_b)
+    if "error" in result:
+        st.error(result["error"])
+        return
+    meta = result['_meta']
+    st.success(f"Comparison complete: {meta['changed']} changed, {meta['added']} added and {meta['removed']} removed "
+               f"of {meta['sections_b']} section(s) in {meta['elapsed_s']:.2f}s; {meta['llm_tokens']:,} tokens sent "
+               f"to the model (about {meta['full_tokens_est']:,} for the full documents)")
+
+    st.markdown("### High-Level Changes")
+    for change in result['high_level_changes']:
+        st.markdown(f"- {change}")
+
+    st.markdown("### Risk Flags")
+    for flag in result['risk_flags']:
+        st.warning(flag)
+
+    st.markdown("### Section Changes")
+    for section in result['diff']['sections']:
+        if section['status'] == 'unchanged':
+            continue
+        with st.expander(f"{section['status'].title()}: {section['after'] or section['before']}"):
+            for change in section['changes']:
+                if change['before']:
+                    st.markdown(f"- ~~{change['before'][:500]}~~")
+                if change['after']:
+                    st.markdown(f"- **{change['after'][:500]}**")
+
 if 'selected_doc' in st.session_state and 'action' in st.session_state:
     doc = st.session_state['selected_doc']
     action = st.session_state['action']
@@ -236,10 +323,25 @@ if 'selected_doc' in st.session_state and 'action' in st.session_state:
         if st.button("Answer Question", type="primary"):
             st.markdown("### Answer")
             
-            if doc.get('text'):
-                from pm_os.services.docqa import answer_question
-                answer = answer_question(doc['text'], q)
-                st.info(answer)
+            if doc.get('digest'):
+                from pm_os.services.document_store import get_text
+                from pm_os.services.retrieval import upload_source
+                pdf = get_text(doc['digest'])
+                if pdf is None:
+                    st.warning("The text of this document is no longer in the document store; please upload it again.")
+                else:
+                    answer = answer_question(pdf.text, q, source=upload_source(doc['digest']),
+                                             page_offsets=pdf.page_offsets)
+                    if "error" in answer:
+                        st.error(answer["error"])
+                    else:
+                        st.info(answer['answer'])
+                        if answer['citations']:
+                            st.markdown("#### Sources")
+                            for cite in answer['citations']:
+                                page = f"page {cite['page']}, " if cite['page'] else ""
+                                with st.expander(f"[{cite['n']}] {page}characters {cite['start']:,}–{cite['end']:,}"):
+                                    st.write(cite['snippet'])
             else:
                 st.info("Based on the CIM, Roam is the UK's leading long-dwell EV charging network operator with a target of 25,000 chargers. Key investment highlights include: (1) Strong unit economics with average utilization rates improving to 24%, (2) Proprietary software platform providing operational efficiency, (3) Strategic partnerships with major hospitality and residential property owners, (4) Favorable UK policy environment with government EV adoption targets.")
     
@@ -314,24 +416,29 @@ if 'selected_doc' in st.session_state and 'action' in st.session_state:
             doc_b_select = st.selectbox("Document B", [d['name'] for d in documents], index=min(1, len(documents)-1), key="doc_b")
         
         if st.button("Compare Documents", type="primary"):
-            st.success("Comparison complete!")
+            doc_a = next(d for d in documents if d['name'] == doc_a_select)
+            doc_b = next(d for d in documents if d['name'] == doc_b_select)
+            if doc_a.get('digest') and doc_b.get('digest'):
+                render_comparison(doc_a, doc_b)
+            else:
+                st.success("Comparison complete!")
             
-            st.markdown("### High-Level Changes")
-            changes = [
-                "Updated financial projections reflect 15% higher revenue in Year 3",
-                "Added new risk disclosure regarding regulatory changes",
-                "Modified management compensation structure"
-            ]
-            for change in changes:
-                st.markdown(f"- {change}")
+                st.markdown("### High-Level Changes")
+                changes = [
+                    "Updated financial projections reflect 15% higher revenue in Year 3",
+                    "Added new risk disclosure regarding regulatory changes",
+                    "Modified management compensation structure"
+                ]
+                for change in changes:
+                    st.markdown(f"- {change}")
             
-            st.markdown("### Risk Flags")
-            flags = [
-                "Covenant headroom reduced from 25% to 18%",
-                "Customer concentration increased (top 3 now represent 42% vs 35%)"
-            ]
-            for flag in flags:
-                st.warning(flag)
+                st.markdown("### Risk Flags")
+                flags = [
+                    "Covenant headroom reduced from 25% to 18%",
+                    "Customer concentration increased (top 3 now represent 42% vs 35%)"
+                ]
+                for flag in flags:
+                    st.warning(flag)
     
     with tabs[3]:
         st.subheader("Covenant Tracking")
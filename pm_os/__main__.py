@@ -0,0 +1,55 @@
+"""
+Command-line entry points: ``python -m pm_os ingest <dir>``, ``python -m pm_os vectors build|update``,
+``python -m pm_os covenants``.
+"""
+import argparse
+from pm_os.config import settings
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m pm_os", description="Private Markets OS command line.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="bulk-ingest every PDF in a data-room folder")
+    ingest.add_argument("directory")
+    ingest.add_argument("--deal-id", type=int, default=None,
+                        help="attach every document to this deal (default: match top-level folders to company names)")
+    ingest.add_argument("--workers", type=int, default=settings.pdf_workers, help="extraction processes")
+    ingest.add_argument("--batch-size", type=int, default=50, help="documents per write transaction")
+    ingest.add_argument("--no-parse", action="store_true", help="store text only; skip LLM extraction")
+    ingest.add_argument("--checkpoint", default=None, help="checkpoint file (default: under the document cache)")
+    ingest.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    vectors = sub.add_parser("vectors", help="build or update the semantic search index")
+    vectors.add_argument("action", choices=["build", "update", "stats"],
+                         help="build: refit the model and re-embed everything; update: embed new and edited rows")
+    vectors.add_argument("--sample", type=int, default=settings.vector_fit_sample, help="texts to fit the model on")
+    vectors.add_argument("--batch-size", type=int, default=2000, help="rows embedded per batch")
+    covenants = sub.add_parser("covenants", help="extract covenants from stored documents into the covenant table")
+    covenants.add_argument("--deal-id", type=int, action="append", default=None,
+                           help="only this deal (repeatable; default: every deal)")
+    covenants.add_argument("--no-llm", action="store_true", help="rules only; leave unparsed clauses unresolved")
+    args = parser.parse_args(argv)
+
+    from pm_os.db import init_db
+    init_db()
+    if args.command == "vectors":
+        from pm_os.services.vectors import vector_index
+        if args.action == "build":
+            print(f"{vector_index.build(sample=args.sample, batch_size=args.batch_size, progress=print):,} row(s) indexed")
+        elif args.action == "update":
+            print(f"{vector_index.update(batch_size=args.batch_size, progress=print):,} row(s) embedded")
+        print(vector_index.stats())
+        return
+    if args.command == "covenants":
+        from pm_os.services.covenants import extract_library_covenants, format_report
+        report = extract_library_covenants(args.deal_id, use_llm=not args.no_llm,
+                                           progress=lambda fraction, note: print(note))
+        print(format_report(report))
+        return
+
+    from pm_os.ingest import format_report, ingest_directory
+    report = ingest_directory(args.directory, deal_id=args.deal_id, workers=args.workers,
+                              batch_size=args.batch_size, parse=not args.no_parse,
+                              checkpoint_path=args.checkpoint, restart=args.restart, progress=print)
+    print(format_report(report))
+
+if __name__ == "__main__":
+    main()
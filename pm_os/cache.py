@@ -0,0 +1,183 @@
+"""
+Small persistent key/value cache on SQLite with TTL and LRU size eviction.
+
+Used for LLM responses and other expensive, reproducible results. Values
+are JSON-serialisable objects. Each thread gets its own connection and the
+file runs in WAL mode, so the cache is shared safely across Streamlit
+sessions and process restarts. LRU order is kept to within
+``TOUCH_INTERVAL_S``: a hit only writes when the entry's access time is
+older than that, so repeated reads of hot entries take no write lock.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+def stable_key(*parts) -> str:
+    """sha256 over a canonical JSON encoding; identical inputs hash identically in every process."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class SQLiteCache:
+    EVICT_EVERY = 32          # sets between LRU sweeps
+    TOUCH_INTERVAL_S = 60.0   # hits refresh accessed_at at most this often
+
+    def __init__(self, path: str, *, ttl_seconds: float | None = None, max_bytes: int | None = None,
+                 max_entries: int | None = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sets_since_evict = self.EVICT_EVERY
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "bypassed": 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def get(self, key: str):
+        """Return the cached value or None (also None when expired)."""
+        conn = self._conn()
+        row = conn.execute("SELECT value, created_at, accessed_at FROM cache WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or (self.ttl_seconds is not None and now - row[1] > self.ttl_seconds):
+            if row is not None:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._count("misses")
+            return None
+        if now - row[2] >= self.TOUCH_INTERVAL_S:
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        blob = json.dumps(value, ensure_ascii=False, default=str)
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, blob, len(blob.encode("utf-8")), now, now),
+        )
+        self._count("sets")
+        with self._lock:
+            self._sets_since_evict += 1
+            due = self._sets_since_evict >= self.EVICT_EVERY
+            if due:
+                self._sets_since_evict = 0
+        if due:
+            self.evict()
+
+    def get_many(self, keys: list[str], chunk: int = 500) -> dict:
+        """``{key: value}`` for the keys that are cached and fresh; one query per ``chunk`` keys."""
+        conn = self._conn()
+        now, found, expired, stale = time.time(), {}, [], []
+        for start in range(0, len(keys), chunk):
+            part = keys[start:start + chunk]
+            rows = conn.execute(
+                f"SELECT key, value, created_at, accessed_at FROM cache WHERE key IN ({','.join('?' * len(part))})",
+                part,
+            ).fetchall()
+            for key, value, created_at, accessed_at in rows:
+                if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                    expired.append((key,))
+                    continue
+                if now - accessed_at >= self.TOUCH_INTERVAL_S:
+                    stale.append((now, key))
+                found[key] = json.loads(value)
+        if expired:
+            conn.executemany("DELETE FROM cache WHERE key = ?", expired)
+        if stale:
+            conn.executemany("UPDATE cache SET accessed_at = ? WHERE key = ?", stale)
+        self._count("hits", len(found))
+        self._count("misses", len(set(keys)) - len(found))
+        return found
+
+    def set_many(self, items: dict):
+        """Store every ``{key: value}`` in one transaction."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            blob = json.dumps(value, ensure_ascii=False, default=str)
+            rows.append((key, blob, len(blob.encode("utf-8")), now, now))
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("sets", len(rows))
+        with self._lock:
+            self._sets_since_evict += len(rows)
+            due = self._sets_since_evict >= self.EVICT_EVERY
+            if due:
+                self._sets_since_evict = 0
+        if due:
+            self.evict()
+
+    def record_bypass(self):
+        self._count("bypassed")
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones beyond the entry/byte limits."""
+        conn = self._conn()
+        removed = 0
+        if self.ttl_seconds is not None:
+            removed += conn.execute("DELETE FROM cache WHERE created_at < ?",
+                                    (time.time() - self.ttl_seconds,)).rowcount
+        if self.max_entries is not None:
+            removed += conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        if self.max_bytes is not None:
+            removed += conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM ("
+                "SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS running FROM cache"
+                ") WHERE running > ?)",
+                (self.max_bytes,),
+            ).rowcount
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def stats(self) -> dict:
+        entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        with self._lock:
+            out = dict(self._stats)
+        lookups = out["hits"] + out["misses"]
+        out.update(entries=entries, bytes=size, hit_rate=round(out["hits"] / lookups, 3) if lookups else 0.0)
+        return out
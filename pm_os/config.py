@@ -19,8 +19,48 @@ def _get_config_value(key: str, default: str = "") -> str:
 class Settings:
     demo_mode: bool = _get_config_value("DEMO_MODE", "1") == "1"
     db_path: str = _get_config_value("DB_PATH", "./pm_os.sqlite")
+    db_pool_size: int = int(_get_config_value("DB_POOL_SIZE", "8"))
+    db_busy_timeout_ms: int = int(_get_config_value("DB_BUSY_TIMEOUT_MS", "5000"))
     firm_name: str = _get_config_value("FIRM_NAME", "Private Markets OS")
     openai_api_key: str = _get_config_value("OPENAI_API_KEY", "")
+    openai_base_url: str = _get_config_value("OPENAI_BASE_URL", "")
+    pdf_workers: int = int(_get_config_value("PDF_WORKERS", str(min(8, os.cpu_count() or 1))))
+    pdf_parallel_min_pages: int = int(_get_config_value("PDF_PARALLEL_MIN_PAGES", "24"))
+    upload_spool_dir: str = _get_config_value("UPLOAD_SPOOL_DIR", "")
+    doc_text_memory_items: int = int(_get_config_value("DOC_TEXT_MEMORY_ITEMS", "16"))
+    doc_cache_path: str = _get_config_value("DOC_CACHE_PATH", "./.pm_os_cache/documents.sqlite")
+    doc_cache_max_mb: float = float(_get_config_value("DOC_CACHE_MAX_MB", "1024"))
+    qa_cache_path: str = _get_config_value("QA_CACHE_PATH", "./.pm_os_cache/answers.sqlite")
+    qa_cache_ttl_hours: float = float(_get_config_value("QA_CACHE_TTL_HOURS", "168"))
+    qa_cache_max_mb: float = float(_get_config_value("QA_CACHE_MAX_MB", "64"))
+    qa_adhoc_sources: int = int(_get_config_value("QA_ADHOC_SOURCES", "200"))
+    qa_max_concurrency: int = int(_get_config_value("QA_MAX_CONCURRENCY", "8"))
+    minhash_cache_path: str = _get_config_value("MINHASH_CACHE_PATH", "./.pm_os_cache/minhash.sqlite")
+    minhash_cache_max_mb: float = float(_get_config_value("MINHASH_CACHE_MAX_MB", "128"))
+    vector_index_dir: str = _get_config_value("VECTOR_INDEX_DIR", "./.pm_os_cache/vectors")
+    vector_dim: int = int(_get_config_value("VECTOR_DIM", "128"))
+    vector_fit_sample: int = int(_get_config_value("VECTOR_FIT_SAMPLE", "20000"))
+    job_threads: int = int(_get_config_value("JOB_THREADS", "4"))
+    job_processes: int = int(_get_config_value("JOB_PROCESSES", str(min(2, os.cpu_count() or 1))))
+    job_max_attempts: int = int(_get_config_value("JOB_MAX_ATTEMPTS", "3"))
+    job_lease_s: float = float(_get_config_value("JOB_LEASE_S", "60"))
+    job_result_ttl_s: float = float(_get_config_value("JOB_RESULT_TTL_S", "3600"))
+    job_workers_inprocess: bool = _get_config_value("JOB_WORKERS", "1") == "1"
+    llm_model: str = _get_config_value("LLM_MODEL", "gpt-4o")
+    llm_timeout_s: float = float(_get_config_value("LLM_TIMEOUT_S", "60"))
+    llm_web_search_timeout_s: float = float(_get_config_value("LLM_WEB_SEARCH_TIMEOUT_S", "180"))
+    llm_max_retries: int = int(_get_config_value("LLM_MAX_RETRIES", "4"))
+    llm_backoff_base_s: float = float(_get_config_value("LLM_BACKOFF_BASE_S", "0.5"))
+    llm_backoff_max_s: float = float(_get_config_value("LLM_BACKOFF_MAX_S", "20"))
+    llm_chunk_tokens: int = int(_get_config_value("LLM_CHUNK_TOKENS", "6000"))
+    llm_max_concurrency: int = int(_get_config_value("LLM_MAX_CONCURRENCY", "8"))
+    llm_requests_per_minute: float = float(_get_config_value("LLM_RPM", "500"))
+    llm_tokens_per_minute: float = float(_get_config_value("LLM_TPM", "200000"))
+    llm_telemetry_enabled: bool = _get_config_value("LLM_TELEMETRY", "1") == "1"
+    llm_cache_enabled: bool = _get_config_value("LLM_CACHE", "1") == "1"
+    llm_cache_path: str = _get_config_value("LLM_CACHE_PATH", "./.pm_os_cache/llm_cache.sqlite")
+    llm_cache_ttl_hours: float = float(_get_config_value("LLM_CACHE_TTL_HOURS", "168"))
+    llm_cache_max_mb: float = float(_get_config_value("LLM_CACHE_MAX_MB", "256"))
 
 settings = Settings()
 
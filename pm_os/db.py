@@ -1,11 +1,95 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool, StaticPool
 from pm_os.config import settings
-from pm_os.models import Base
+from pm_os.migrations import run_migrations
 
-engine = create_engine(f"sqlite:///{settings.db_path}", echo=False)
-SessionLocal = sessionmaker(bind=engine)
+# Applied to every new DBAPI connection. WAL lets readers proceed while a
+# writer commits; NORMAL sync is durable across app crashes in WAL mode.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64_000,        # KiB (negative) -> 64 MB page cache per connection
+    "mmap_size": 268_435_456,     # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+    "busy_timeout": settings.db_busy_timeout_ms,
+}
 
-def init_db():
-    Base.metadata.create_all(engine)
+def _is_memory_db(db_path: str) -> bool:
+    return db_path in ("", ":memory:") or db_path.startswith("file::memory:")
+
+def _apply_pragmas(dbapi_conn, connection_record):
+    cur = dbapi_conn.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cur.execute(f"PRAGMA {name}={value}")
+    cur.close()
+
+def create_db_engine(db_path: str = settings.db_path, *, pool_size: int = settings.db_pool_size,
+                     echo: bool = False) -> Engine:
+    """
+    Build a SQLite engine tuned for many concurrent Streamlit sessions.
+
+    File databases get a QueuePool of connections that may cross threads
+    (each Streamlit session runs in its own script thread); in-memory
+    databases share a single StaticPool connection so every thread sees
+    the same data.
+    """
+    connect_args = {
+        "check_same_thread": False,
+        "timeout": settings.db_busy_timeout_ms / 1000,
+    }
+    if _is_memory_db(db_path):
+        eng = create_engine("sqlite://", echo=echo, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        eng = create_engine(
+            f"sqlite:///{db_path}",
+            echo=echo,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=pool_size * 2,
+        )
+    event.listen(eng, "connect", _apply_pragmas)
+    return eng
+
+engine = create_db_engine()
 
+# Thread-local session registry: SessionLocal() returns the calling thread's
+# session, so concurrent Streamlit sessions never share ORM state.
+SessionLocal = scoped_session(sessionmaker(bind=engine))
+
+@contextmanager
+def session_scope():
+    """Yield the thread's session, committing on success and releasing it afterwards."""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        SessionLocal.remove()
+
+@contextmanager
+def write_transaction(eng: Engine = engine):
+    """
+    Connection inside an explicit BEGIN IMMEDIATE. pysqlite autocommits DDL
+    issued outside a transaction, so bulk jobs that mix DDL (dropping and
+    recreating triggers) with DML use this to commit or roll back as one unit.
+    """
+    with eng.connect() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+def init_db():
+    """Create or upgrade the schema in place by running pending migrations."""
+    return run_migrations(engine)
@@ -0,0 +1,62 @@
+"""
+SQLite FTS5 indexes over document, email and market snippet text.
+
+Each index is an external-content FTS5 table (the text lives only in the
+source table) kept in sync by insert/update/delete triggers, as described
+in the SQLite FTS5 documentation.
+"""
+from dataclasses import dataclass
+from sqlalchemy.engine import Connection
+
+@dataclass(frozen=True)
+class FtsIndex:
+    name: str                 # FTS5 virtual table
+    table: str                # content table
+    columns: tuple[str, ...]
+    weights: tuple[float, ...]  # bm25() column weights, same order as columns
+
+FTS_INDEXES = {
+    "document": FtsIndex("documents_fts", "documents", ("text",), (1.0,)),
+    "email": FtsIndex("emails_fts", "emails", ("subject", "body"), (3.0, 1.0)),
+    "snippet": FtsIndex("market_snippets_fts", "market_snippets", ("title", "text"), (3.0, 1.0)),
+}
+
+# Retrieval passages (services.retrieval); installed by its own migration, after doc_chunks exists.
+CHUNK_INDEX = FtsIndex("doc_chunks_fts", "doc_chunks", ("text",), (1.0,))
+
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+def install_fts_index(conn: Connection, idx: FtsIndex):
+    cols = ", ".join(idx.columns)
+    new_vals = ", ".join(f"new.{c}" for c in idx.columns)
+    old_vals = ", ".join(f"old.{c}" for c in idx.columns)
+    delete_old = (f"INSERT INTO {idx.name} ({idx.name}, rowid, {cols}) "
+                  f"VALUES ('delete', old.id, {old_vals})")
+    insert_new = f"INSERT INTO {idx.name} (rowid, {cols}) VALUES (new.id, {new_vals})"
+
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {idx.name} USING fts5("
+        f"{cols}, content='{idx.table}', content_rowid='id', tokenize='{TOKENIZER}')"
+    )
+    triggers = {
+        "ai": (f"AFTER INSERT ON {idx.table}", [insert_new]),
+        "ad": (f"AFTER DELETE ON {idx.table}", [delete_old]),
+        "au": (f"AFTER UPDATE OF {cols} ON {idx.table}", [delete_old, insert_new]),
+    }
+    for suffix, (when, stmts) in triggers.items():
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS trg_{idx.name}_{suffix}")
+        conn.exec_driver_sql(f"CREATE TRIGGER trg_{idx.name}_{suffix} {when} BEGIN {'; '.join(stmts)}; END")
+    rebuild_fts_index(conn, idx)
+
+def drop_fts_triggers(conn: Connection, idx: FtsIndex):
+    """Suspend trigger maintenance for a bulk load; follow with install_fts_index()."""
+    for suffix in ("ai", "ad", "au"):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS trg_{idx.name}_{suffix}")
+
+def rebuild_fts_index(conn: Connection, idx: FtsIndex):
+    conn.exec_driver_sql(f"INSERT INTO {idx.name} ({idx.name}) VALUES ('rebuild')")
+
+def optimize_fts_indexes(conn: Connection):
+    """Merge FTS5 b-tree segments; worth running after large bulk loads."""
+    for idx in FTS_INDEXES.values():
+        conn.exec_driver_sql(f"INSERT INTO {idx.name} ({idx.name}) VALUES ('optimize')")
@@ -0,0 +1,392 @@
+"""
+Headless bulk ingestion of data-room folders (``python -m pm_os ingest <dir>``).
+
+The pipeline for every PDF under the folder:
+
+1. hash it (a thread pool) and skip files already ingested, duplicates of
+   another file in this run and copies of documents already in the database;
+2. extract the text on a spawn-based process pool, one file per task
+   (text already in the document store is reused);
+3. detect the document type and route the text to ``parse_credit_agreement``,
+   ``parse_deal_document`` or ``parse_portfolio_report`` on a thread pool;
+4. write ``Document`` and ``Covenant`` rows in batches, one transaction each,
+   indexing each document's Q&A passages (see services.retrieval) with it.
+
+Each file's deal is the ``--deal-id`` given, or the deal of the company
+named by its top-level folder. Progress is appended to a JSON-lines
+checkpoint after each batch commits, so an interrupted run picks up where
+it stopped. A file whose parse failed is stored as text and checkpointed
+as ``parse_failed``; the next run parses it again and adds its covenants
+to the existing document. A throughput report is printed at the end.
+"""
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterator
+from sqlalchemy import func, insert, select
+from pm_os.cache import stable_key
+from pm_os.config import settings
+from pm_os.db import engine, write_transaction
+from pm_os.models import Company, Covenant, Deal, Document
+from pm_os.services import document_store
+from pm_os.services.document_parser import (PARSERS, parse_credit_agreement, parse_deal_document,
+                                            parse_portfolio_report)
+from pm_os.services.pdf_text import PdfText, extract_pdf_text
+from pm_os.services.retrieval import index_documents
+
+PARSE_FUNCTIONS: dict[str, Callable[[str], dict]] = {
+    "credit_agreement": parse_credit_agreement,
+    "deal_document": parse_deal_document,
+    "portfolio_report": parse_portfolio_report,
+}
+
+# Keyword scores over the file name and the opening of the text (whole words only, so "nav" does not
+# count in "navigate" nor "irr" in "irrevocable"); highest wins, deal_document on a tie.
+TYPE_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "credit_agreement": ("credit agreement", "amendment", "borrower", "lender", "covenant", "term loan",
+                         "facility", "administrative agent", "events of default"),
+    "portfolio_report": ("portfolio", "quarterly report", "quarterly update", "net asset value", "nav", "irr",
+                         "moic", "fund", "capital account", "marking to market"),
+    "deal_document": ("confidential information memorandum", "investment memorandum", "cim", "ic memo",
+                      "investment highlights", "management presentation", "teaser"),
+}
+DETECT_CHARS = 6000
+_TYPE_RES = {kind: re.compile(r"\b(?:" + "|".join(r"\s+".join(map(re.escape, k.split())) for k in keywords) + r")\b")
+             for kind, keywords in TYPE_KEYWORDS.items()}
+
+@dataclass
+class IngestReport:
+    files: int = 0
+    skipped_checkpoint: int = 0
+    duplicates: int = 0
+    unmatched: int = 0
+    extracted: int = 0
+    parsed: int = 0
+    parse_failed: int = 0
+    failed: int = 0
+    documents: int = 0
+    covenants: int = 0
+    pages: int = 0
+    bytes: int = 0
+    elapsed_s: float = 0.0
+    by_type: dict[str, int] = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+def detect_kind(text: str, filename: str = "") -> tuple[str, str]:
+    """``(parser kind, Document.doc_type)`` for a document from keyword hits in its name and opening text."""
+    head = f"{filename.replace('_', ' ')}\n{text[:DETECT_CHARS]}".lower()   # "acme_cim.pdf" -> "acme cim.pdf"
+    scores = {kind: len(pattern.findall(head)) for kind, pattern in _TYPE_RES.items()}
+    kind = max(scores, key=lambda k: (scores[k], k == "deal_document"))
+    if scores[kind] == 0:
+        kind = "deal_document"
+    if kind == "credit_agreement":
+        title = head[:len(filename) + 400]
+        return kind, "amendment" if "amendment" in title else "credit_agreement"
+    if kind == "deal_document":
+        return kind, "cim" if "memorandum" in head else "deal_document"
+    return kind, kind
+
+def iter_pdfs(root: str) -> Iterator[str]:
+    """Every ``*.pdf`` below ``root``, in a stable order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(".pdf"):
+                yield os.path.join(dirpath, name)
+
+def default_checkpoint_path(root: str) -> str:
+    return os.path.join(os.path.dirname(settings.doc_cache_path) or ".", "ingest",
+                        f"{stable_key(os.path.abspath(root))[:16]}.jsonl")
+
+class Checkpoint:
+    """
+    Append-only JSON lines: one record per finished file, keyed by relative
+    path, size and mtime. The last record of a path wins; ``parse_failed``
+    files (stored, but without a parse) are kept apart for a retry.
+    """
+    DONE = ("written", "duplicate")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: dict[str, dict] = {}
+        self.parse_failed: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        self._record(json.loads(line))
+
+    def _record(self, record: dict):
+        self.done.pop(record["path"], None)
+        self.parse_failed.pop(record["path"], None)
+        if record["status"] in self.DONE:
+            self.done[record["path"]] = record
+        elif record["status"] == "parse_failed":
+            self.parse_failed[record["path"]] = record
+
+    @staticmethod
+    def _same(record: dict | None, size: int, mtime: float) -> dict | None:
+        return record if record is not None and record["size"] == size and record["mtime"] == mtime else None
+
+    def finished(self, rel: str, size: int, mtime: float) -> bool:
+        return self._same(self.done.get(rel), size, mtime) is not None
+
+    def failed_parse(self, rel: str, size: int, mtime: float) -> dict | None:
+        """The ``parse_failed`` record of an unchanged file, if its last parse failed."""
+        return self._same(self.parse_failed.get(rel), size, mtime)
+
+    def append(self, records: list[dict]):
+        if not records:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+                self._record(record)
+
+def _company_deals() -> dict[str, int]:
+    """Lower-cased company name -> its most recently created deal."""
+    with engine.connect() as conn:
+        rows = conn.execute(select(Company.name, func.max(Deal.id))
+                            .join(Deal, Deal.company_id == Company.id).group_by(Company.id)).all()
+    return {name.strip().lower(): deal_id for name, deal_id in rows}
+
+def _existing_hashes(hashes: list[str]) -> set[str]:
+    found = set()
+    with engine.connect() as conn:
+        for start in range(0, len(hashes), 500):
+            found.update(conn.execute(select(Document.content_hash)
+                                      .where(Document.content_hash.in_(hashes[start:start + 500]))).scalars())
+    return found
+
+def _covenant_rows(deal_id: int, parsed: dict, source: str) -> list[dict]:
+    rows = []
+    for cov in parsed.get("covenants") or []:
+        if not isinstance(cov, dict) or not cov.get("type"):
+            continue
+        section = f" {cov['section']}" if cov.get("section") else ""
+        rows.append({
+            "deal_id": deal_id,
+            "covenant_type": str(cov["type"])[:80],
+            "threshold": str(cov.get("threshold") or "")[:80],
+            "test_frequency": str(cov.get("test_frequency") or "")[:40],
+            "next_due_date": "",
+            "source_note": f"Ingested from {source}{section}"[:200],
+        })
+    return rows
+
+_VERSION_RE = re.compile(r"v?(\d+)", re.IGNORECASE)
+
+def _latest_version(conn, deal_id: int, doc_type: str) -> int:
+    """Highest numeric version ("v3" -> 3) stored for the deal and doc type; 0 if none."""
+    labels = conn.execute(select(Document.version).where(
+        Document.deal_id == deal_id, Document.doc_type == doc_type)).scalars()
+    return max((int(m[1]) for m in (_VERSION_RE.fullmatch(v.strip()) for v in labels) if m), default=0)
+
+def _write_batch(batch: list[dict], checkpoint: Checkpoint, report: IngestReport):
+    """
+    Insert one batch of documents (and their covenants) in a single
+    transaction, then checkpoint it. Items re-parsed after a failed parse
+    already carry their ``document_id`` and only add covenants.
+    """
+    if not batch:
+        return
+    with write_transaction() as conn:
+        versions: dict[tuple[int, str], int] = {}
+        covenants, new = [], []
+        for item in batch:
+            if "document_id" in item:
+                item.pop("text")
+                covenants.extend(_covenant_rows(item["deal_id"], item.pop("parsed") or {}, item["path"]))
+                continue
+            key = (item["deal_id"], item["doc_type"])
+            if key not in versions:
+                versions[key] = _latest_version(conn, *key)
+            versions[key] += 1
+            item["document_id"] = conn.execute(insert(Document).values(
+                deal_id=item["deal_id"], doc_type=item["doc_type"], version=f"v{versions[key]}",
+                text=item.pop("text"), content_hash=item["digest"],
+            )).inserted_primary_key[0]
+            new.append(item["document_id"])
+            covenants.extend(_covenant_rows(item["deal_id"], item.pop("parsed") or {}, item["path"]))
+        if covenants:
+            conn.execute(insert(Covenant), covenants)
+        if new:
+            index_documents(new, conn=conn)
+    report.documents += len(new)
+    report.covenants += len(covenants)
+    checkpoint.append([{k: v for k, v in item.items() if k != "parse_failed"}
+                       | {"status": "parse_failed" if item.get("parse_failed") else "written"} for item in batch])
+    batch.clear()
+
+def ingest_directory(root: str, *, deal_id: int | None = None, workers: int = settings.pdf_workers,
+                     batch_size: int = 50, parse: bool = True, checkpoint_path: str | None = None,
+                     restart: bool = False, progress: Callable[[str], None] | None = None) -> IngestReport:
+    """Ingest every PDF below ``root``; see the module docstring. Returns the run's counters."""
+    t0 = time.perf_counter()
+    report = IngestReport()
+    checkpoint_path = checkpoint_path or default_checkpoint_path(root)
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint(checkpoint_path)
+    deals = _company_deals()
+    log = progress or (lambda message: None)
+    if parse and not settings.openai_api_key:
+        log("OPENAI_API_KEY is not set; storing text only, without parsing")
+        parse = False
+
+    # 1. Hash, route to a deal and de-duplicate.
+    pending: list[dict] = []
+    for path in iter_pdfs(root):
+        report.files += 1
+        rel = os.path.relpath(path, root)
+        stat = os.stat(path)
+        retry = checkpoint.failed_parse(rel, stat.st_size, stat.st_mtime)
+        if checkpoint.finished(rel, stat.st_size, stat.st_mtime) or (retry and not parse):
+            report.skipped_checkpoint += 1
+            continue
+        if retry:
+            # Stored on an earlier run without a parse: parse again and add covenants to that document.
+            pending.append({k: retry[k] for k in ("path", "size", "mtime", "deal_id", "digest", "document_id")}
+                           | {"abs": path})
+            continue
+        folder = rel.split(os.sep)[0].strip().lower() if os.sep in rel else ""
+        target = deal_id if deal_id is not None else deals.get(folder)
+        if target is None:
+            report.unmatched += 1
+            checkpoint.append([{"path": rel, "size": stat.st_size, "mtime": stat.st_mtime, "status": "unmatched"}])
+            continue
+        pending.append({"path": rel, "abs": path, "size": stat.st_size, "mtime": stat.st_mtime, "deal_id": target})
+    with ThreadPoolExecutor(max_workers=8, thread_name_prefix="ingest-hash") as hashers:
+        for item, digest in zip(pending, hashers.map(lambda i: document_store.file_digest(i["abs"]), pending)):
+            item["digest"] = digest
+    in_db = _existing_hashes(sorted({i["digest"] for i in pending if "document_id" not in i}))
+    unique, seen, duplicates = [], set(), []
+    for item in pending:
+        if "document_id" in item:
+            seen.add(item["digest"])
+            unique.append(item)
+        elif item["digest"] in in_db or item["digest"] in seen:
+            duplicates.append({k: item[k] for k in ("path", "size", "mtime", "digest")} | {"status": "duplicate"})
+        else:
+            seen.add(item["digest"])
+            unique.append(item)
+    report.duplicates = len(duplicates)
+    checkpoint.append(duplicates)
+    log(f"{report.files:,} PDF(s): {len(unique):,} to ingest, {report.duplicates:,} duplicate(s), "
+        f"{report.skipped_checkpoint:,} already done, {report.unmatched:,} without a deal")
+
+    # 2-4. Extract on processes, parse on threads, write in batches; bounded in flight.
+    batch: list[dict] = []
+    extracting: dict[Future, dict] = {}
+    parsing: dict[Future, dict] = {}
+    queue = iter(unique)
+    window = max(1, workers) * 4
+
+    def finish(item: dict, parsed: dict | None):
+        item.pop("abs", None)
+        item["parsed"] = parsed
+        if "document_id" not in item:
+            report.by_type[item["doc_type"]] = report.by_type.get(item["doc_type"], 0) + 1
+        batch.append(item)
+        if len(batch) >= batch_size:
+            _write_batch(batch, checkpoint, report)
+            log(f"{report.documents:,} document(s), {report.covenants:,} covenant(s) written "
+                f"({time.perf_counter() - t0:.1f}s)")
+
+    def fail(item: dict, error: str):
+        report.failed += 1
+        report.errors.append(f"{item['path']}: {error}")
+        checkpoint.append([{k: item[k] for k in ("path", "size", "mtime", "digest")} | {"status": "failed",
+                                                                                       "error": error[:300]}])
+
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn")) as pool, \
+            ThreadPoolExecutor(max_workers=max(1, settings.llm_max_concurrency), thread_name_prefix="ingest-parse") as llm_pool:
+        while True:
+            while len(extracting) + len(parsing) < window:
+                item = next(queue, None)
+                if item is None:
+                    break
+                stored = document_store.get_text(item["digest"])
+                if stored is not None:
+                    done = Future()
+                    done.set_result(stored)
+                    extracting[done] = item
+                else:
+                    # One whole file per task; pdf_text imports only pypdf, so workers start fast.
+                    extracting[pool.submit(extract_pdf_text, item["abs"], workers=1)] = item
+            if not extracting and not parsing:
+                break
+            ready, _ = wait([*extracting, *parsing], return_when=FIRST_COMPLETED)
+            for future in ready:
+                if future in extracting:
+                    item = extracting.pop(future)
+                    try:
+                        pdf: PdfText = future.result()
+                    except Exception as e:
+                        fail(item, f"{type(e).__name__}: {e}")
+                        continue
+                    report.extracted += 1
+                    report.pages += pdf.page_count
+                    report.bytes += item["size"]
+                    document_store.put_text(item["digest"], pdf)
+                    kind, item["doc_type"] = detect_kind(pdf.text, os.path.basename(item["path"]))
+                    item["kind"], item["text"] = kind, pdf.text
+                    if parse:
+                        stored_parse = document_store.get_parse(item["digest"], kind, PARSERS[kind].version)
+                        if stored_parse is not None:
+                            report.parsed += 1
+                            finish(item, stored_parse)
+                        else:
+                            parsing[llm_pool.submit(PARSE_FUNCTIONS[kind], pdf.text)] = item
+                    else:
+                        finish(item, None)
+                else:
+                    item = parsing.pop(future)
+                    try:
+                        parsed = future.result()
+                    except Exception as e:
+                        parsed = {"error": f"{type(e).__name__}: {e}"}
+                    if parsed.get("error"):
+                        # Keep the text; the checkpoint marks the file for a re-parse on the next run.
+                        report.parse_failed += 1
+                        report.errors.append(f"{item['path']}: {parsed['error']}")
+                        item["parse_failed"] = True
+                        finish(item, None)
+                    else:
+                        report.parsed += 1
+                        document_store.put_parse(item["digest"], item["kind"], PARSERS[item["kind"]].version, parsed)
+                        finish(item, parsed)
+    _write_batch(batch, checkpoint, report)
+    report.elapsed_s = round(time.perf_counter() - t0, 3)
+    return report
+
+def format_report(report: IngestReport) -> str:
+    elapsed = max(report.elapsed_s, 1e-9)
+    lines = [
+        f"Files found          {report.files:>10,}",
+        f"  already ingested   {report.skipped_checkpoint:>10,}",
+        f"  duplicates         {report.duplicates:>10,}",
+        f"  without a deal     {report.unmatched:>10,}",
+        f"  failed             {report.failed:>10,}",
+        f"Extracted            {report.extracted:>10,}  ({report.pages:,} pages, {report.bytes / 1e6:,.1f} MB)",
+        f"Parsed               {report.parsed:>10,}"
+        + (f"  ({report.parse_failed:,} failed; parsed again on the next run)" if report.parse_failed else ""),
+        f"Documents written    {report.documents:>10,}  "
+        + ", ".join(f"{t}: {n:,}" for t, n in sorted(report.by_type.items())),
+        f"Covenants written    {report.covenants:>10,}",
+        f"Elapsed              {report.elapsed_s:>10.1f}s",
+        f"Throughput           {report.extracted / elapsed:>10.1f} files/s, {report.pages / elapsed:,.1f} pages/s, "
+        f"{report.bytes / 1e6 / elapsed:,.1f} MB/s",
+    ]
+    if report.errors:
+        lines.append(f"Errors ({len(report.errors):,}; first 10):")
+        lines.extend(f"  {e}" for e in report.errors[:10])
+    return "\n".join(lines)
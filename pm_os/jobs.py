@@ -0,0 +1,348 @@
+"""
+Durable background jobs backed by the ``jobs`` table.
+
+Pages submit work (PDF parses, web searches, report generation) and poll
+its status instead of running it inline under ``st.spinner``, so a rerun
+or a reloaded tab no longer loses it, and identical submissions from
+different sessions share one job and its result.
+
+Handlers register with ``@job_handler(kind, pool=...)``: ``"thread"`` for
+I/O-bound work (LLM and web calls), ``"process"`` for CPU-bound work on a
+spawn-based process pool (the thread pool stands in when a queue runs with
+no processes). Workers claim the highest-priority queued job with a single
+``UPDATE ... RETURNING`` and hold a lease while it runs; a job whose worker
+dies (server restart) is re-queued once its lease expires. Failures are
+retried with exponential backoff up to ``max_attempts``. Handlers report
+progress, and optionally a partial result, through ``JobContext.progress``.
+
+Workers start inside the Streamlit server on first use (JOB_WORKERS=1),
+or run standalone with ``python -m pm_os.jobs``.
+"""
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine, make_url
+from pm_os.cache import stable_key
+from pm_os.config import settings
+from pm_os.db import create_db_engine, engine as default_engine, write_transaction
+from pm_os.models import Job
+
+ACTIVE = ("queued", "running")
+FINISHED = ("done", "failed", "cancelled")
+
+# Modules whose import registers handlers; imported by every worker (including spawned processes).
+HANDLER_MODULES = ("pm_os.services.tasks",)
+
+class JobCancelled(Exception):
+    """Raised inside a handler once its job has been cancelled."""
+
+@dataclass(frozen=True)
+class JobHandler:
+    kind: str
+    fn: Callable
+    pool: str            # thread | process
+    max_attempts: int
+
+HANDLERS: dict[str, JobHandler] = {}
+
+def job_handler(kind: str, *, pool: str = "thread", max_attempts: int | None = None):
+    """Register ``fn(payload: dict, ctx: JobContext) -> result`` as the handler for ``kind``."""
+    def register(fn: Callable):
+        HANDLERS[kind] = JobHandler(kind, fn, pool, max_attempts or settings.job_max_attempts)
+        return fn
+    return register
+
+def load_handlers() -> dict[str, JobHandler]:
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+    return HANDLERS
+
+# Engines by URL, so a JobContext (which only carries the URL) writes to its queue's database.
+_ENGINES: dict[str, Engine] = {}
+
+def _url(eng: Engine) -> str:
+    return eng.url.render_as_string(hide_password=False)
+
+def _engine_for(url: str) -> Engine:
+    """The engine registered for ``url``; spawned worker processes open their own on first use."""
+    eng = _ENGINES.get(url)
+    if eng is None:
+        eng = _ENGINES.setdefault(url, create_db_engine(make_url(url).database or ""))
+    return eng
+
+_ENGINES[_url(default_engine)] = default_engine
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+def _loads(value: str | None):
+    return json.loads(value) if value else None
+
+@dataclass
+class JobContext:
+    """Passed to handlers; picklable so process-pool handlers can report progress too."""
+    job_id: int
+    attempt: int
+    max_attempts: int
+    db_url: str = _url(default_engine)     # database of the queue that claimed the job
+    PROGRESS_EVERY_S = 0.25
+    _last: float = 0.0
+
+    @property
+    def final_attempt(self) -> bool:
+        return self.attempt >= self.max_attempts
+
+    def progress(self, fraction: float, note: str | None = None, *, partial=None):
+        """
+        Record progress (0..1), a status note and optionally a partial result.
+        Plain progress updates are throttled; raises JobCancelled if the job
+        was cancelled or its lease was taken over.
+        """
+        now = time.monotonic()
+        if partial is None and fraction < 1.0 and now - self._last < self.PROGRESS_EVERY_S:
+            return
+        self._last = now
+        values = {"progress": max(0.0, min(1.0, fraction)),
+                  "lease_until": datetime.utcnow() + timedelta(seconds=settings.job_lease_s)}
+        if note is not None:
+            values["note"] = note[:300]
+        if partial is not None:
+            values["partial"] = _dumps(partial)
+        with _engine_for(self.db_url).begin() as conn:
+            updated = conn.execute(update(Job).where(Job.id == self.job_id, Job.status == "running",
+                                                     Job.attempts == self.attempt).values(**values)).rowcount
+        if not updated:
+            raise JobCancelled(f"job {self.job_id} is no longer running")
+
+def _as_dict(row) -> dict:
+    job = dict(row)
+    job["payload"] = _loads(job["payload"]) or {}
+    job["partial"] = _loads(job["partial"])
+    job["result"] = _loads(job["result"])
+    return job
+
+def submit(kind: str, payload: dict | None = None, *, priority: int = 0, dedupe: bool = True,
+           eng: Engine = default_engine) -> int:
+    """
+    Queue a ``kind`` job and return its id. With ``dedupe``, an identical
+    job (same kind and payload) that is queued, running or finished within
+    JOB_RESULT_TTL_S is returned instead of queueing another.
+    """
+    handler = load_handlers().get(kind)
+    if handler is None:
+        raise ValueError(f"Unknown job kind: {kind}")
+    payload = payload or {}
+    key = stable_key("job", kind, payload)
+    with write_transaction(eng) as conn:
+        if dedupe:
+            fresh = datetime.utcnow() - timedelta(seconds=settings.job_result_ttl_s)
+            existing = conn.execute(
+                select(Job.id).where(Job.dedupe_key == key,
+                                     (Job.status.in_(ACTIVE)) | ((Job.status == "done") & (Job.finished_at >= fresh)))
+                .order_by(Job.id.desc()).limit(1)
+            ).scalar()
+            if existing is not None:
+                return existing
+        job_id = conn.execute(insert(Job).values(
+            kind=kind, payload=_dumps(payload), dedupe_key=key, priority=priority,
+            max_attempts=handler.max_attempts, created_at=datetime.utcnow(), run_after=datetime.utcnow(),
+        )).inserted_primary_key[0]
+    if settings.job_workers_inprocess and eng is default_engine:
+        queue.start()
+    queue.wake()
+    return job_id
+
+def get(job_id: int, eng: Engine = default_engine) -> dict | None:
+    with eng.connect() as conn:
+        row = conn.execute(select(Job.__table__).where(Job.id == job_id)).mappings().first()
+    return _as_dict(row) if row else None
+
+def recent(limit: int = 50, eng: Engine = default_engine) -> list[dict]:
+    with eng.connect() as conn:
+        rows = conn.execute(select(Job.__table__).order_by(Job.id.desc()).limit(limit)).mappings().all()
+    return [_as_dict(r) for r in rows]
+
+def cancel(job_id: int, eng: Engine = default_engine) -> bool:
+    """Cancel a queued or running job; running handlers stop at their next progress report."""
+    with eng.begin() as conn:
+        return bool(conn.execute(update(Job).where(Job.id == job_id, Job.status.in_(ACTIVE))
+                                 .values(status="cancelled", finished_at=datetime.utcnow())).rowcount)
+
+def _execute(kind: str, job_id: int, payload: dict, attempt: int, max_attempts: int, db_url: str):
+    """Run one job's handler; module-level so process-pool workers can unpickle it."""
+    handler = load_handlers()[kind]
+    return handler.fn(payload, JobContext(job_id, attempt, max_attempts, db_url))
+
+def retry_delay_s(attempt: int) -> float:
+    return min(60.0, 2.0 ** attempt)
+
+class JobQueue:
+    """Claims queued jobs and runs them on a thread pool and a process pool."""
+    POLL_S = 0.5
+
+    def __init__(self, *, threads: int = settings.job_threads, processes: int = settings.job_processes,
+                 eng: Engine = default_engine):
+        self.engine = eng
+        self.db_url = _url(eng)
+        _ENGINES.setdefault(self.db_url, eng)
+        self.capacity = {"thread": max(1, threads), "process": max(0, processes)}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._running: dict[int, tuple[str, Future]] = {}
+        self._pools: dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            load_handlers()
+            self._pools["thread"] = ThreadPoolExecutor(self.capacity["thread"], thread_name_prefix="job")
+            if self.capacity["process"]:
+                self._pools["process"] = ProcessPoolExecutor(self.capacity["process"],
+                                                             mp_context=multiprocessing.get_context("spawn"))
+            self._thread = threading.Thread(target=self._run, name="job-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, wait: bool = True):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        last_lease = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - last_lease >= settings.job_lease_s / 3:
+                    self._renew_leases()
+                    self._requeue_expired()
+                    last_lease = time.monotonic()
+                while self._claim_next():
+                    pass
+            except Exception:
+                # A locked or not-yet-migrated database; try again on the next tick.
+                pass
+            self._wake.wait(self.POLL_S)
+            self._wake.clear()
+
+    def _pool_for(self, handler: JobHandler) -> str:
+        """Process-pool kinds run on the thread pool when there is no process pool (``processes=0``)."""
+        return handler.pool if handler.pool in self._pools else "thread"
+
+    def _free(self, pool: str) -> int:
+        with self._lock:
+            busy = sum(1 for p, _ in self._running.values() if p == pool)
+        return self.capacity[pool] - busy if pool in self._pools else 0
+
+    def _claim_next(self) -> bool:
+        kinds = [h.kind for h in HANDLERS.values() if self._free(self._pool_for(h)) > 0]
+        if not kinds:
+            return False
+        now = datetime.utcnow()
+        next_id = (select(Job.id).where(Job.status == "queued", Job.run_after <= now, Job.kind.in_(kinds))
+                   .order_by(Job.priority.desc(), Job.id).limit(1).scalar_subquery())
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                update(Job).where(Job.id == next_id, Job.status == "queued")
+                .values(status="running", worker=self.worker_id, attempts=Job.attempts + 1, started_at=now,
+                        lease_until=now + timedelta(seconds=settings.job_lease_s))
+                .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+            ).first()
+        if row is None:
+            return False
+        pool = self._pool_for(HANDLERS[row.kind])
+        future = self._pools[pool].submit(_execute, row.kind, row.id, _loads(row.payload) or {},
+                                          row.attempts, row.max_attempts, self.db_url)
+        with self._lock:
+            self._running[row.id] = (pool, future)
+        future.add_done_callback(lambda f, job_id=row.id, attempt=row.attempts, max_attempts=row.max_attempts:
+                                 self._finish(job_id, attempt, max_attempts, f))
+        return True
+
+    def _finish(self, job_id: int, attempt: int, max_attempts: int, future: Future):
+        with self._lock:
+            self._running.pop(job_id, None)
+        now = datetime.utcnow()
+        try:
+            values = {"status": "done", "result": _dumps(future.result()), "error": None, "progress": 1.0,
+                      "finished_at": now, "lease_until": None}
+        except JobCancelled:
+            values = None
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"[:500]
+            if attempt < max_attempts:
+                values = {"status": "queued", "error": error, "lease_until": None,
+                          "run_after": now + timedelta(seconds=retry_delay_s(attempt))}
+            else:
+                values = {"status": "failed", "error": error, "finished_at": now, "lease_until": None}
+        if values is not None:
+            # Only the worker still holding this attempt may record its outcome.
+            with self.engine.begin() as conn:
+                conn.execute(update(Job).where(Job.id == job_id, Job.status == "running", Job.attempts == attempt,
+                                               Job.worker == self.worker_id).values(**values))
+        self._wake.set()
+
+    def _renew_leases(self):
+        with self._lock:
+            ids = list(self._running)
+        if ids:
+            with self.engine.begin() as conn:
+                conn.execute(update(Job).where(Job.id.in_(ids), Job.status == "running", Job.worker == self.worker_id)
+                             .values(lease_until=datetime.utcnow() + timedelta(seconds=settings.job_lease_s)))
+
+    def _requeue_expired(self):
+        """Jobs whose worker stopped renewing its lease go back to the queue, or fail when out of attempts."""
+        now = datetime.utcnow()
+        expired = (Job.status == "running") & (Job.lease_until < now)
+        with self.engine.begin() as conn:
+            conn.execute(update(Job).where(expired, Job.attempts >= Job.max_attempts)
+                         .values(status="failed", error="worker lost", finished_at=now, lease_until=None))
+            conn.execute(update(Job).where(expired)
+                         .values(status="queued", error="worker lost", run_after=now, lease_until=None))
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = [p for p, _ in self._running.values()]
+        return {"started": self._thread is not None,
+                "running": {p: running.count(p) for p in self.capacity},
+                "capacity": dict(self.capacity)}
+
+queue = JobQueue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run pm_os background job workers.")
+    parser.add_argument("--threads", type=int, default=settings.job_threads)
+    parser.add_argument("--processes", type=int, default=settings.job_processes)
+    args = parser.parse_args()
+
+    from pm_os.db import init_db
+    init_db()
+    workers = JobQueue(threads=args.threads, processes=args.processes)
+    workers.start()
+    print(f"Job workers running ({args.threads} thread(s), {args.processes} process(es)); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        workers.stop(wait=False)
+
+if __name__ == "__main__":
+    main()
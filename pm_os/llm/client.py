@@ -1,9 +1,136 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterator
+from pm_os import schema
+from pm_os.cache import SQLiteCache, stable_key
 from pm_os.config import settings
 from pm_os.llm.demo_mode import demo_complete_json
+from pm_os.llm.provider import Completion, get_provider
+from pm_os.singleflight import flight_group
+from pm_os.telemetry import CallTimer, TelemetryRecorder, recorder
+
+# Process-wide response cache shared by every LLMClient (and every Streamlit session).
+response_cache = SQLiteCache(
+    settings.llm_cache_path,
+    ttl_seconds=settings.llm_cache_ttl_hours * 3600,
+    max_bytes=int(settings.llm_cache_max_mb * 1024 * 1024),
+)
+
+# Identical prompts in flight across sessions share one provider call.
+llm_flights = flight_group("llm")
+
+def _schema_instructions(schema_name: str) -> str:
+    model = getattr(schema, schema_name, None)
+    if model is None:
+        return ""
+    return f"\n\nRespond with a single JSON object matching this JSON schema:\n{json.dumps(model.model_json_schema())}"
 
 class LLMClient:
-    def complete_json(self, *, system: str, user: str, schema_name: str) -> dict:
-        if settings.demo_mode:
-            return demo_complete_json(system=system, user=user, schema_name=schema_name)
-        raise RuntimeError("LLM not configured. Set DEMO_MODE=1 or implement provider.")
+    def __init__(self, *, model: str = settings.llm_model, cache: SQLiteCache | None = response_cache,
+                 demo_mode: bool | None = None, service: str = "default",
+                 telemetry: TelemetryRecorder | None = recorder):
+        self.model = model
+        self.cache = cache if settings.llm_cache_enabled else None
+        self.demo_mode = settings.demo_mode if demo_mode is None else demo_mode
+        self.service = service
+        self.telemetry = telemetry
+
+    @property
+    def effective_model(self) -> str:
+        return "demo" if self.demo_mode else self.model
+
+    def cache_key(self, *, system: str, user: str, schema_name: str, **params) -> str:
+        return stable_key(system, user, schema_name, self.effective_model, params)
+
+    def complete_json(self, *, system: str, user: str, schema_name: str, bypass_cache: bool = False,
+                      **params) -> dict:
+        """
+        Return the JSON object for ``schema_name``. Responses are memoized on
+        (system, user, schema_name, model, params); pass ``bypass_cache=True``
+        to force a fresh call (the new result still refreshes the cache).
+        Identical calls already in flight anywhere in the process are joined
+        rather than repeated. Extra ``params`` (temperature, max_tokens,
+        timeout) go to the provider. Every call, cache hits and merged calls
+        included, is recorded to telemetry.
+        """
+        key = self.cache_key(system=system, user=user, schema_name=schema_name, **params)
+        with CallTimer(self.telemetry, service=self.service, kind="chat", schema_name=schema_name,
+                       model=self.effective_model) as call:
+            if self.cache is not None:
+                if bypass_cache:
+                    self.cache.record_bypass()
+                    call.cache_status = "bypass"
+                else:
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        call.cache_status = "hit"
+                        return cached
+                    call.cache_status = "miss"
+
+            completion, shared = llm_flights.do(
+                key, self._complete_and_store, key, system=system, user=user, schema_name=schema_name, **params
+            )
+            if shared:
+                call.cache_status = "merged"   # the leader's record carries the tokens and cost
+            else:
+                call.usage, call.retries = completion.usage, completion.retries
+            return completion.data
+
+    def _complete_and_store(self, key: str, **kwargs) -> Completion:
+        completion = self._complete(**kwargs)
+        if self.cache is not None:
+            self.cache.set(key, completion.data)
+        return completion
+
+    def iter_complete_json(self, requests: list[dict], *,
+                           max_concurrency: int = settings.llm_max_concurrency) -> Iterator[tuple[int, dict]]:
+        """
+        Run many ``complete_json`` calls (each a dict of its keyword arguments)
+        on a bounded thread pool and yield ``(index, result)`` as each one
+        finishes. A failed item yields ``{"error": "..."}`` instead of raising.
+        """
+        if not requests:
+            return
+        pool = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(requests))),
+                                  thread_name_prefix="llm-batch")
+        try:
+            futures = {pool.submit(self.complete_json, **req): i for i, req in enumerate(requests)}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], {"error": str(e)}
+        finally:
+            # Stop queued work if the consumer abandons the stream early.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def complete_json_many(self, requests: list[dict], *, max_concurrency: int = settings.llm_max_concurrency,
+                           on_result: Callable[[int, dict], None] | None = None) -> list[dict]:
+        """Batch form of ``complete_json``: results come back in request order."""
+        results: list[dict] = [{} for _ in requests]
+        for i, result in self.iter_complete_json(requests, max_concurrency=max_concurrency):
+            results[i] = result
+            if on_result:
+                on_result(i, result)
+        return results
+
+    def _complete(self, *, system: str, user: str, schema_name: str, **params) -> Completion:
+        if self.demo_mode:
+            return Completion(demo_complete_json(system=system, user=user, schema_name=schema_name))
+        return get_provider().chat_json(
+            system=system + _schema_instructions(schema_name), user=user, model=self.model, **params
+        )
 
+    def web_search(self, query: str, *, allowed_domains: list[str], timeout: float | None = None) -> dict:
+        """Run a Responses API web search; returns {"output": str, "sources": list}. Not cached."""
+        key = stable_key("web_search", query, sorted(allowed_domains), self.model)
+        with CallTimer(self.telemetry, service=self.service, kind="web_search", model=self.model) as call:
+            completion, shared = llm_flights.do(
+                key, get_provider().web_search,
+                query=query, allowed_domains=allowed_domains, model=self.model, timeout=timeout,
+            )
+            if shared:
+                call.cache_status = "merged"
+            else:
+                call.usage, call.retries = completion.usage, completion.retries
+            return completion.data
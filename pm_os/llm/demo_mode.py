@@ -1,8 +1,14 @@
-import random
+import hashlib
+import random as _random
+
+def stable_seed(*parts: str) -> int:
+    """Seed derived from sha256, so it is identical across processes (unlike the salted built-in hash())."""
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
 
 def demo_complete_json(*, system: str, user: str, schema_name: str) -> dict:
-    seed = abs(hash(user + schema_name)) % (10**6)
-    random.seed(seed)
+    # A private generator keeps concurrent callers from reseeding each other via the global one.
+    random = _random.Random(stable_seed(user, schema_name))
 
     if schema_name == "RelevanceResult":
         rel = random.choice(["High","Medium","Low"])
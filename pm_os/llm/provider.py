@@ -0,0 +1,184 @@
+"""
+Process-wide OpenAI provider used by LLMClient in real mode.
+
+One OpenAI client (and therefore one keep-alive HTTP connection pool) is
+shared by every Streamlit session. Calls pass through a token-bucket rate
+limiter for requests/minute and tokens/minute, retry 429/5xx/connection
+errors with exponential backoff and jitter, and carry per-call timeouts.
+"""
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+import openai
+from openai import OpenAI
+from pm_os.config import settings
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+@dataclass
+class Completion:
+    data: dict
+    usage: dict = field(default_factory=dict)   # prompt_tokens / completion_tokens
+    retries: int = 0
+
+class TokenBucket:
+    """Blocking token bucket refilled continuously at ``per_minute`` / 60 per second."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0, timeout: float | None = None) -> bool:
+        amount = min(amount, self.capacity)   # an oversized request waits for a full bucket, not forever
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return True
+                wait = (amount - self.tokens) / self.rate
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    def release(self, amount: float = 1.0):
+        """Return tokens taken by an ``acquire`` whose call never went out."""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+            self._cond.notify_all()
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, estimated_tokens: int, timeout: float | None = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self.requests.acquire(1, timeout):
+            raise TimeoutError("Timed out waiting for LLM rate limit capacity")
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not self.tokens.acquire(estimated_tokens, remaining):
+            self.requests.release(1)   # the call is not made, so it must not count against requests/minute
+            raise TimeoutError("Timed out waiting for LLM rate limit capacity")
+
+def estimate_tokens(*texts: str) -> int:
+    """Cheap upper-bound estimate (~4 characters per token) used for rate limiting."""
+    return sum(len(t) for t in texts) // 4 + 1
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), settings.llm_backoff_max_s)
+        except ValueError:
+            pass
+    base = min(settings.llm_backoff_max_s, settings.llm_backoff_base_s * 2 ** attempt)
+    return base * random.uniform(0.5, 1.0)
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+def _usage(response) -> dict:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    prompt = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", 0)
+    completion = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", 0)
+    return {"prompt_tokens": prompt or 0, "completion_tokens": completion or 0}
+
+class OpenAIProvider:
+    def __init__(self, *, api_key: str, base_url: str | None = None, timeout: float = 60.0,
+                 max_retries: int = 4, requests_per_minute: float = 500, tokens_per_minute: float = 200_000):
+        # SDK-level retries are disabled so the backoff policy and rate limiter below own them.
+        self.client = OpenAI(api_key=api_key, base_url=base_url or None, timeout=timeout, max_retries=0)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+    def _call(self, fn, *, estimated_tokens: int, timeout: float | None, **kwargs):
+        attempt = 0
+        while True:
+            self.limiter.acquire(estimated_tokens, timeout=timeout or self.timeout)
+            try:
+                return fn(timeout=timeout or self.timeout, **kwargs), attempt
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                time.sleep(_retry_delay(attempt, e))
+                attempt += 1
+
+    def chat_json(self, *, system: str, user: str, model: str, temperature: float | None = None,
+                  max_tokens: int | None = None, timeout: float | None = None) -> Completion:
+        kwargs = {}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        response, retries = self._call(
+            self.client.chat.completions.create,
+            estimated_tokens=estimate_tokens(system, user) + (max_tokens or 1_000),
+            timeout=timeout,
+            model=model,
+            messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
+            response_format={"type": "json_object"},
+            **kwargs,
+        )
+        return Completion(json.loads(response.choices[0].message.content), _usage(response), retries)
+
+    def web_search(self, *, query: str, allowed_domains: list[str], model: str,
+                   timeout: float | None = None) -> Completion:
+        response, retries = self._call(
+            self.client.responses.create,
+            estimated_tokens=estimate_tokens(query) + 4_000,
+            timeout=timeout or settings.llm_web_search_timeout_s,
+            model=model,
+            tools=[{"type": "web_search", "filters": {"allowed_domains": allowed_domains}}],
+            tool_choice="auto",
+            include=["web_search_call.action.sources"],
+            input=query,
+        )
+        data = {
+            "output": response.output_text,
+            "sources": getattr(response, "sources", []) if hasattr(response, "sources") else [],
+        }
+        return Completion(data, _usage(response), retries)
+
+_provider: OpenAIProvider | None = None
+_provider_lock = threading.Lock()
+
+def get_provider() -> OpenAIProvider:
+    """The shared provider, created on first use from settings."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if not settings.openai_api_key:
+                raise RuntimeError("OpenAI API key not configured. Please set OPENAI_API_KEY in your environment.")
+            _provider = OpenAIProvider(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url,
+                timeout=settings.llm_timeout_s,
+                max_retries=settings.llm_max_retries,
+                requests_per_minute=settings.llm_requests_per_minute,
+                tokens_per_minute=settings.llm_tokens_per_minute,
+            )
+        return _provider
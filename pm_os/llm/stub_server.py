@@ -0,0 +1,222 @@
+"""
+Local stand-in for the OpenAI endpoints pm_os uses, for load testing.
+
+Serves POST /v1/chat/completions (JSON mode) and POST /v1/responses
+(web search) with deterministic bodies, plus GET /stats. Latency, error
+rate and a requests/second ceiling are configurable, so the whole app,
+provider retries and rate limiting included, can be exercised offline:
+
+    python -m pm_os.llm.stub_server --port 8799 --latency-ms 800 --error-rate 0.05 --rps 20
+    OPENAI_BASE_URL=http://127.0.0.1:8799/v1 OPENAI_API_KEY=stub DEMO_MODE=0 streamlit run app.py
+
+Chat responses reuse demo_mode for schemas it knows; for the document
+parser prompts, which embed a JSON template in the system message, the
+template itself is turned into a response skeleton.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pm_os.llm.demo_mode import demo_complete_json, stable_seed
+from pm_os.llm.provider import TokenBucket, estimate_tokens
+
+SCHEMA_MARKER = "matching this JSON schema:\n"
+_UNQUOTED_VALUE_RE = re.compile(r':[ \t]*(?![ \t"\[{]|null\b|true\b|false\b|-?\d)[^\n]*?(,?)[ \t]*$', re.M)
+
+def _template_skeleton(system: str) -> dict:
+    """Best-effort JSON object from a prompt's inline template ("numeric value ..." placeholders become 1.0)."""
+    start, end = system.find("{"), system.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        return json.loads(_UNQUOTED_VALUE_RE.sub(r": 1.0\1", system[start:end + 1]))
+    except ValueError:
+        return {}
+
+def fake_chat_json(system: str, user: str) -> dict:
+    if SCHEMA_MARKER in system:
+        head, schema_json = system.split(SCHEMA_MARKER, 1)
+        try:
+            schema_name = json.loads(schema_json).get("title", "")
+        except ValueError:
+            schema_name = ""
+        data = demo_complete_json(system=head, user=user, schema_name=schema_name)
+        if data:
+            return data
+        system = head
+    return _template_skeleton(system)
+
+def fake_web_search(query: str) -> str:
+    n = stable_seed(query) % 3 + 2
+    lines = [f"- Stub headline {i + 1} for: {query[:80]}" for i in range(n)]
+    return "Stub web search results (no network):\n" + "\n".join(lines)
+
+class StubState:
+    def __init__(self, *, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rps: float | None = None, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.bucket = None
+        if rps:
+            self.bucket = TokenBucket(rps * 60)
+            self.bucket.capacity = self.bucket.tokens = max(1.0, rps)   # burst of one second, not one minute
+        self._counter = 0
+        self._seed = seed
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "errors_injected": 0, "rate_limited": 0, "bad_requests": 0}
+
+    def count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def next_draw(self) -> float:
+        """Deterministic pseudo-random draw in [0, 1) per request, for error injection and jitter."""
+        with self._lock:
+            self._counter += 1
+            n = self._counter
+        return stable_seed(str(self._seed), str(n)) / 2 ** 64
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "pm-os-stub/1.0"
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real API
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict | None = None):
+        blob = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(blob)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(blob)
+
+    def _error(self, status: int, message: str, kind: str, headers: dict | None = None):
+        self._send(status, {"error": {"message": message, "type": kind, "code": None, "param": None}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send(200, dict(self.state.stats))
+        else:
+            self._error(404, f"Unknown path {self.path}", "invalid_request_error")
+
+    def do_POST(self):
+        state = self.state
+        state.count("requests")
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            state.count("bad_requests")
+            return self._error(400, "Body is not valid JSON", "invalid_request_error")
+
+        if state.bucket is not None and not state.bucket.acquire(1, timeout=0):
+            state.count("rate_limited")
+            return self._error(429, "Rate limit reached (stub)", "rate_limit_error", {"Retry-After": "1"})
+
+        draw = state.next_draw()
+        time.sleep(max(0.0, state.latency_ms + (draw * 2 - 1) * state.jitter_ms) / 1000)
+        if draw < state.error_rate:
+            state.count("errors_injected")
+            return self._error(500, "Injected failure (stub)", "server_error")
+
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            body = self._chat(payload)
+        elif path.endswith("/responses"):
+            body = self._responses(payload)
+        else:
+            state.count("bad_requests")
+            return self._error(404, f"Unknown path {self.path}", "invalid_request_error")
+        state.count("ok")
+        self._send(200, body)
+
+    def _chat(self, payload: dict) -> dict:
+        messages = payload.get("messages") or []
+        system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        user = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+        content = json.dumps(fake_chat_json(system, user))
+        prompt_tokens, completion_tokens = estimate_tokens(system, user), estimate_tokens(content)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _responses(self, payload: dict) -> dict:
+        query = payload.get("input") if isinstance(payload.get("input"), str) else json.dumps(payload.get("input"))
+        text = fake_web_search(query)
+        input_tokens, output_tokens = estimate_tokens(query), estimate_tokens(text)
+        return {
+            "id": f"resp_{uuid.uuid4().hex[:24]}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": payload.get("model", "stub"),
+            "output": [{
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex[:24]}",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "parallel_tool_calls": True,
+            "tool_choice": payload.get("tool_choice", "auto"),
+            "tools": payload.get("tools", []),
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                      "total_tokens": input_tokens + output_tokens,
+                      "input_tokens_details": {"cached_tokens": 0},
+                      "output_tokens_details": {"reasoning_tokens": 0}},
+        }
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, **options) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; ``port=0`` picks a free port (see ``server.server_address``)."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(**options)
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub server for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- spread around the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rps", type=float, default=None, help="requests/second ceiling; excess gets 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                             error_rate=args.error_rate, rps=args.rps, seed=args.seed)
+    print(f"Stub OpenAI API on http://{args.host}:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Versioned schema migrations for the pm_os SQLite database.
+
+The applied version lives in ``PRAGMA user_version``. Each migration runs in
+its own transaction and is written to be safe on both a fresh database and
+an existing ``pm_os.sqlite`` created by an older release.
+"""
+import hashlib
+from typing import Callable
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+from pm_os.models import Base
+from pm_os.tags import TAG_LINKS, install_tag_triggers, backfill_tags
+from pm_os.fts import CHUNK_INDEX, FTS_INDEXES, install_fts_index
+from pm_os.revisions import REVISION_TABLES, install_revision_triggers
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = []
+
+def migration(version: int, description: str):
+    def register(fn: Callable[[Connection], None]):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+def current_version(conn: Connection) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+def _create_tables(conn: Connection, *names: str):
+    Base.metadata.create_all(conn, tables=[Base.metadata.tables[n] for n in names], checkfirst=True)
+
+def _create_indexes(conn: Connection, *table_names: str):
+    for name in table_names:
+        for index in Base.metadata.tables[name].indexes:
+            index.create(conn, checkfirst=True)
+
+def _has_foreign_key(conn: Connection, table: str, column: str) -> bool:
+    rows = conn.exec_driver_sql(f"PRAGMA foreign_key_list({table})").all()
+    return any(r[3] == column for r in rows)
+
+def _rebuild_table(conn: Connection, name: str):
+    """SQLite cannot ALTER in a constraint; recreate the table from the model and copy rows."""
+    old_columns = [c["name"] for c in inspect(conn).get_columns(name)]
+    conn.exec_driver_sql(f"ALTER TABLE {name} RENAME TO _old_{name}")
+    Base.metadata.tables[name].create(conn)
+    cols = ", ".join(old_columns)
+    conn.exec_driver_sql(f"INSERT INTO {name} ({cols}) SELECT {cols} FROM _old_{name}")
+    conn.exec_driver_sql(f"DROP TABLE _old_{name}")
+
+@migration(1, "baseline tables")
+def _m001_baseline(conn: Connection):
+    _create_tables(conn, "companies", "deals", "emails", "market_snippets", "documents", "covenants")
+
+@migration(2, "deal foreign keys and access-path indexes")
+def _m002_indexes(conn: Connection):
+    for table in ("documents", "covenants"):
+        if not _has_foreign_key(conn, table, "deal_id"):
+            _rebuild_table(conn, table)
+    _create_indexes(conn, "deals", "emails", "market_snippets", "documents", "covenants")
+
+@migration(3, "normalized tag tables")
+def _m003_tags(conn: Connection):
+    _create_tables(conn, "tags", *(link.link.name for link in TAG_LINKS.values()))
+    for link in TAG_LINKS.values():
+        install_tag_triggers(conn, link)
+        backfill_tags(conn, link)
+
+@migration(4, "FTS5 full-text indexes")
+def _m004_fts(conn: Connection):
+    for idx in FTS_INDEXES.values():
+        install_fts_index(conn, idx)
+
+@migration(5, "LP and contact tables")
+def _m005_lps_contacts(conn: Connection):
+    _create_tables(conn, "lps", "contacts")
+
+@migration(6, "tag triggers safe under upserts")
+def _m006_tag_triggers(conn: Connection):
+    for link in TAG_LINKS.values():
+        install_tag_triggers(conn, link)
+
+@migration(7, "LLM call telemetry")
+def _m007_llm_calls(conn: Connection):
+    _create_tables(conn, "llm_calls")
+
+@migration(8, "background job queue")
+def _m008_jobs(conn: Connection):
+    _create_tables(conn, "jobs")
+
+@migration(9, "document content hashes")
+def _m009_document_hash(conn: Connection):
+    if "content_hash" not in {c["name"] for c in inspect(conn).get_columns("documents")}:
+        conn.exec_driver_sql("ALTER TABLE documents ADD COLUMN content_hash VARCHAR(64)")
+    _create_indexes(conn, "documents")
+
+@migration(10, "retrieval passages with a BM25 index")
+def _m010_doc_chunks(conn: Connection):
+    _create_tables(conn, "doc_chunks")
+    install_fts_index(conn, CHUNK_INDEX)
+
+@migration(11, "typed covenant fields for rule-based extraction")
+def _m011_covenant_fields(conn: Connection):
+    columns = {c["name"] for c in inspect(conn).get_columns("covenants")}
+    for name, ddl in (("document_id", "INTEGER"), ("section", "VARCHAR(40) NOT NULL DEFAULT ''"),
+                      ("operator", "VARCHAR(2) NOT NULL DEFAULT ''"), ("threshold_value", "FLOAT"),
+                      ("extraction", "VARCHAR(10) NOT NULL DEFAULT ''")):
+        if name not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE covenants ADD COLUMN {name} {ddl}")
+    _create_indexes(conn, "covenants")
+
+@migration(12, "tag triggers safe for control characters")
+def _m012_tag_triggers(conn: Connection):
+    for link in TAG_LINKS.values():
+        install_tag_triggers(conn, link)
+        backfill_tags(conn, link)
+
+def install_document_chunk_triggers(conn: Connection):
+    """Drop a Document's retrieval passages when its text changes or the row is deleted."""
+    drop = "DELETE FROM doc_chunks WHERE source = 'document:' || OLD.id"
+    for name, when in (("au", "AFTER UPDATE OF text ON documents WHEN OLD.text IS NOT NEW.text"),
+                       ("ad", "AFTER DELETE ON documents")):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS trg_documents_chunks_{name}")
+        conn.exec_driver_sql(f"CREATE TRIGGER trg_documents_chunks_{name} {when} BEGIN {drop}; END")
+
+@migration(13, "drop stale and orphaned document passages")
+def _m013_document_chunk_triggers(conn: Connection):
+    install_document_chunk_triggers(conn)
+    indexed = conn.exec_driver_sql(
+        "SELECT DISTINCT c.source, c.source_hash, d.text FROM doc_chunks c "
+        "LEFT JOIN documents d ON c.source = 'document:' || d.id WHERE c.source LIKE 'document:%'").all()
+    stale = [(source,) for source, digest, text in indexed
+             if text is None or hashlib.sha256(text.encode("utf-8")).hexdigest() != digest]
+    if stale:
+        conn.exec_driver_sql("DELETE FROM doc_chunks WHERE source = ?", stale)
+
+@migration(14, "content revision counters")
+def _m014_content_revisions(conn: Connection):
+    _create_tables(conn, "content_revisions")
+    for table in REVISION_TABLES:
+        install_revision_triggers(conn, table)
+
+@migration(15, "content change log for the vector index")
+def _m015_content_changes(conn: Connection):
+    _create_tables(conn, "content_changes")
+    for table in REVISION_TABLES:
+        install_revision_triggers(conn, table)
+
+def run_migrations(engine: Engine) -> list[int]:
+    """Apply pending migrations in order and return the versions that ran."""
+    applied = []
+    with engine.connect() as conn:
+        # Table rebuilds must not trip FK enforcement; the pragma is a no-op inside a transaction.
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.commit()
+        version = current_version(conn)
+        conn.commit()
+        for target, description, fn in MIGRATIONS:
+            if target <= version:
+                continue
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                fn(conn)
+                violations = conn.exec_driver_sql("PRAGMA foreign_key_check").all()
+                if violations:
+                    raise RuntimeError(f"Migration {target} ({description}) left {len(violations)} foreign key violation(s)")
+                conn.exec_driver_sql(f"PRAGMA user_version={target}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(target)
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        conn.commit()
+    return applied
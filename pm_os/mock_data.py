@@ -1,40 +1,295 @@
+import argparse
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import pandas as pd
-from pm_os.db import SessionLocal
-from pm_os.models import Company, Deal, Email, MarketSnippet, Document, Covenant
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from pm_os.db import init_db, write_transaction
+from pm_os.fts import FTS_INDEXES, drop_fts_triggers, install_fts_index, optimize_fts_indexes
+from pm_os.models import Company, Deal, Email, MarketSnippet, Document, Covenant, LP, Contact
+from pm_os.revisions import REVISION_TABLES, bump_revision, drop_revision_triggers, install_revision_triggers
+from pm_os.tags import TAG_LINKS, drop_tag_triggers, install_tag_triggers, backfill_tags
 
-def seed_from_csv():
-    db = SessionLocal()
+SEED_DIR = "data/seed"
 
-    def load(path): return pd.read_csv(path)
+# Load order respects foreign keys (deals -> companies, documents/covenants -> deals).
+SEED_FILES = [
+    (Company, "companies.csv"),
+    (Deal, "deals.csv"),
+    (Email, "emails.csv"),
+    (MarketSnippet, "market_snippets.csv"),
+    (Document, "documents.csv"),
+    (Covenant, "covenants.csv"),
+    (LP, "lps.csv"),
+    (Contact, "contacts.csv"),
+]
 
-    companies = load("data/seed/companies.csv")
-    for _, r in companies.iterrows():
-        db.add(Company(name=r["name"], sector=r["sector"], tags=r.get("tags","")))
+def upsert_rows(conn: Connection, model, rows: list[dict], batch_size: int = 5_000, *,
+                update: bool = True) -> int:
+    """
+    Insert rows keyed by ``id``, updating existing rows only where a value
+    actually changed (or leaving them untouched when ``update`` is False).
+    Runs as one executemany per batch.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    columns = [c for c in rows[0] if c in table.c]
+    updatable = [c for c in columns if c != "id"]
+    for start in range(0, len(rows), batch_size):
+        batch = [{c: r[c] for c in columns} for r in rows[start:start + batch_size]]
+        stmt = sqlite_insert(table)
+        if update and updatable:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.id],
+                set_={c: stmt.excluded[c] for c in updatable},
+                where=or_(*(table.c[c].is_distinct_from(stmt.excluded[c]) for c in updatable)),
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.id])
+        conn.execute(stmt, batch)
+    return len(rows)
 
-    db.commit()
+def seed_from_csv(seed_dir: str = SEED_DIR, *, refresh: bool = False) -> dict:
+    """
+    Load the CSV seed set. Safe to call on every start: missing rows are
+    inserted by id and existing rows (including user edits) are left alone.
+    ``refresh`` overwrites existing rows with the CSV values instead.
+    """
+    counts = {}
+    with write_transaction() as conn:
+        for model, filename in SEED_FILES:
+            df = pd.read_csv(f"{seed_dir}/{filename}", keep_default_na=False)
+            counts[model.__tablename__] = upsert_rows(conn, model, df.to_dict("records"), update=refresh)
+    return counts
 
-    deals = load("data/seed/deals.csv")
-    for _, r in deals.iterrows():
-        db.add(Deal(company_id=int(r["company_id"]), deal_type=r["deal_type"], stage=r["stage"],
-                    thesis_tags=r.get("thesis_tags",""), score=float(r.get("score",0)), owner=r.get("owner","")))
+@contextmanager
+def deferred_indexing(conn: Connection, models: list):
+    """
+    Drop the tag, FTS and revision triggers for ``models`` during a bulk
+    load, then rebuild those indexes in one pass. Much faster than paying
+    trigger cost per row for hundreds of thousands of inserts.
+    """
+    tables = {m.__tablename__ for m in models}
+    tag_links = [link for link in TAG_LINKS.values() if link.table in tables]
+    fts = [idx for idx in FTS_INDEXES.values() if idx.table in tables]
+    revised = [t for t in REVISION_TABLES if t in tables]
+    for link in tag_links:
+        drop_tag_triggers(conn, link)
+    for idx in fts:
+        drop_fts_triggers(conn, idx)
+    for table in revised:
+        drop_revision_triggers(conn, table)
+    yield
+    for link in tag_links:
+        install_tag_triggers(conn, link)
+        backfill_tags(conn, link)
+    for idx in fts:
+        install_fts_index(conn, idx)
+    for table in revised:
+        install_revision_triggers(conn, table)
+        bump_revision(conn, table)
+    optimize_fts_indexes(conn)
 
-    emails = load("data/seed/emails.csv")
-    for _, r in emails.iterrows():
-        db.add(Email(sender=r["sender"], subject=r["subject"], body=r["body"]))
+# --- Synthetic corpus --------------------------------------------------------
 
-    snippets = load("data/seed/market_snippets.csv")
-    for _, r in snippets.iterrows():
-        db.add(MarketSnippet(source=r["source"], title=r["title"], text=r["text"]))
+SYNTHETIC_ID_BASE = 10_000_000
 
-    docs = load("data/seed/documents.csv")
-    for _, r in docs.iterrows():
-        db.add(Document(deal_id=int(r["deal_id"]), doc_type=r["doc_type"], version=r["version"], text=r["text"]))
+_SECTORS = {
+    "Power": ["power", "grid"],
+    "EV": ["ev", "charging"],
+    "Sustainability": ["solar", "renewable"],
+    "Storage": ["storage", "grid"],
+    "Wind": ["wind", "renewable"],
+    "Hydrogen": ["hydrogen", "energy"],
+    "Healthcare": ["healthcare", "services"],
+}
+_NAME_A = ["Grid", "Volt", "Solar", "Terra", "Helio", "Aero", "Blue", "Green", "North", "Apex",
+           "Pontal", "Ceiba", "Serra", "Virtue", "Roam", "Summit", "Harbor", "Prairie", "Ridge", "Delta"]
+_NAME_B = ["Flex", "Charge", "Span", "Power", "Wind", "Storage", "Energy", "Networks", "Renewables",
+           "Infrastructure", "Capital", "Holdings", "Partners", "Systems", "Grid", "Fuels"]
+_NAME_C = ["LLC", "Inc.", "Holdings", "Partners", "Group", "Ltd."]
+_BANKS = ["jefferies.com", "ms.com", "gs.com", "jpmorgan.com", "barclays.com", "rbc.com", "citi.com", "bofa.com"]
+_SOURCES = ["Bloomberg", "Reuters", "Preqin", "S&P Global", "WoodMac", "IEA", "FT", "PitchBook"]
+_REGIONS = ["PJM", "ERCOT", "CAISO", "MISO", "ISO-NE", "SPP", "NYISO", "UK", "Brazil", "Germany"]
+_STAGES = ["idea", "diligence", "ic", "closed", "portfolio"]
+_OWNERS = ["Analyst", "Associate", "VP", "Principal", "MD"]
+_SUBJECTS = [
+    "{sector} weekly update", "{company} - Q{q} trading update", "{region} market note",
+    "Re: {company} diligence follow-up", "{sector} deal flow: {company}", "LP question on {sector} exposure",
+    "Intro: {company} management", "{company} lender presentation", "Rates and {sector} valuation comps",
+]
+_SENTENCES = [
+    "{region} power prices moved {pct}% week-over-week as grid capex plans were revised.",
+    "{company} reported revenue growth of {pct}% YoY with EBITDA margin of {margin}%.",
+    "Transmission investment plans increased by {pct}% across {region}.",
+    "Leverage at {company} stands at {lev}x Debt to EBITDA against a covenant of {cov}x.",
+    "Battery input costs declined {pct}% month-over-month while lithium remained volatile.",
+    "Utilization across Level 3 chargers improved to {margin}% in the quarter.",
+    "Management expects to close the ${size}M refinancing by Q{q}.",
+    "LPs surveyed indicate {margin}% plan to increase allocations to energy transition funds.",
+    "Interconnection queues in {region} lengthened by {pct}% with {size} GW awaiting study.",
+    "Applicable margin on the term loan was set at S+{bps} with a {floor}% floor.",
+    "Minimum liquidity headroom narrowed to ${size}M following the capex program.",
+    "Rate cases remain a watch item with regulatory approvals pending in {region}.",
+    "Spreads on {sector} private credit tightened {bps} bps over the quarter.",
+    "Key takeaway: {sector} investment is accelerating faster than expected.",
+]
+_COVENANT_CLAUSES = [
+    "({letter}) Leverage Ratio: Borrower shall maintain a ratio of Debt to EBITDA not to exceed {lev}x as of the last day of each fiscal quarter.",
+    "({letter}) Fixed Charge Coverage: Borrower shall maintain Fixed Charge Coverage Ratio of at least {fccr}x.",
+    "({letter}) Minimum Liquidity: Borrower shall maintain unrestricted cash and equivalents of at least ${liq:,}.",
+    "({letter}) Debt Service Coverage: Borrower shall maintain a Debt Service Coverage Ratio of not less than {dscr}x measured quarterly.",
+    "({letter}) Interest Coverage: the ratio of EBITDA to Interest Expense shall not be less than {icr}x.",
+    "({letter}) Capital Expenditures: Capital Expenditures shall not exceed ${capex:,} in any fiscal year.",
+]
 
-    covs = load("data/seed/covenants.csv")
-    for _, r in covs.iterrows():
-        db.add(Covenant(deal_id=int(r["deal_id"]), covenant_type=r["covenant_type"], threshold=r["threshold"],
-                        test_frequency=r["test_frequency"], next_due_date=r["next_due_date"], source_note=r.get("source_note","")))
+def _company_name(rng: random.Random) -> str:
+    return f"{rng.choice(_NAME_A)}{rng.choice(_NAME_B)} {rng.choice(_NAME_C)}"
 
-    db.commit()
-    db.close()
+def _fill(template: str, rng: random.Random, company: str, sector: str) -> str:
+    return template.format(
+        company=company, sector=sector, region=rng.choice(_REGIONS), q=rng.randint(1, 4),
+        pct=round(rng.uniform(1, 40), 1), margin=rng.randint(12, 65), lev=round(rng.uniform(3, 7), 1),
+        cov=round(rng.uniform(4, 7.5), 1), size=rng.randint(5, 900), bps=rng.choice([25, 50, 75, 100, 125]),
+        floor=rng.choice([0.5, 0.75, 1.0]),
+    )
 
+def _paragraph(rng: random.Random, company: str, sector: str, n: int) -> str:
+    return " ".join(_fill(rng.choice(_SENTENCES), rng, company, sector) for _ in range(n))
+
+def _credit_agreement(rng: random.Random, company: str, sector: str, version: int) -> str:
+    lev = round(rng.uniform(3.5, 6.5) - 0.25 * (version - 1), 2)
+    clauses = [
+        t.format(letter="abcdef"[i], lev=lev, fccr=round(rng.uniform(1.1, 1.5), 2),
+                 liq=rng.randint(5, 30) * 1_000_000, dscr=round(rng.uniform(1.1, 1.4), 2),
+                 icr=round(rng.uniform(2, 4), 2), capex=rng.randint(5, 40) * 1_000_000)
+        for i, t in enumerate(rng.sample(_COVENANT_CLAUSES, k=rng.randint(3, 6)))
+    ]
+    facility = rng.randint(20, 500) * 1_000_000
+    title = "CREDIT AGREEMENT" if version == 1 else f"AMENDMENT NO. {version - 1} TO CREDIT AGREEMENT"
+    return (
+        f"{title} dated as of {rng.choice(['January', 'March', 'June', 'October'])} {rng.randint(1, 28)}, "
+        f"{rng.randint(2019, 2025)} among {company.upper()} as Borrower, the Lenders party hereto, and "
+        f"DENHAM CAPITAL as Administrative Agent. SECTION 1 - DEFINITIONS. \"EBITDA\" means consolidated net "
+        f"income plus interest expense, taxes, depreciation and amortization. SECTION 2 - CREDIT FACILITY. The "
+        f"Lenders agree to provide a ${facility:,} senior secured term loan bearing interest at S+"
+        f"{rng.choice([375, 450, 500, 550, 575, 625])}. SECTION 3 - FINANCIAL COVENANTS. {' '.join(clauses)} "
+        f"SECTION 4 - REPORTING REQUIREMENTS. Borrower shall deliver monthly financial statements within "
+        f"{rng.choice([20, 30, 45])} days of month end and quarterly compliance certificates within "
+        f"{rng.choice([30, 45, 60])} days of quarter end. SECTION 5 - COLLATERAL. First priority liens on all "
+        f"assets of Borrower. SECTION 6 - EVENTS OF DEFAULT. Cross-default to other indebtedness exceeding "
+        f"${rng.randint(2, 20) * 1_000_000:,}. {_paragraph(rng, company, sector, rng.randint(4, 12))}"
+    )
+
+def _cim(rng: random.Random, company: str, sector: str) -> str:
+    return (
+        f"CONFIDENTIAL INFORMATION MEMORANDUM - {company.upper()}. EXECUTIVE SUMMARY: {company} is a "
+        f"{sector.lower()} platform. {_paragraph(rng, company, sector, rng.randint(8, 20))} INVESTMENT "
+        f"HIGHLIGHTS: {_paragraph(rng, company, sector, rng.randint(4, 8))} KEY RISKS: "
+        f"{_paragraph(rng, company, sector, rng.randint(2, 5))}"
+    )
+
+def _synthetic_rows(kind: str, n: int, rng: random.Random, companies: list[dict], start: datetime):
+    """Yield rows of one kind; ids are stable for a given seed so re-runs upsert in place."""
+    span = 3 * 365 * 24 * 3600
+    for i in range(n):
+        c = companies[rng.randrange(len(companies))] if companies else None
+        if kind == "emails":
+            sender = f"{rng.choice(['research', 'coverage', 'ir', 'deals'])}@{rng.choice(_BANKS)}"
+            yield {
+                "id": SYNTHETIC_ID_BASE + i, "sender": sender,
+                "subject": _fill(rng.choice(_SUBJECTS), rng, c["name"], c["sector"]),
+                "body": _paragraph(rng, c["name"], c["sector"], rng.randint(3, 8)),
+                "received_at": start + timedelta(seconds=rng.randrange(span)),
+                "tags": ",".join(_SECTORS[c["sector"]][: rng.randint(1, 2)]),
+                "linked_deal_id": c["id"] if rng.random() < 0.3 else None,
+            }
+        elif kind == "market_snippets":
+            yield {
+                "id": SYNTHETIC_ID_BASE + i, "source": rng.choice(_SOURCES),
+                "title": _fill(rng.choice(_SUBJECTS), rng, c["name"], c["sector"]),
+                "text": _paragraph(rng, c["name"], c["sector"], rng.randint(4, 10)),
+                "published_at": start + timedelta(seconds=rng.randrange(span)),
+                "tags": ",".join(_SECTORS[c["sector"]]),
+            }
+        elif kind == "documents":
+            credit = rng.random() < 0.6
+            version = rng.randint(1, 3) if credit else 1
+            yield {
+                "id": SYNTHETIC_ID_BASE + i, "deal_id": c["id"],
+                "doc_type": ("credit_agreement" if version == 1 else "amendment") if credit else "cim",
+                "version": f"v{version}",
+                "text": _credit_agreement(rng, c["name"], c["sector"], version) if credit
+                        else _cim(rng, c["name"], c["sector"]),
+            }
+
+def generate_synthetic_corpus(companies: int = 10_000, emails: int = 1_000_000, snippets: int = 100_000,
+                              documents: int = 50_000, *, seed: int = 7, batch_size: int = 5_000,
+                              progress=print) -> dict:
+    """
+    Write a production-scale synthetic data set (one deal per company) for
+    benchmarking. Deterministic for a given seed and idempotent: synthetic
+    ids start at SYNTHETIC_ID_BASE, so re-running upserts the same rows.
+    Returns row counts and seconds per table.
+    """
+    rng = random.Random(seed)
+    start = datetime(2022, 1, 1)
+    company_rows, deal_rows = [], []
+    for i in range(companies):
+        sector = rng.choice(list(_SECTORS))
+        cid = SYNTHETIC_ID_BASE + i
+        company_rows.append({"id": cid, "name": _company_name(rng), "sector": sector,
+                             "tags": ",".join(_SECTORS[sector])})
+        deal_rows.append({"id": cid, "company_id": cid, "deal_type": rng.choice(["equity", "credit"]),
+                          "stage": rng.choice(_STAGES), "thesis_tags": ",".join(_SECTORS[sector]),
+                          "score": round(rng.uniform(40, 95), 1), "owner": rng.choice(_OWNERS)})
+
+    stats = {}
+    with write_transaction() as conn, deferred_indexing(conn, [Company, Deal, Email, MarketSnippet, Document]):
+        t0 = time.perf_counter()
+        upsert_rows(conn, Company, company_rows, batch_size)
+        upsert_rows(conn, Deal, deal_rows, batch_size)
+        stats["companies"] = (companies, time.perf_counter() - t0)
+        for model, kind, n in ((Email, "emails", emails), (MarketSnippet, "market_snippets", snippets),
+                               (Document, "documents", documents)):
+            t0 = time.perf_counter()
+            batch = []
+            for row in _synthetic_rows(kind, n, rng, company_rows, start):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    upsert_rows(conn, model, batch, batch_size)
+                    batch = []
+            upsert_rows(conn, model, batch, batch_size)
+            stats[kind] = (n, time.perf_counter() - t0)
+            if progress:
+                progress(f"{kind}: {n:,} rows in {stats[kind][1]:.1f}s")
+        t0 = time.perf_counter()
+    stats["reindex"] = (0, time.perf_counter() - t0)
+    if progress:
+        progress(f"tag + full-text reindex: {stats['reindex'][1]:.1f}s")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the pm_os database.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("seed", help="upsert the CSV seed set, overwriting edited seed rows")
+    synth = sub.add_parser("synthetic", help="generate a large synthetic corpus")
+    synth.add_argument("--companies", type=int, default=10_000)
+    synth.add_argument("--emails", type=int, default=1_000_000)
+    synth.add_argument("--snippets", type=int, default=100_000)
+    synth.add_argument("--documents", type=int, default=50_000)
+    synth.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "seed":
+        print(seed_from_csv(refresh=True))
+    else:
+        generate_synthetic_corpus(args.companies, args.emails, args.snippets, args.documents, seed=args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Integer, Float, DateTime, Text, ForeignKey
+from sqlalchemy import String, Integer, Float, DateTime, Text, ForeignKey, Index, Table, Column
 from datetime import datetime
 
 class Base(DeclarativeBase):
@@ -14,6 +14,7 @@ class Company(Base):
 
 class Deal(Base):
     __tablename__ = "deals"
+    __table_args__ = (Index("ix_deals_company_id", "company_id"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     company_id: Mapped[int] = mapped_column(ForeignKey("companies.id"))
     deal_type: Mapped[str] = mapped_column(String(20))
@@ -24,6 +25,10 @@ class Deal(Base):
 
 class Email(Base):
     __tablename__ = "emails"
+    __table_args__ = (
+        Index("ix_emails_received_at", "received_at"),
+        Index("ix_emails_linked_deal_id_received_at", "linked_deal_id", "received_at"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     sender: Mapped[str] = mapped_column(String(200))
     subject: Mapped[str] = mapped_column(String(300))
@@ -35,6 +40,7 @@ class Email(Base):
 
 class MarketSnippet(Base):
     __tablename__ = "market_snippets"
+    __table_args__ = (Index("ix_market_snippets_published_at", "published_at"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     source: Mapped[str] = mapped_column(String(100))
     title: Mapped[str] = mapped_column(String(300))
@@ -44,19 +50,145 @@ class MarketSnippet(Base):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_deal_id_doc_type_version", "deal_id", "doc_type", "version"),
+        Index("ix_documents_content_hash", "content_hash"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    deal_id: Mapped[int] = mapped_column(Integer)
+    deal_id: Mapped[int] = mapped_column(ForeignKey("deals.id"))
     doc_type: Mapped[str] = mapped_column(String(60))
     version: Mapped[str] = mapped_column(String(40))
     text: Mapped[str] = mapped_column(Text)
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)   # sha256 of the source file
 
 class Covenant(Base):
     __tablename__ = "covenants"
+    __table_args__ = (
+        Index("ix_covenants_deal_id_next_due_date", "deal_id", "next_due_date", "covenant_type"),
+        Index("ix_covenants_document_id", "document_id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    deal_id: Mapped[int] = mapped_column(Integer)
+    deal_id: Mapped[int] = mapped_column(ForeignKey("deals.id"))
     covenant_type: Mapped[str] = mapped_column(String(80))
     threshold: Mapped[str] = mapped_column(String(80))
     test_frequency: Mapped[str] = mapped_column(String(40))
     next_due_date: Mapped[str] = mapped_column(String(20))
     source_note: Mapped[str] = mapped_column(String(200), default="")
+    # Typed fields filled by covenant extraction (services/covenants.py); empty for seeded rows.
+    document_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    section: Mapped[str] = mapped_column(String(40), default="", server_default="")
+    operator: Mapped[str] = mapped_column(String(2), default="", server_default="")   # ">=" or "<="
+    threshold_value: Mapped[float | None] = mapped_column(Float, nullable=True)
+    extraction: Mapped[str] = mapped_column(String(10), default="", server_default="")  # "rule", "llm" or "" (seeded/manual)
 
+
+class LP(Base):
+    __tablename__ = "lps"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(200))
+    type: Mapped[str] = mapped_column(String(80), default="")
+    contact: Mapped[str] = mapped_column(String(200), default="")
+    notes: Mapped[str] = mapped_column(String(500), default="")
+
+class Contact(Base):
+    __tablename__ = "contacts"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(200))
+    email: Mapped[str] = mapped_column(String(200), default="")
+    company: Mapped[str] = mapped_column(String(200), default="")
+    title: Mapped[str] = mapped_column(String(200), default="")
+    notes: Mapped[str] = mapped_column(String(500), default="")
+
+class Tag(Base):
+    __tablename__ = "tags"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(100), unique=True)
+
+def _tag_link_table(name: str, entity_col: str, entity_table: str) -> Table:
+    # PK (tag_id, entity) answers "rows with tag X"; the reverse index answers "tags of row Y".
+    return Table(
+        name, Base.metadata,
+        Column("tag_id", ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+        Column(entity_col, ForeignKey(f"{entity_table}.id", ondelete="CASCADE"), primary_key=True),
+        Index(f"ix_{name}_{entity_col}_tag_id", entity_col, "tag_id"),
+        sqlite_with_rowid=False,
+    )
+
+company_tags = _tag_link_table("company_tags", "company_id", "companies")
+deal_tags = _tag_link_table("deal_tags", "deal_id", "deals")
+email_tags = _tag_link_table("email_tags", "email_id", "emails")
+market_snippet_tags = _tag_link_table("market_snippet_tags", "snippet_id", "market_snippets")
+
+class LLMCall(Base):
+    """One LLMClient call (cache hits included) for usage and cost reporting."""
+    __tablename__ = "llm_calls"
+    __table_args__ = (
+        Index("ix_llm_calls_created_at", "created_at"),
+        Index("ix_llm_calls_service_created_at", "service", "created_at"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    service: Mapped[str] = mapped_column(String(80), default="")
+    kind: Mapped[str] = mapped_column(String(20), default="chat")           # chat | web_search
+    schema_name: Mapped[str] = mapped_column(String(80), default="")
+    model: Mapped[str] = mapped_column(String(80), default="")
+    cache_status: Mapped[str] = mapped_column(String(10), default="off")    # hit | miss | bypass | merged | off
+    latency_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    prompt_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    completion_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    cost_usd: Mapped[float] = mapped_column(Float, default=0.0)
+    retries: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+
+class Job(Base):
+    """Background job (see pm_os.jobs); payload, partial and result are JSON."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_priority_id", "status", "priority", "id"),
+        Index("ix_jobs_dedupe_key", "dedupe_key"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(80))
+    status: Mapped[str] = mapped_column(String(10), default="queued")      # queued | running | done | failed | cancelled
+    priority: Mapped[int] = mapped_column(Integer, default=0)              # higher runs first
+    payload: Mapped[str] = mapped_column(Text, default="{}")
+    dedupe_key: Mapped[str] = mapped_column(String(64), default="")
+    progress: Mapped[float] = mapped_column(Float, default=0.0)
+    note: Mapped[str] = mapped_column(String(300), default="")
+    partial: Mapped[str | None] = mapped_column(Text, nullable=True)
+    result: Mapped[str | None] = mapped_column(Text, nullable=True)
+    error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3)
+    worker: Mapped[str] = mapped_column(String(80), default="")
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    run_after: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    lease_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+class DocChunk(Base):
+    """Retrieval passage of a document (see services.retrieval); ``source`` is e.g. ``document:12`` or ``upload:<sha256>``."""
+    __tablename__ = "doc_chunks"
+    __table_args__ = (Index("ix_doc_chunks_source_chunk_index", "source", "chunk_index"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    source: Mapped[str] = mapped_column(String(80))
+    source_hash: Mapped[str] = mapped_column(String(64))    # sha256 of the indexed text
+    chunk_index: Mapped[int] = mapped_column(Integer)
+    start_offset: Mapped[int] = mapped_column(Integer)
+    end_offset: Mapped[int] = mapped_column(Integer)
+    page: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    text: Mapped[str] = mapped_column(Text)
+
+class ContentRevision(Base):
+    """Change counter per searchable table, bumped by triggers (see pm_os.revisions)."""
+    __tablename__ = "content_revisions"
+    table_name: Mapped[str] = mapped_column(String(60), primary_key=True)
+    revision: Mapped[int] = mapped_column(Integer, default=0)
+
+class ContentChange(Base):
+    """Row whose text was edited or that was deleted; logged by triggers and consumed by the vector index."""
+    __tablename__ = "content_changes"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(60))
+    row_id: Mapped[int] = mapped_column(Integer)
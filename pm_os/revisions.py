@@ -0,0 +1,71 @@
+"""
+Change tracking for the searchable tables.
+
+Triggers bump ``content_revisions.revision`` for a table on every insert,
+update and delete, so results computed over a whole table (near-duplicate
+clusters, covenant extraction) can be keyed on its revision and are
+recomputed after an edit, not only after rows are added. Rows whose text
+is edited, and deleted rows, are also logged to ``content_changes`` so the
+vector index can re-embed or drop exactly those rows.
+"""
+from sqlalchemy.engine import Connection
+from pm_os.fts import FTS_INDEXES
+
+REVISION_TABLES = tuple(idx.table for idx in FTS_INDEXES.values())
+_TEXT_COLUMNS = {idx.table: idx.columns for idx in FTS_INDEXES.values()}
+_SUFFIXES = ("ai", "au", "ad", "changes_au", "changes_ad")
+
+def _trigger_prefix(table: str) -> str:
+    return f"trg_{table}_revision"
+
+def bump_revision(conn: Connection, table: str):
+    conn.exec_driver_sql(
+        "INSERT INTO content_revisions (table_name, revision) VALUES (?, 1) "
+        "ON CONFLICT (table_name) DO UPDATE SET revision = revision + 1", (table,))
+
+def install_revision_triggers(conn: Connection, table: str):
+    bump = (f"INSERT INTO content_revisions (table_name, revision) VALUES ('{table}', 1) "
+            f"ON CONFLICT (table_name) DO UPDATE SET revision = revision + 1")
+    log = f"INSERT INTO content_changes (table_name, row_id) VALUES ('{table}', OLD.id)"
+    edited = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in _TEXT_COLUMNS[table])
+    triggers = {
+        "ai": ("AFTER INSERT", bump),
+        "au": ("AFTER UPDATE", bump),
+        "ad": ("AFTER DELETE", bump),
+        "changes_au": (f"AFTER UPDATE OF {', '.join(_TEXT_COLUMNS[table])}", log),
+        "changes_ad": ("AFTER DELETE", log),
+    }
+    for suffix, (when, stmt) in triggers.items():
+        condition = f" WHEN {edited}" if suffix == "changes_au" else ""
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {_trigger_prefix(table)}_{suffix}")
+        conn.exec_driver_sql(f"CREATE TRIGGER {_trigger_prefix(table)}_{suffix} {when} ON {table}{condition} "
+                             f"BEGIN {stmt}; END")
+
+def drop_revision_triggers(conn: Connection, table: str):
+    """
+    Suspend change tracking for a bulk load; follow with install +
+    bump_revision. Edits made meanwhile are not logged, so rebuild the
+    vector index afterwards.
+    """
+    for suffix in _SUFFIXES:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {_trigger_prefix(table)}_{suffix}")
+
+def table_revision(conn: Connection, table: str) -> int:
+    return conn.exec_driver_sql("SELECT revision FROM content_revisions WHERE table_name = ?",
+                                (table,)).scalar() or 0
+
+def last_change_id(conn: Connection) -> int:
+    return conn.exec_driver_sql("SELECT coalesce(max(id), 0) FROM content_changes").scalar()
+
+def changes_since(conn: Connection, after: int) -> tuple[int, dict[str, set[int]]]:
+    """Latest change id and the ids of rows edited or deleted since change ``after``, per table."""
+    rows = conn.exec_driver_sql("SELECT id, table_name, row_id FROM content_changes WHERE id > ? ORDER BY id",
+                                (after,)).all()
+    changed: dict[str, set[int]] = {}
+    for _, table, row_id in rows:
+        changed.setdefault(table, set()).add(row_id)
+    return (rows[-1][0] if rows else after), changed
+
+def prune_changes(conn: Connection, upto: int):
+    """Forget changes the vector index has consumed."""
+    conn.exec_driver_sql("DELETE FROM content_changes WHERE id <= ?", (upto,))
@@ -31,3 +31,16 @@ class ICMemoOutline(BaseModel):
     key_risks: List[str]
     key_questions: List[str]
 
+class DocAnswer(BaseModel):
+    answer: str
+    citations: List[int]   # numbers of the passages the answer relies on
+
+class ExtractedCovenant(BaseModel):
+    clause: int            # number of the clause it was read from
+    metric: str            # e.g. "Debt/EBITDA", "Minimum Liquidity"
+    operator: Literal[">=", "<="]
+    threshold: str         # e.g. "5.0x", "$10,000,000"
+    test_frequency: str = ""
+
+class CovenantClauses(BaseModel):
+    covenants: List[ExtractedCovenant] = Field(default_factory=list)
@@ -0,0 +1,224 @@
+"""
+Token-aware, section-respecting chunking and map-reduce JSON extraction.
+
+Long agreements are split at section headings ("SECTION 3 - ...",
+"Section 7.11", "ARTICLE IV") and paragraph breaks, packed greedily up to a
+token budget, extracted chunk by chunk in parallel, and the partial JSON
+results are merged deterministically in document order.
+"""
+import re
+import time
+from dataclasses import dataclass
+from pm_os.config import settings
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional; fall back to a character heuristic
+    _encoding = None
+
+SECTION_BREAK_RE = re.compile(
+    r"(?=\b(?:SECTION|Section|ARTICLE|Article)\s+(?:\d+[A-Za-z]?(?:\.\d+)*|[IVXLC]+)\b)"
+    r"|(?=\b[A-Z][A-Z &/,-]{6,}:\s)"
+    r"|\n\s*\n"
+)
+SENTENCE_RE = re.compile(r"(?<=[.;:!?])\s+")
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+@dataclass
+class Chunk:
+    index: int
+    start: int       # character offsets into the source text
+    end: int
+    text: str
+    tokens: int
+
+def _blocks(text: str) -> list[tuple[int, int]]:
+    """Split points at section headings / blank lines, as (start, end) spans."""
+    cuts = sorted({0, len(text), *(m.start() for m in SECTION_BREAK_RE.finditer(text))})
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if text[a:b].strip()]
+
+def _split_oversized(text: str, start: int, end: int, max_tokens: int) -> list[tuple[int, int]]:
+    """Break a single block that exceeds the budget at sentence ends, then hard character windows."""
+    bounds = [start, *(m.end() for m in SENTENCE_RE.finditer(text, start, end)), end]
+    spans, cur, acc = [], start, 0
+    for a, b in zip(bounds, bounds[1:]):
+        n = count_tokens(text[a:b])
+        if acc + n > max_tokens and a > cur:
+            spans.append((cur, a))
+            cur, acc = a, 0
+        acc += n
+    spans.append((cur, end))
+    out = []
+    window = max_tokens * 3
+    for a, b in spans:
+        while b - a > window and count_tokens(text[a:b]) > max_tokens:
+            out.append((a, a + window))
+            a += window
+        out.append((a, b))
+    return out
+
+def chunk_text(text: str, max_tokens: int = settings.llm_chunk_tokens, overlap_tokens: int = 0) -> list[Chunk]:
+    """
+    Pack section/paragraph blocks into chunks of at most ``max_tokens``.
+    With ``overlap_tokens`` each chunk also repeats trailing blocks of the
+    previous one (up to that many tokens) for context continuity.
+    """
+    if not text.strip():
+        return []
+    spans: list[tuple[int, int, int]] = []
+    for a, b in _blocks(text):
+        n = count_tokens(text[a:b])
+        if n > max_tokens:
+            spans.extend((x, y, count_tokens(text[x:y])) for x, y in _split_oversized(text, a, b, max_tokens))
+        else:
+            spans.append((a, b, n))
+
+    chunks: list[Chunk] = []
+    group: list[tuple[int, int, int]] = []
+    budget = 0
+    for span in spans:
+        if group and budget + span[2] > max_tokens:
+            chunks.append(_make_chunk(text, len(chunks), group))
+            carry = []
+            if overlap_tokens:
+                for s in reversed(group):
+                    if sum(c[2] for c in carry) + s[2] > overlap_tokens:
+                        break
+                    carry.insert(0, s)
+            group = carry
+            budget = sum(s[2] for s in group)
+        group.append(span)
+        budget += span[2]
+    if group:
+        chunks.append(_make_chunk(text, len(chunks), group))
+    return chunks
+
+def _make_chunk(text: str, index: int, group: list[tuple[int, int, int]]) -> Chunk:
+    start, end = group[0][0], group[-1][1]
+    return Chunk(index, start, end, text[start:end], sum(s[2] for s in group))
+
+class StreamingChunker:
+    """
+    Incremental ``chunk_text``: feed text as it arrives (e.g. page by page)
+    and get back every chunk that can no longer change. The emitted chunks
+    match what ``chunk_text`` produces over the whole text, so cached
+    per-chunk extractions are shared between the streaming and batch paths.
+    """
+
+    def __init__(self, max_tokens: int = settings.llm_chunk_tokens):
+        self.max_tokens = max_tokens
+        self._buffer = ""
+        self._offset = 0      # position of the buffer in the full text
+        self._emitted = 0
+
+    def feed(self, text: str) -> list[Chunk]:
+        self._buffer += text
+        if count_tokens(self._buffer) <= self.max_tokens:
+            return []
+        pending = chunk_text(self._buffer, max_tokens=self.max_tokens)
+        # The last chunk may still grow with the next page; keep it buffered.
+        return self._emit(pending[:-1], keep_from=pending[-1].start)
+
+    def close(self) -> list[Chunk]:
+        return self._emit(chunk_text(self._buffer, max_tokens=self.max_tokens), keep_from=len(self._buffer))
+
+    def _emit(self, chunks: list[Chunk], keep_from: int) -> list[Chunk]:
+        out = []
+        for c in chunks:
+            out.append(Chunk(self._emitted, self._offset + c.start, self._offset + c.end, c.text, c.tokens))
+            self._emitted += 1
+        self._offset += keep_from
+        self._buffer = self._buffer[keep_from:]
+        return out
+
+# --- Deterministic merging of partial JSON results ---------------------------
+
+def _norm(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+def merge_fields(parts: list[dict | None]) -> dict | None:
+    """Field-wise merge: first non-empty value in chunk order wins; list fields are unioned."""
+    out: dict = {}
+    for part in parts:
+        if not isinstance(part, dict):
+            continue
+        for k, v in part.items():
+            if isinstance(v, list):
+                out[k] = union_lists([out.get(k) or [], v])
+            elif out.get(k) in (None, "", {}) and v not in (None, ""):
+                out[k] = v
+    return out or None
+
+def union_lists(lists: list[list | None]) -> list:
+    seen, out = set(), []
+    for lst in lists:
+        for item in lst or []:
+            key = _norm(item) if not isinstance(item, dict) else _norm(sorted(item.items()))
+            if key and key not in seen:
+                seen.add(key)
+                out.append(item)
+    return out
+
+def merge_records(lists: list[list | None], key_fields: tuple[str, ...]) -> list[dict]:
+    """Deduplicate dict records on normalized ``key_fields``; later duplicates only fill gaps."""
+    merged: dict[tuple, dict] = {}
+    for lst in lists:
+        for rec in lst or []:
+            if not isinstance(rec, dict):
+                continue
+            key = tuple(_norm(rec.get(f)) for f in key_fields)
+            if not any(key):
+                continue
+            if key in merged:
+                merged[key] = merge_fields([merged[key], rec])
+            else:
+                merged[key] = dict(rec)
+    return list(merged.values())
+
+def chunk_request(chunk: Chunk, *, system: str, user_prefix: str, schema_name: str, **params) -> dict:
+    """``complete_json`` keyword arguments for one chunk; identical for batch and streaming extraction."""
+    label = f" (part {chunk.index + 1})" if chunk.index else ""
+    return {
+        "system": system,
+        "user": f"{user_prefix}{label}:\n\n{chunk.text}",
+        "schema_name": schema_name,
+        **params,
+    }
+
+def map_reduce_json(llm, text: str, *, system: str, user_prefix: str, schema_name: str, merge,
+                    max_tokens: int = settings.llm_chunk_tokens, **params) -> dict:
+    """
+    Extract from every chunk of ``text`` concurrently and merge the partial
+    results with ``merge(list_of_partials) -> dict``. The merged dict carries
+    a ``_meta`` entry with chunk count, per-chunk tokens and timings.
+    """
+    t0 = time.perf_counter()
+    chunks = chunk_text(text, max_tokens=max_tokens) or [Chunk(0, 0, 0, "", 0)]
+    n = len(chunks)
+    requests = [chunk_request(c, system=system, user_prefix=user_prefix, schema_name=schema_name, **params)
+                for c in chunks]
+    finished_at = [0.0] * n
+
+    def mark(i, _):
+        finished_at[i] = round(time.perf_counter() - t0, 3)
+
+    partials = llm.complete_json_many(requests, on_result=mark)
+    errors = [p["error"] for p in partials if "error" in p]
+    if len(errors) == n:
+        return {"error": errors[0]}
+
+    merged = merge([p for p in partials if "error" not in p])
+    merged["_meta"] = {
+        "chunks": n,
+        "chunk_tokens": [c.tokens for c in chunks],
+        "total_tokens": sum(c.tokens for c in chunks),
+        "chunk_finished_s": finished_at,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "failed_chunks": len(errors),
+    }
+    return merged
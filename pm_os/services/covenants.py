@@ -0,0 +1,295 @@
+"""
+Rule-based covenant extraction from stored credit agreements.
+
+Financial covenant clauses ("ratio of Debt to EBITDA not to exceed 5.0x as
+of the last day of each fiscal quarter") are read with the numeric term
+extractor (``terms.extract_terms``): a clause with a covenant cue ("shall
+maintain", "not to exceed", "at least", "minimum") and a covenant metric
+becomes a typed ``Covenant`` row (metric, operator, threshold, frequency,
+section). Only clauses that look like covenants but yield no threshold go
+to the LLM, in batches. Amendments are applied in document order, so a
+covenant restated by an amendment replaces the agreement's version.
+
+Re-running is idempotent: extracted rows (``extraction`` "rule" or "llm")
+of the deals processed are replaced; seeded and manual rows are kept, and a
+metric they already track (by deal and normalized metric, so "Minimum
+Project DSCR" is "DSCR") is not written again. The report counts those and
+lists the ones whose threshold disagrees with the documents.
+"""
+import calendar
+import re
+import time
+from bisect import bisect_right
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import Callable
+from sqlalchemy import delete, insert, select
+from pm_os.db import engine, write_transaction
+from pm_os.llm.client import LLMClient
+from pm_os.models import Covenant, Document
+from pm_os.services.compare import split_sections
+from pm_os.services.terms import (GLOSSARY_RE, SENTENCE_END_RE, Term, extract_terms, format_value,
+                                  glossary_label)
+llm = LLMClient(service="covenants")
+
+# Glossary labels that are financial covenants, with the Covenant.covenant_type they are stored as.
+COVENANT_METRICS = {
+    "Leverage Ratio": "Debt/EBITDA",
+    "Fixed Charge Coverage Ratio": "Fixed Charge Coverage",
+    "Interest Coverage Ratio": "Interest Coverage",
+    "DSCR": "DSCR",
+    "Minimum Liquidity": "Minimum Liquidity",
+    "CapEx Limit": "Maximum CapEx",
+}
+_CUE_RE = re.compile(
+    r"shall\s+(?:maintain|not\s+permit|not\s+exceed|at\s+all\s+times)|not\s+(?:to\s+)?exceed|at\s+least"
+    r"|not\s+(?:less|greater|more)\s+than|no\s+(?:less|greater|more)\s+than|minimum|maximum",
+    re.IGNORECASE,
+)
+THRESHOLD_KINDS = ("ratio", "currency", "percent")
+OPERATORS = {"≥": ">=", "≤": "<="}
+CLAUSE_CHARS = 1000          # clause text sent to the LLM
+LLM_CLAUSES_PER_REQUEST = 20
+
+COVENANT_SYSTEM = ("You read clauses from credit agreements and amendments. For every financial maintenance "
+                   "covenant stated in a clause, return its metric, operator (>= or <=), threshold and test "
+                   "frequency, with the clause number. Skip clauses that state no covenant threshold.")
+
+@dataclass
+class Clause:
+    document_id: int
+    section: str
+    text: str
+
+@dataclass
+class CovenantReport:
+    deals: int = 0
+    documents: int = 0
+    clauses: int = 0             # clauses that look like financial covenants
+    rule: int = 0                # covenants read by the rules
+    llm: int = 0                 # covenants read by the LLM from clauses the rules could not parse
+    unresolved: int = 0          # clauses neither path could read
+    llm_requests: int = 0
+    llm_errors: int = 0
+    written: int = 0             # Covenant rows after amendments are applied
+    kept: int = 0                # metrics already tracked by seeded or manual rows, left as they are
+    conflicts: list[str] = field(default_factory=list)   # kept rows whose threshold the documents contradict
+    elapsed_s: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+def covenant_metric(covenant_type: str) -> str:
+    """Normalized metric of a ``Covenant.covenant_type`` ("Minimum Project DSCR" -> "DSCR")."""
+    if covenant_type in COVENANT_METRICS.values():
+        return covenant_type
+    for g in GLOSSARY_RE.finditer(covenant_type):
+        if glossary_label(g) in COVENANT_METRICS:
+            return COVENANT_METRICS[glossary_label(g)]
+    return " ".join(covenant_type.split()).lower()
+
+def _same_threshold(a: str, b: str) -> bool:
+    return "".join(a.split()).lower() == "".join(b.split()).lower()
+
+def _clauses(text: str) -> list[tuple[str, int, int]]:
+    """``(section number, start, end)`` of every sentence, never crossing a section heading."""
+    spans = []
+    for section in split_sections(text):
+        start = section.start
+        for m in SENTENCE_END_RE.finditer(text, section.start, section.end):
+            spans.append((section.number, start, m.end()))
+            start = m.end()
+        if text[start:section.end].strip():
+            spans.append((section.number, start, section.end))
+    return spans
+
+def threshold_text(term: Term) -> str:
+    """``">= $10,000,000"``, ``"<= 5.0x"``: the stored Covenant.threshold."""
+    value = f"${term.value:,.0f}" if term.kind == "currency" else format_value(term.kind, term.value, term.unit)
+    return f"{OPERATORS[term.qualifier]} {value}"
+
+def extract_covenants(text: str, document_id: int = 0) -> tuple[list[dict], list[Clause]]:
+    """
+    Covenants the rules can read from ``text`` (dicts with ``metric``,
+    ``operator``, ``threshold``, ``threshold_value``, ``test_frequency``,
+    ``section``) and the covenant-like clauses they could not.
+    Frequencies missing from a clause default to the first one the
+    document's covenants state.
+    """
+    terms = extract_terms(text)
+    spans = _clauses(text)
+    starts = [s for _, s, _ in spans]
+    by_clause: dict[int, list[Term]] = {}
+    for t in terms:
+        by_clause.setdefault(bisect_right(starts, t.start) - 1, []).append(t)
+
+    found, unparsed = [], []
+    for i, (section, start, end) in enumerate(spans):
+        if not _CUE_RE.search(text, start, end):
+            continue
+        labels = {glossary_label(g) for g in GLOSSARY_RE.finditer(text, start, end)}
+        if not labels & COVENANT_METRICS.keys():
+            continue
+        clause_terms = by_clause.get(i, [])
+        thresholds = [t for t in clause_terms
+                      if t.label in COVENANT_METRICS and t.kind in THRESHOLD_KINDS and t.qualifier in OPERATORS]
+        if not thresholds:
+            unparsed.append(Clause(document_id, section, " ".join(text[start:end].split())[:CLAUSE_CHARS]))
+            continue
+        frequencies = [t for t in clause_terms if t.kind == "frequency"]
+        for t in thresholds:
+            frequency = next((f for f in frequencies if f.label == t.label), frequencies[0] if frequencies else None)
+            found.append({"metric": COVENANT_METRICS[t.label], "operator": OPERATORS[t.qualifier],
+                          "threshold": threshold_text(t), "threshold_value": float(t.value),
+                          "test_frequency": str(frequency.value).title() if frequency else "",
+                          "section": t.section or section, "clause": i})
+    default = next((c["test_frequency"] for c in found if c["test_frequency"]), "")
+    for c in found:
+        c["test_frequency"] = c["test_frequency"] or default
+    return found, unparsed
+
+def _llm_covenants(clauses: list[Clause], report: CovenantReport) -> dict[int, list[dict]]:
+    """Covenants the LLM reads from ``clauses``, keyed by document id."""
+    batches = [clauses[i:i + LLM_CLAUSES_PER_REQUEST] for i in range(0, len(clauses), LLM_CLAUSES_PER_REQUEST)]
+    requests = [{"system": COVENANT_SYSTEM, "schema_name": "CovenantClauses",
+                 "user": "CLAUSES:\n" + "\n".join(f"[{n + 1}] (Section {c.section or '-'}) {c.text}"
+                                                  for n, c in enumerate(batch))}
+                for batch in batches]
+    report.llm_requests += len(requests)
+    out: dict[int, list[dict]] = {}
+    for batch, result in zip(batches, llm.complete_json_many(requests)):
+        if "error" in result:
+            report.llm_errors += 1
+            report.errors.append(result["error"])
+            report.unresolved += len(batch)
+            continue
+        read = set()
+        for item in result.get("covenants") or []:
+            n = item.get("clause") if isinstance(item, dict) else None
+            if not isinstance(n, int) or not 1 <= n <= len(batch) or item.get("operator") not in (">=", "<="):
+                continue
+            values = [t for t in extract_terms(str(item.get("threshold", ""))) if t.kind in THRESHOLD_KINDS]
+            if not item.get("metric") or not values:
+                continue
+            clause = batch[n - 1]
+            read.add(n)
+            report.llm += 1
+            out.setdefault(clause.document_id, []).append({
+                "metric": str(item["metric"])[:80], "operator": item["operator"],
+                "threshold": f"{item['operator']} {str(item['threshold']).lstrip('<>=≥≤ ')}"[:80], "threshold_value": float(values[0].value),
+                "test_frequency": str(item.get("test_frequency") or "").title()[:40], "section": clause.section,
+            })
+        report.unresolved += len(batch) - len(read)
+    return out
+
+def next_test_date(frequency: str, today: date | None = None) -> str:
+    """End of the current test period for ``frequency`` (month, quarter, half or year end); "" if unknown."""
+    today = today or date.today()
+    months = {"Monthly": 1, "Quarterly": 3, "Semi-Annually": 6, "Annually": 12}.get(frequency)
+    if months is None:
+        return ""
+    month = ((today.month - 1) // months + 1) * months
+    return date(today.year, month, calendar.monthrange(today.year, month)[1]).isoformat()
+
+def extract_library_covenants(deal_ids: list[int] | None = None, *, use_llm: bool = True,
+                              progress: Callable[[float, str], None] | None = None) -> CovenantReport:
+    """
+    Extract covenants from every stored document (of ``deal_ids``, or all
+    deals) and replace the deals' extracted Covenant rows. Per deal,
+    documents are applied in order, so later versions override a metric.
+    Returns per-path counts: rule, llm and unresolved clauses.
+    """
+    t0 = time.perf_counter()
+    report = CovenantReport()
+    query = select(Document.id, Document.deal_id, Document.doc_type, Document.version).order_by(Document.deal_id, Document.id)
+    if deal_ids is not None:
+        query = query.where(Document.deal_id.in_(deal_ids))
+    with engine.connect() as conn:
+        documents = conn.execute(query).all()
+
+    found: dict[int, list[dict]] = {}
+    unparsed: list[Clause] = []
+    for n, doc in enumerate(documents):
+        with engine.connect() as conn:
+            text = conn.execute(select(Document.text).where(Document.id == doc.id)).scalar() or ""
+        covenants, clauses = extract_covenants(text, doc.id)
+        found[doc.id] = covenants
+        unparsed.extend(clauses)
+        report.rule += len(covenants)
+        report.clauses += len(clauses) + len({c["clause"] for c in covenants if "clause" in c})
+        if progress:
+            progress(0.8 * (n + 1) / len(documents), f"Read {n + 1:,} of {len(documents):,} document(s)")
+    if unparsed and use_llm:
+        if progress:
+            progress(0.8, f"Asking the LLM about {len(unparsed):,} clause(s) the rules could not read")
+        for document_id, covenants in _llm_covenants(unparsed, report).items():
+            found[document_id].extend({**c, "extraction": "llm"} for c in covenants)
+    else:
+        report.unresolved += len(unparsed)
+
+    rows: dict[int, dict[str, dict]] = {}
+    for doc in documents:
+        source = f"{doc.doc_type.replace('_', ' ')} {doc.version}"
+        for c in found[doc.id]:
+            deal = rows.setdefault(doc.deal_id, {})
+            note = f"{source} §{c['section']}" if c["section"] else source
+            prior = deal.get(c["metric"])
+            if prior is not None and prior["document_id"] == doc.id:
+                continue                      # first statement in a document wins
+            if prior is not None and (prior["threshold"], prior["test_frequency"]) != (c["threshold"], c["test_frequency"]):
+                was = f"{prior['threshold']} {prior['test_frequency']}".strip()
+                note += f"; was {was} in {prior['source_note'].split(';')[0]}"
+            deal[c["metric"]] = {
+                "deal_id": doc.deal_id, "document_id": doc.id, "covenant_type": c["metric"],
+                "threshold": c["threshold"], "operator": c["operator"], "threshold_value": c["threshold_value"],
+                "test_frequency": c["test_frequency"] or (prior["test_frequency"] if prior else ""),
+                "next_due_date": "", "section": c["section"][:40], "source_note": note[:200],
+                "extraction": c.get("extraction", "rule"),
+            }
+    processed = sorted({doc.deal_id for doc in documents})
+    with write_transaction() as conn:
+        tracked = {(r.deal_id, covenant_metric(r.covenant_type)): r for r in conn.execute(
+            select(Covenant.deal_id, Covenant.covenant_type, Covenant.threshold)
+            .where(Covenant.deal_id.in_(processed), Covenant.extraction.not_in(("rule", "llm")))
+        )}
+        values = []
+        for row in (row for deal in rows.values() for row in deal.values()):
+            kept = tracked.get((row["deal_id"], row["covenant_type"]))
+            if kept is None:
+                row["next_due_date"] = next_test_date(row["test_frequency"])
+                values.append(row)
+                continue
+            report.kept += 1
+            if not _same_threshold(kept.threshold, row["threshold"]):
+                report.conflicts.append(f"deal {row['deal_id']}: {kept.covenant_type} {kept.threshold} is tracked, "
+                                        f"{row['source_note'].split(';')[0]} states {row['threshold']}")
+        if processed:
+            conn.execute(delete(Covenant).where(Covenant.deal_id.in_(processed),
+                                                Covenant.extraction.in_(("rule", "llm"))))
+        if values:
+            conn.execute(insert(Covenant), values)
+    report.deals, report.documents, report.written = len(processed), len(documents), len(values)
+    report.elapsed_s = round(time.perf_counter() - t0, 2)
+    if progress:
+        progress(1.0, f"{report.written:,} covenant(s) written")
+    return report
+
+def format_report(report: CovenantReport) -> str:
+    lines = [
+        f"Documents read       {report.documents:>10,}  ({report.deals:,} deal(s))",
+        f"Covenant clauses     {report.clauses:>10,}",
+        f"  read by rules      {report.rule:>10,}",
+        f"  read by the LLM    {report.llm:>10,}  ({report.llm_requests:,} request(s), {report.llm_errors:,} failed)",
+        f"  unresolved         {report.unresolved:>10,}",
+        f"Covenants written    {report.written:>10,}",
+        f"Already tracked      {report.kept:>10,}  ({len(report.conflicts):,} with a different threshold)",
+        f"Elapsed              {report.elapsed_s:>10.2f}s",
+    ]
+    if report.conflicts:
+        lines.append("Tracked covenants the documents contradict:")
+        lines.extend(f"  {c}" for c in report.conflicts)
+    if report.errors:
+        lines.append(f"Errors ({len(report.errors):,}; first 10):")
+        lines.extend(f"  {e}" for e in report.errors[:10])
+    return "\n".join(lines)
@@ -1,20 +1,190 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func, select
+from pm_os.cache import SQLiteCache, stable_key
+from pm_os.config import settings
+from pm_os.db import engine
 from pm_os.llm.client import LLMClient
-llm = LLMClient()
+from pm_os.models import Company, Deal, DocChunk, Document
+from pm_os.services.chunking import map_reduce_json, union_lists
+from pm_os.services.retrieval import (Passage, document_source, index_documents, index_source, query_terms,
+                                      retrieve, text_source)
+from pm_os.services.search import tokenize
+llm = LLMClient(service="docqa")
+
+def _merge_memo(parts: list[dict]) -> dict:
+    return {
+        "deal_name": next((p["deal_name"] for p in parts if p.get("deal_name")), ""),
+        **{k: union_lists([p.get(k) for p in parts]) for k in ("sections", "key_risks", "key_questions")},
+    }
 
 def generate_ic_memo_outline(deal_name: str, doc_text: str) -> dict:
-    prompt = f"DEAL:\n{deal_name}\n\nDOC EXCERPT:\n{doc_text[:4000]}\n"
-    return llm.complete_json(
+    return map_reduce_json(
+        llm, doc_text,
         system="You are a private credit IC memo writer. Produce an IC memo outline and key questions.",
-        user=prompt,
+        user_prefix=f"DEAL:\n{deal_name}\n\nDOC EXCERPT",
         schema_name="ICMemoOutline",
+        merge=_merge_memo,
     )
 
-def answer_question(doc_text: str, question: str) -> str:
-    q = question.lower()
-    idx = doc_text.lower().find(q.split(" ")[0])
-    if idx == -1:
-        return "Demo answer: Relevant section not found; in real mode this is RAG + citations."
-    start = max(0, idx-300)
-    end = min(len(doc_text), idx+600)
-    return f"Found relevant excerpt:\n\n{doc_text[start:end]}"
+QA_SYSTEM = ("You answer questions about private credit / deal documents using only the numbered passages given. "
+             "Cite the passages you rely on as [n]; if they do not contain the answer, say so.")
+
+def _citation(n: int, p: Passage) -> dict:
+    return {"n": n, "page": p.page, "start": p.start, "end": p.end, "snippet": p.text, "score": round(p.score, 3)}
+
+# Sentence ends for demo answers; unlike chunking.SENTENCE_RE this keeps "(c) Minimum Liquidity: ..." whole.
+_ANSWER_SENTENCE_RE = re.compile(r"(?<=[.;!?])\s+")
+MIN_SENTENCE_CHARS = 25
+
+def _extractive_answer(question: str, passages: list[Passage], max_sentences: int = 3) -> tuple[str, list[int]]:
+    """
+    Demo answer: the sentences of the retrieved passages that share the most
+    terms with the question. Overlapping passages repeat sentences, so each
+    sentence is used once, cited to the first passage it appears in.
+    """
+    terms = set(query_terms(question))
+    scored = []
+    for n, p in enumerate(passages, start=1):
+        for order, sentence in enumerate(_ANSWER_SENTENCE_RE.split(p.text)):
+            sentence = " ".join(sentence.split())
+            if len(sentence) < MIN_SENTENCE_CHARS:
+                continue
+            hits = len(terms & set(query_terms(sentence)))
+            if hits:
+                scored.append((-hits, n, order, sentence if len(sentence) <= 400 else sentence[:400] + " …"))
+    best, seen = [], set()
+    for s in sorted(scored):
+        if s[3].lower() not in seen:
+            seen.add(s[3].lower())
+            best.append(s)
+        if len(best) == max_sentences:
+            break
+    best.sort(key=lambda s: (s[1], s[2]))
+    return " ".join(f"{s[3]} [{s[1]}]" for s in best), sorted({s[1] for s in best})
+
+def _answer_from_passages(question: str, passages: list[Passage], labels: list[str]) -> tuple[str, list[int]] | dict:
+    """Answer text and the cited passage numbers, or ``{"error": ...}``. ``labels`` head each numbered passage."""
+    if llm.demo_mode:
+        return _extractive_answer(question, passages)
+    numbered = "\n\n".join(f"[{n}]" + (f" {label}" if label else "") + f"\n{p.text}"
+                            for n, (p, label) in enumerate(zip(passages, labels), start=1))
+    try:
+        result = llm.complete_json(system=QA_SYSTEM, user=f"QUESTION:\n{question}\n\nPASSAGES:\n{numbered}",
+                                   schema_name="DocAnswer")
+    except Exception as e:
+        return {"error": str(e)}
+    cited = sorted({n for n in result.get("citations") or [] if isinstance(n, int) and 1 <= n <= len(passages)})
+    return result.get("answer") or "", cited
+
+def answer_question(doc_text: str, question: str, *, source: str | None = None,
+                    page_offsets: list[int] | None = None, k: int = 5) -> dict:
+    """
+    Answer ``question`` from the top-``k`` BM25 passages of ``doc_text``.
+    The document is indexed under ``source`` (see services.retrieval) the
+    first time it is asked about. Returns ``{"answer", "citations"}``, each
+    citation carrying its passage number ``n``, page, character offsets and
+    text, or ``{"error": ...}``.
+    """
+    source = source or text_source(doc_text)
+    index_source(source, doc_text, page_offsets)
+    passages = retrieve(question, [source], k=k)
+    if not passages:
+        return {"answer": "No passage of the document matches the question.", "citations": []}
+    answered = _answer_from_passages(question, passages, [f"(page {p.page})" if p.page else "" for p in passages])
+    if isinstance(answered, dict):
+        return answered
+    answer, cited = answered
+    return {"answer": answer or "The retrieved passages do not answer the question.",
+            "citations": [_citation(n, passages[n - 1]) for n in cited or range(1, len(passages) + 1)]}
+
+# --- Questions across every document of a deal or company ---------------------
+
+# Answers by (document set, normalized question); a new or re-indexed document changes the set hash.
+answer_cache = SQLiteCache(
+    settings.qa_cache_path,
+    ttl_seconds=settings.qa_cache_ttl_hours * 3600,
+    max_bytes=int(settings.qa_cache_max_mb * 1024 * 1024),
+)
+
+def normalize_question(question: str) -> str:
+    return " ".join(tokenize(question))
+
+def library_documents(*, deal_id: int | None = None, company_id: int | None = None) -> list[dict]:
+    """Documents of one deal, or of every deal of a company, with a display title."""
+    query = (select(Document.id, Document.deal_id, Document.doc_type, Document.version, Company.name)
+             .join(Deal, Deal.id == Document.deal_id).join(Company, Company.id == Deal.company_id)
+             .order_by(Document.deal_id, Document.id))
+    if deal_id is not None:
+        query = query.where(Document.deal_id == deal_id)
+    if company_id is not None:
+        query = query.where(Deal.company_id == company_id)
+    with engine.connect() as conn:
+        return [{"id": r.id, "deal_id": r.deal_id, "title": f"{r.name} {r.doc_type.replace('_', ' ')} {r.version}"}
+                for r in conn.execute(query)]
+
+def library_companies() -> list[dict]:
+    """Companies that have documents, with their document count."""
+    query = (select(Company.id, Company.name, func.count(Document.id).label("documents"))
+             .join(Deal, Deal.company_id == Company.id).join(Document, Document.deal_id == Deal.id)
+             .group_by(Company.id).order_by(Company.name))
+    with engine.connect() as conn:
+        return [dict(r._mapping) for r in conn.execute(query)]
+
+def document_set_hash(document_ids: list[int]) -> str:
+    """Hash of the documents' indexed text hashes; changes when a document is added or re-indexed."""
+    sources = [document_source(i) for i in document_ids]
+    with engine.connect() as conn:
+        rows = conn.execute(select(DocChunk.source, func.min(DocChunk.source_hash))
+                            .where(DocChunk.source.in_(sources)).group_by(DocChunk.source)).all()
+    return stable_key(sorted(sources), sorted(map(tuple, rows)))
+
+def _merge_ranked(per_document: list[list[Passage]], k: int) -> list[Passage]:
+    """Every matching document's best passage first (so each one can be cited), then the rest by score."""
+    leaders = sorted((hits[0] for hits in per_document if hits), key=lambda p: p.score, reverse=True)[:k]
+    rest = sorted((p for hits in per_document for p in hits[1:]), key=lambda p: p.score, reverse=True)
+    return sorted(leaders + rest[:max(0, k - len(leaders))], key=lambda p: p.score, reverse=True)
+
+def answer_library_question(question: str, *, deal_id: int | None = None, company_id: int | None = None,
+                            k: int = 8, per_document: int = 3, bypass_cache: bool = False) -> dict:
+    """
+    Answer ``question`` from every document of a deal or company. Retrieval
+    runs concurrently per document and the ranked passages are merged; the
+    answer is grouped by document in ``documents`` (each with its cited
+    passages). Answers are cached on (document set, normalized question);
+    ``cached`` tells whether this one came from the cache.
+    """
+    docs = library_documents(deal_id=deal_id, company_id=company_id)
+    if not docs:
+        return {"error": "No documents found for this deal or company."}
+    ids = [d["id"] for d in docs]
+    index_documents(ids)
+    key = stable_key("library_qa", document_set_hash(ids), normalize_question(question), llm.effective_model, k)
+    if not bypass_cache and (cached := answer_cache.get(key)) is not None:
+        return {**cached, "cached": True}
+
+    with ThreadPoolExecutor(max_workers=min(settings.qa_max_concurrency, len(docs)),
+                            thread_name_prefix="library-qa") as pool:
+        per_doc = list(pool.map(lambda i: retrieve(question, [document_source(i)], k=per_document), ids))
+    passages = _merge_ranked(per_doc, k)
+    result = {"searched": len(docs), "matched": sum(1 for hits in per_doc if hits)}
+    if not passages:
+        return {**result, "answer": "No passage in these documents matches the question.", "documents": [],
+                "cached": False}
 
+    titles = {document_source(d["id"]): d for d in docs}
+    answered = _answer_from_passages(question, passages, [titles[p.source]["title"] +
+                                                          (f", page {p.page}" if p.page else "") for p in passages])
+    if isinstance(answered, dict):
+        return answered
+    answer, cited = answered
+    grouped: dict[str, dict] = {}
+    for n in cited or range(1, len(passages) + 1):
+        p = passages[n - 1]
+        doc = titles[p.source]
+        grouped.setdefault(p.source, {"document_id": doc["id"], "deal_id": doc["deal_id"], "title": doc["title"],
+                                      "citations": []})["citations"].append(_citation(n, p))
+    result.update(answer=answer or "The retrieved passages do not answer the question.",
+                  documents=list(grouped.values()))
+    answer_cache.set(key, result)
+    return {**result, "cached": False}
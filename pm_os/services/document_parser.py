@@ -1,34 +1,21 @@
-from pypdf import PdfReader
-from openai import OpenAI
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Iterator
 from pm_os.config import settings
-import json
-import io
+from pm_os.llm.client import LLMClient
+from pm_os.services.pdf_text import (PAGE_SEPARATOR, PdfSource, PdfText, assemble_pages, extract_pdf_text,
+                                    iter_pdf_pages)
+from pm_os.services import document_store
+from pm_os.services.uploads import spool_upload
+from pm_os.services.chunking import (Chunk, StreamingChunker, chunk_request, map_reduce_json, merge_fields,
+                                     merge_records, union_lists)
+from pm_os.singleflight import singleflight
 
-def extract_text_from_pdf(uploaded_file) -> str:
-    """Extract text from uploaded PDF file."""
-    try:
-        pdf_reader = PdfReader(io.BytesIO(uploaded_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        raise Exception(f"Failed to extract text from PDF: {str(e)}")
+# Uploads are always parsed by the real provider when a key is configured, regardless of DEMO_MODE.
+llm = LLMClient(demo_mode=False, service="document_parser")
 
-def parse_credit_agreement(text: str) -> dict:
-    """
-    Parse credit agreement to extract covenants, terms, and amendments.
-    Uses OpenAI API to structure the information.
-    """
-    if not settings.openai_api_key:
-        return {
-            "error": "OpenAI API key not configured. Please set OPENAI_API_KEY in your environment."
-        }
-    
-    try:
-        client = OpenAI(api_key=settings.openai_api_key)
-        
-        system_prompt = """You are a credit analyst extracting structured information from credit agreements and amendments.
+CREDIT_AGREEMENT_PROMPT = """You are a credit analyst extracting structured information from credit agreements and amendments.
 Extract the following information in JSON format:
 
 {
@@ -58,38 +45,8 @@ Extract the following information in JSON format:
 }
 
 If information is not found, use null for that field."""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Extract structured information from this credit agreement:\n\n{text[:15000]}"}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.1
-        )
-        
-        return json.loads(response.choices[0].message.content)
-    
-    except Exception as e:
-        return {
-            "error": f"Failed to parse credit agreement: {str(e)}"
-        }
 
-def parse_portfolio_report(text: str) -> dict:
-    """
-    Parse portfolio report to extract financial metrics and company performance.
-    Uses OpenAI API to structure the information.
-    """
-    if not settings.openai_api_key:
-        return {
-            "error": "OpenAI API key not configured. Please set OPENAI_API_KEY in your environment."
-        }
-    
-    try:
-        client = OpenAI(api_key=settings.openai_api_key)
-        
-        system_prompt = """You are a financial analyst extracting portfolio company performance metrics.
+PORTFOLIO_REPORT_PROMPT = """You are a financial analyst extracting portfolio company performance metrics.
 Extract the following information in JSON format:
 
 {
@@ -117,38 +74,8 @@ Extract the following information in JSON format:
 }
 
 Extract all companies mentioned. Use null if specific metrics not found."""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Extract portfolio metrics from this report:\n\n{text[:15000]}"}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.1
-        )
-        
-        return json.loads(response.choices[0].message.content)
-    
-    except Exception as e:
-        return {
-            "error": f"Failed to parse portfolio report: {str(e)}"
-        }
 
-def parse_deal_document(text: str) -> dict:
-    """
-    Parse deal document (CIM, IC memo, etc.) to extract key information.
-    Uses OpenAI API to structure the information.
-    """
-    if not settings.openai_api_key:
-        return {
-            "error": "OpenAI API key not configured. Please set OPENAI_API_KEY in your environment."
-        }
-    
-    try:
-        client = OpenAI(api_key=settings.openai_api_key)
-        
-        system_prompt = """You are an investment analyst extracting key information from deal documents.
+DEAL_DOCUMENT_PROMPT = """You are an investment analyst extracting key information from deal documents.
 Extract the following information in JSON format:
 
 {
@@ -179,21 +106,225 @@ Extract the following information in JSON format:
 }
 
 Focus on extracting specific numbers and key terms. Use null if information not found."""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Extract key information from this deal document:\n\n{text[:15000]}"}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.1
+
+def _merge_credit(parts: list[dict]) -> dict:
+    return {
+        "covenants": merge_records([p.get("covenants") for p in parts], ("type", "threshold")),
+        "financial_terms": merge_fields([p.get("financial_terms") for p in parts]),
+        "amendments": merge_records([p.get("amendments") for p in parts], ("section", "change_description")),
+    }
+
+def _merge_portfolio(parts: list[dict]) -> dict:
+    return {
+        "companies": merge_records([p.get("companies") for p in parts], ("company",)),
+        "fund_summary": merge_fields([p.get("fund_summary") for p in parts]),
+    }
+
+def _merge_deal(parts: list[dict]) -> dict:
+    merged = {
+        "deal_summary": merge_fields([p.get("deal_summary") for p in parts]),
+        "financial_data": merge_fields([p.get("financial_data") for p in parts]),
+    }
+    for key in ("key_terms", "risks", "tags", "extracted_tables"):
+        merged[key] = union_lists([p.get(key) for p in parts])
+    return merged
+
+def extract_pdf(uploaded_file) -> PdfText:
+    """
+    Extract text and per-page offsets from an uploaded PDF, pages split
+    across a process pool. The upload is spooled to disk and read through
+    a memory map; text is stored by content hash, so the same file is only
+    ever extracted once.
+    """
+    try:
+        with spool_upload(uploaded_file) as upload:
+            pdf = document_store.get_text(upload.digest)
+            if pdf is None:
+                pdf = extract_pdf_text(upload.path, workers=settings.pdf_workers,
+                                       min_parallel_pages=settings.pdf_parallel_min_pages)
+                document_store.put_text(upload.digest, pdf)
+        return pdf
+    except Exception as e:
+        raise Exception(f"Failed to extract text from PDF: {str(e)}")
+
+def extract_text_from_pdf(uploaded_file) -> str:
+    """Extract text from uploaded PDF file."""
+    return extract_pdf(uploaded_file).text
+
+@dataclass(frozen=True)
+class ParserSpec:
+    label: str
+    system: str
+    user_prefix: str
+    schema_name: str
+    merge: Callable[[list[dict]], dict]
+    version: str = "1"   # bump when the prompt or merge changes; keys stored parse results
+
+PARSERS: dict[str, ParserSpec] = {
+    "credit_agreement": ParserSpec("credit agreement", CREDIT_AGREEMENT_PROMPT,
+                                   "Extract structured information from this credit agreement",
+                                   "CreditAgreementExtraction", _merge_credit),
+    "portfolio_report": ParserSpec("portfolio report", PORTFOLIO_REPORT_PROMPT,
+                                   "Extract portfolio metrics from this report",
+                                   "PortfolioReportExtraction", _merge_portfolio),
+    "deal_document": ParserSpec("deal document", DEAL_DOCUMENT_PROMPT,
+                                "Extract key information from this deal document",
+                                "DealDocumentExtraction", _merge_deal),
+}
+
+MISSING_KEY_ERROR = "OpenAI API key not configured. Please set OPENAI_API_KEY in your environment."
+
+def _parse(kind: str, text: str) -> dict:
+    spec = PARSERS[kind]
+    if not settings.openai_api_key:
+        return {"error": MISSING_KEY_ERROR}
+    try:
+        return map_reduce_json(
+            llm, text,
+            system=spec.system,
+            user_prefix=spec.user_prefix,
+            schema_name=spec.schema_name,
+            merge=spec.merge,
+            temperature=0.1,
         )
-        
-        return json.loads(response.choices[0].message.content)
-    
     except Exception as e:
-        return {
-            "error": f"Failed to parse deal document: {str(e)}"
-        }
+        return {"error": f"Failed to parse {spec.label}: {str(e)}"}
+
+@singleflight("document_parser")
+def parse_credit_agreement(text: str) -> dict:
+    """
+    Parse credit agreement to extract covenants, terms, and amendments.
+    Uses the shared OpenAI provider via LLMClient to structure the information.
+    """
+    return _parse("credit_agreement", text)
+
+@singleflight("document_parser")
+def parse_portfolio_report(text: str) -> dict:
+    """
+    Parse portfolio report to extract financial metrics and company performance.
+    Uses the shared OpenAI provider via LLMClient to structure the information.
+    """
+    return _parse("portfolio_report", text)
+
+@singleflight("document_parser")
+def parse_deal_document(text: str) -> dict:
+    """
+    Parse deal document (CIM, IC memo, etc.) to extract key information.
+    Uses the shared OpenAI provider via LLMClient to structure the information.
+    """
+    return _parse("deal_document", text)
+
+def iter_parse_pdf(source: PdfSource, kind: str, *, digest: str | None = None) -> Iterator[dict]:
+    """
+    Stream a PDF parse: pages are extracted in order, every chunk is sent to
+    the LLM as soon as it is complete, and merged results are yielded as
+    chunk extractions finish. Events (dicts keyed by ``event``):
 
+    - ``page``: ``page``, ``pages`` — one per extracted page
+    - ``partial``: ``result``, ``chunks_done``, ``chunks_submitted`` — merged so far
+    - ``done``: ``result`` (with ``_meta``), ``text``, ``page_offsets``,
+      ``digest``, ``cached`` (True when the whole parse came from the store)
+    - ``error``: ``error`` — extraction failed or every chunk failed
+
+    Chunks match the batch path's, so per-chunk responses are shared via the
+    cache. Text and complete parse results are stored by content hash; a
+    repeat upload skips extraction and returns the stored parse at once.
+    ``source`` is PDF bytes or a path (see ``spool_upload``); pass ``digest``
+    when it is already known to skip hashing the file again.
+    """
+    spec = PARSERS[kind]
+    if digest is None:
+        digest = (document_store.file_digest(source) if isinstance(source, str)
+                  else document_store.document_digest(source))
+    stored_text = document_store.get_text(digest)
+    if stored_text is not None:
+        stored = document_store.get_parse(digest, kind, spec.version)
+        if stored is not None:
+            yield {"event": "done", "result": stored, "text": stored_text.text,
+                   "page_offsets": stored_text.page_offsets, "digest": digest, "cached": True}
+            return
+
+    if not settings.openai_api_key:
+        yield {"event": "error", "error": MISSING_KEY_ERROR}
+        return
+
+    t0 = time.perf_counter()
+    chunker = StreamingChunker()
+    pool = ThreadPoolExecutor(max_workers=max(1, settings.llm_max_concurrency), thread_name_prefix="parse-stream")
+    pending: dict[Future, int] = {}
+    partials: dict[int, dict] = {}
+    chunk_tokens: list[int] = []
+    page_texts: list[str] = []
+    errors: list[str] = []
+    first_result_s = None
+
+    def submit(chunks: list[Chunk]):
+        for c in chunks:
+            chunk_tokens.append(c.tokens)
+            request = chunk_request(c, system=spec.system, user_prefix=spec.user_prefix,
+                                    schema_name=spec.schema_name, temperature=0.1)
+            pending[pool.submit(llm.complete_json, **request)] = c.index
+
+    def collect(block: bool) -> Iterator[dict]:
+        nonlocal first_result_s
+        done = [f for f in pending if f.done()]
+        if not done and block:
+            done = list(wait(pending, return_when=FIRST_COMPLETED).done)
+        for future in done:
+            index = pending.pop(future)
+            try:
+                partials[index] = future.result()
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            if first_result_s is None:
+                first_result_s = round(time.perf_counter() - t0, 3)
+            yield {
+                "event": "partial",
+                "result": spec.merge([partials[i] for i in sorted(partials)]),
+                "chunks_done": len(partials) + len(errors),
+                "chunks_submitted": len(chunk_tokens),
+            }
+
+    try:
+        try:
+            if stored_text is not None:
+                pages = ((i + 1, stored_text.page_count, stored_text.page_text(i + 1)[:-len(PAGE_SEPARATOR)])
+                         for i in range(stored_text.page_count))
+            else:
+                pages = iter_pdf_pages(source, workers=settings.pdf_workers,
+                                       min_parallel_pages=settings.pdf_parallel_min_pages)
+            for page, page_count, text in pages:
+                page_texts.append(text)
+                yield {"event": "page", "page": page, "pages": page_count}
+                submit(chunker.feed(text + PAGE_SEPARATOR))
+                yield from collect(block=False)
+        except Exception as e:
+            yield {"event": "error", "error": f"Failed to extract text from PDF: {str(e)}"}
+            return
+        submit(chunker.close())
+        while pending:
+            yield from collect(block=True)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    pdf = assemble_pages(page_texts)
+    if stored_text is None:
+        document_store.put_text(digest, pdf)
+    if chunk_tokens and not partials:
+        yield {"event": "error", "error": f"Failed to parse {spec.label}: {errors[0]}"}
+        return
+    result = spec.merge([partials[i] for i in sorted(partials)])
+    result["_meta"] = {
+        "chunks": len(chunk_tokens),
+        "chunk_tokens": chunk_tokens,
+        "total_tokens": sum(chunk_tokens),
+        "first_result_s": first_result_s,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "failed_chunks": len(errors),
+    }
+    if not errors:
+        # Results with failed chunks are incomplete; let the next upload retry them.
+        document_store.put_parse(digest, kind, spec.version, result)
+    yield {"event": "done", "result": result, "text": pdf.text, "page_offsets": pdf.page_offsets,
+           "digest": digest, "cached": False}
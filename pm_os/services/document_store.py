@@ -0,0 +1,89 @@
+"""
+Content-addressed store for uploaded documents and their parse results.
+
+Uploads are identified by the sha256 of their bytes. Extracted text (with
+page offsets) is stored under the digest alone; parse output is stored
+under (digest, parser, parser version, model), so a repeat upload of the
+same file returns immediately in any session and after restarts, while a
+prompt change (bumped version) or model switch re-parses. Entries live in
+a size-bounded SQLiteCache and are evicted least-recently-used first.
+
+Sessions keep only the digest of a document; ``load_text`` resolves it
+through a small process-wide LRU of recently used texts in front of the
+SQLite store, so many sessions viewing the same document share one copy.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from pm_os.cache import SQLiteCache, stable_key
+from pm_os.config import settings
+from pm_os.services.pdf_text import PdfText
+
+document_cache = SQLiteCache(
+    settings.doc_cache_path,
+    max_bytes=int(settings.doc_cache_max_mb * 1024 * 1024),
+)
+
+def document_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def file_digest(path: str, block_size: int = 1024 * 1024) -> str:
+    """sha256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+_recent: OrderedDict[str, PdfText] = OrderedDict()
+_recent_lock = threading.Lock()
+
+def _remember(digest: str, pdf: PdfText):
+    with _recent_lock:
+        _recent[digest] = pdf
+        _recent.move_to_end(digest)
+        while len(_recent) > settings.doc_text_memory_items:
+            _recent.popitem(last=False)
+
+def _text_key(digest: str) -> str:
+    return stable_key("pdf_text", digest)
+
+def _parse_key(digest: str, parser: str, version: str, model: str) -> str:
+    return stable_key("parse", digest, parser, version, model)
+
+def get_text(digest: str) -> PdfText | None:
+    with _recent_lock:
+        pdf = _recent.get(digest)
+        if pdf is not None:
+            _recent.move_to_end(digest)
+            return pdf
+    cached = document_cache.get(_text_key(digest))
+    if cached is None:
+        return None
+    pdf = PdfText(cached["text"], cached["page_offsets"])
+    _remember(digest, pdf)
+    return pdf
+
+def put_text(digest: str, pdf: PdfText):
+    document_cache.set(_text_key(digest), {"text": pdf.text, "page_offsets": pdf.page_offsets})
+    _remember(digest, pdf)
+
+def load_text(digest: str | None) -> str | None:
+    """Text of the document with ``digest``, or None if it was never stored or has been evicted."""
+    pdf = get_text(digest) if digest else None
+    return pdf.text if pdf is not None else None
+
+def get_parse(digest: str, parser: str, version: str, model: str = settings.llm_model) -> dict | None:
+    return document_cache.get(_parse_key(digest, parser, version, model))
+
+def put_parse(digest: str, parser: str, version: str, result: dict, model: str = settings.llm_model):
+    document_cache.set(_parse_key(digest, parser, version, model), result)
+
+def forget(digest: str, parser: str | None = None, version: str | None = None, model: str = settings.llm_model):
+    """Drop the stored text, or one stored parse when ``parser``/``version`` are given."""
+    if parser is None:
+        with _recent_lock:
+            _recent.pop(digest, None)
+        document_cache.delete(_text_key(digest))
+    else:
+        document_cache.delete(_parse_key(digest, parser, version, model))
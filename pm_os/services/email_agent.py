@@ -1,12 +1,28 @@
+from typing import Iterator
+from pm_os.config import settings
 from pm_os.llm.client import LLMClient
 
-llm = LLMClient()
+llm = LLMClient(service="email_agent")
+
+TRIAGE_SYSTEM = "You are an IR + origination analyst. Classify relevance and suggest CRM updates."
+
+def _triage_request(email_subject: str, email_body: str) -> dict:
+    return {
+        "system": TRIAGE_SYSTEM,
+        "user": f"SUBJECT:\n{email_subject}\n\nBODY:\n{email_body}\n",
+        "schema_name": "RelevanceResult",
+    }
 
 def triage_email(email_subject: str, email_body: str) -> dict:
-    prompt = f"SUBJECT:\n{email_subject}\n\nBODY:\n{email_body}\n"
-    return llm.complete_json(
-        system="You are an IR + origination analyst. Classify relevance and suggest CRM updates.",
-        user=prompt,
-        schema_name="RelevanceResult",
-    )
+    return llm.complete_json(**_triage_request(email_subject, email_body))
+
+def triage_emails(emails: list[tuple[str, str]], max_concurrency: int = settings.llm_max_concurrency) -> list[dict]:
+    """Triage many (subject, body) pairs concurrently; results are in input order, failures as {"error": ...}."""
+    requests = [_triage_request(subject, body) for subject, body in emails]
+    return llm.complete_json_many(requests, max_concurrency=max_concurrency)
 
+def iter_triage_emails(emails: list[tuple[str, str]],
+                       max_concurrency: int = settings.llm_max_concurrency) -> Iterator[tuple[int, dict]]:
+    """Stream (index, result) pairs as each email's triage completes."""
+    requests = [_triage_request(subject, body) for subject, body in emails]
+    return llm.iter_complete_json(requests, max_concurrency=max_concurrency)
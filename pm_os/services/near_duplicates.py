@@ -0,0 +1,168 @@
+"""
+Near-duplicate detection across the document library and inbox.
+
+Comparing every pair of N texts is N² fuzzy matches. Instead each text gets
+a MinHash signature over word shingles (NumPy, cached by text hash), the
+signatures are banded into an LSH index so only texts sharing a band
+become candidates, and each candidate group is verified with one
+``compare.similarity_matrix`` call (rapidfuzz ``cdist`` on every core).
+Verified pairs are merged into clusters with union-find.
+"""
+import base64
+import hashlib
+import time
+import zlib
+from typing import Callable
+import numpy as np
+from sqlalchemy import text
+from pm_os.cache import SQLiteCache, stable_key
+from pm_os.config import settings
+from pm_os.db import engine
+from pm_os.fts import FTS_INDEXES
+from pm_os.revisions import table_revision
+from pm_os.services.compare import similarity_matrix
+from pm_os.services.search import KIND_SQL
+
+NUM_PERM = 128
+BANDS = 16                       # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always collide
+SHINGLE_WORDS = 5
+VERIFY_CHARS = 20_000            # opening text compared when verifying a candidate group
+# Signatures get their own store so a library-wide scan never evicts cached document texts and parses.
+signature_cache = SQLiteCache(
+    settings.minhash_cache_path,
+    max_bytes=int(settings.minhash_cache_max_mb * 1024 * 1024),
+)
+_SEEDS = np.random.default_rng(1).integers(0, np.iinfo(np.uint64).max, NUM_PERM, dtype=np.uint64)
+
+def shingles(doc_text: str, size: int = SHINGLE_WORDS) -> np.ndarray:
+    """crc32 of every ``size``-word window of the lower-cased text (the whole text if shorter)."""
+    words = doc_text.lower().split()
+    grams = [" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))]
+    return np.unique(np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams)))
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finaliser (wrapping uint64 arithmetic): one independent-looking hash per seed column."""
+    h = values[:, None] ^ _SEEDS
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+def minhash(doc_text: str, block: int = 4096) -> np.ndarray:
+    """``NUM_PERM`` MinHash values of the text's shingle set; shingles are hashed in blocks to bound memory."""
+    values = shingles(doc_text)
+    signature = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(values), block):
+        np.minimum(signature, _mix(values[start:start + block]).min(axis=0), out=signature)
+    return signature
+
+def _signature_key(doc_text: str) -> str:
+    return stable_key("minhash", NUM_PERM, SHINGLE_WORDS, hashlib.sha256(doc_text.encode("utf-8")).hexdigest())
+
+def cached_minhashes(texts: list[str], progress: Callable[[float, str], None] | None = None) -> np.ndarray:
+    """
+    ``(len(texts), NUM_PERM)`` signatures; cached ones are read in one batch and the rest
+    computed and stored in one transaction (base64 of the raw uint64 bytes).
+    """
+    keys = [_signature_key(t) for t in texts]
+    stored = signature_cache.get_many(list(dict.fromkeys(keys)))
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint64)
+    fresh = {}
+    for i, (key, t) in enumerate(zip(keys, texts)):
+        if key in stored:
+            signatures[i] = np.frombuffer(base64.b64decode(stored[key]), dtype=np.uint64)
+        elif key in fresh:
+            signatures[i] = fresh[key]
+        else:
+            signatures[i] = fresh[key] = minhash(t)
+        if progress and i % 500 == 0:
+            progress(0.5 * i / len(texts), f"Signed {i:,} of {len(texts):,} text(s)")
+    signature_cache.set_many({k: base64.b64encode(v.tobytes()).decode("ascii") for k, v in fresh.items()})
+    return signatures
+
+def lsh_candidates(signatures: np.ndarray, bands: int = BANDS) -> list[list[int]]:
+    """Groups of row indices that share at least one band of their signatures (groups of one dropped)."""
+    rows = signatures.shape[1] // bands
+    groups: set[tuple[int, ...]] = set()
+    for band in range(bands):
+        buckets: dict[bytes, list[int]] = {}
+        chunk = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i, row in enumerate(chunk):
+            buckets.setdefault(row.tobytes(), []).append(i)
+        groups.update(tuple(members) for members in buckets.values() if len(members) > 1)
+    return [list(g) for g in sorted(groups)]
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        self.parent[self.find(i)] = self.find(j)
+
+def cluster_texts(texts: list[str], *, threshold: float = 0.9,
+                  progress: Callable[[float, str], None] | None = None) -> list[dict]:
+    """
+    Clusters of near-duplicate ``texts`` as ``{"members": [indices], "similarity": min pair score}``,
+    largest first. Pairs are LSH candidates whose rapidfuzz similarity is at least ``threshold``.
+    """
+    if len(texts) < 2:
+        return []
+    signatures = cached_minhashes(texts, progress)
+    groups = lsh_candidates(signatures)
+    uf, scores = _UnionFind(len(texts)), {}
+    prefixes = {}
+    for g, members in enumerate(groups):
+        for i in members:
+            if i not in prefixes:
+                prefixes[i] = texts[i][:VERIFY_CHARS]
+        sims = similarity_matrix([prefixes[i] for i in members])
+        for a, b in zip(*np.nonzero(np.triu(sims >= threshold, k=1))):
+            i, j = members[a], members[b]
+            uf.union(i, j)
+            scores[(min(i, j), max(i, j))] = float(sims[a, b])
+        if progress and g % 200 == 0:
+            progress(0.5 + 0.5 * g / len(groups), f"Verified {g:,} of {len(groups):,} candidate group(s)")
+    clusters: dict[int, set[int]] = {}
+    lowest: dict[int, float] = {}
+    for (i, j), score in scores.items():
+        root = uf.find(i)
+        lowest[root] = min(lowest.get(root, 1.0), score)
+        for k in (i, j):
+            clusters.setdefault(root, set()).add(k)
+    out = [{"members": sorted(members), "similarity": round(lowest[root], 3)} for root, members in clusters.items()]
+    return sorted(out, key=lambda c: (-len(c["members"]), c["members"][0]))
+
+def library_version(kinds: tuple[str, ...] = ("document", "email")) -> dict[str, list[int]]:
+    """``[row count, max id, revision]`` per kind; changes whenever rows are added, edited or removed."""
+    versions = {}
+    with engine.connect() as conn:
+        for kind in kinds:
+            table = FTS_INDEXES[kind].table
+            count, max_id = conn.exec_driver_sql(f"SELECT count(*), coalesce(max(id), 0) FROM {table}").one()
+            versions[kind] = [count, max_id, table_revision(conn, table)]
+    return versions
+
+def find_near_duplicates(kinds: tuple[str, ...] = ("document", "email"), *, threshold: float = 0.9,
+                         progress: Callable[[float, str], None] | None = None) -> dict:
+    """
+    Near-duplicate clusters among Document and/or Email rows, per kind.
+    Returns ``{"clusters": [{"kind", "similarity", "members": [{"id", "title"}]}], "rows", "elapsed_s"}``.
+    """
+    t0 = time.perf_counter()
+    clusters, rows_seen = [], 0
+    for kind in kinds:
+        frag = KIND_SQL[kind]
+        columns = " || ' ' || ".join(f"coalesce(src.{c}, '')" for c in FTS_INDEXES[kind].columns)
+        with engine.connect() as conn:
+            rows = conn.execute(text(f"SELECT src.id AS id, {frag['title']} AS title, {columns} AS body "
+                                     f"FROM {FTS_INDEXES[kind].table} AS src ORDER BY src.id")).all()
+        rows_seen += len(rows)
+        for c in cluster_texts([r.body for r in rows], threshold=threshold, progress=progress):
+            clusters.append({"kind": kind, "similarity": c["similarity"],
+                             "members": [{"id": rows[i].id, "title": rows[i].title} for i in c["members"]]})
+    return {"clusters": clusters, "rows": rows_seen, "elapsed_s": round(time.perf_counter() - t0, 2)}
@@ -0,0 +1,132 @@
+"""
+Page-level PDF text extraction, parallel across a process pool.
+
+Sources are PDF bytes or a file path; files are read through a read-only
+memory map, never copied into a bytes buffer. Large PDFs are split into
+contiguous page ranges; each worker maps the file and extracts its range,
+and the ranges are reassembled in page order with a single join. The result keeps
+the character offset of every page so callers can map a text position back
+to a page number for citations.
+
+This module deliberately imports only pypdf so spawned workers start fast.
+"""
+import bisect
+import io
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+from pypdf import PdfReader
+
+PAGE_SEPARATOR = "\n"
+
+@dataclass
+class PdfText:
+    text: str
+    page_offsets: list[int] = field(default_factory=list)   # start offset of each page in ``text``
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_offsets)
+
+    def page_for_offset(self, offset: int) -> int:
+        """1-based page number containing character ``offset``."""
+        return max(1, bisect.bisect_right(self.page_offsets, offset))
+
+    def page_text(self, page: int) -> str:
+        start = self.page_offsets[page - 1]
+        end = self.page_offsets[page] if page < len(self.page_offsets) else len(self.text)
+        return self.text[start:end]
+
+@contextmanager
+def mapped_file(path: str) -> Iterator[mmap.mmap]:
+    """Read-only memory map of ``path``; pages are faulted in from the OS cache on demand."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield mm
+
+def _extract_range(path: str, start: int, end: int) -> list[str]:
+    # PdfReader(path) would read the whole file into a BytesIO; a memory map does not.
+    with mapped_file(path) as mm:
+        reader = PdfReader(mm)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def _page_ranges(pages: int, parts: int) -> list[tuple[int, int]]:
+    size = -(-pages // parts)
+    return [(i, min(i + size, pages)) for i in range(0, pages, size)]
+
+def assemble_pages(page_texts: list[str]) -> PdfText:
+    offsets, pos = [], 0
+    for t in page_texts:
+        offsets.append(pos)
+        pos += len(t) + len(PAGE_SEPARATOR)
+    return PdfText(PAGE_SEPARATOR.join(page_texts) + (PAGE_SEPARATOR if page_texts else ""), offsets)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared spawn-based pool, sized on first use (fork is unsafe from a multithreaded Streamlit server)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+PdfSource = bytes | str   # PDF bytes, or the path of a PDF on disk (read through mmap)
+
+def iter_pdf_pages(source: PdfSource, *, workers: int = 4,
+                   min_parallel_pages: int = 24) -> Iterator[tuple[int, int, str]]:
+    """
+    Yield ``(page_number, page_count, text)`` for every page of the PDF in
+    ``source``, in page order, as soon as each page is available. Documents
+    with fewer than ``min_parallel_pages`` pages (or ``workers <= 1``) are
+    read in-process, where pool overhead would dominate; larger ones are
+    extracted range by range on the process pool. A path source is
+    memory-mapped rather than read, and workers map the same file.
+    """
+    if isinstance(source, str):
+        with mapped_file(source) as mm:
+            yield from _iter_pages(PdfReader(mm), source, workers, min_parallel_pages)
+        return
+
+    reader = PdfReader(io.BytesIO(source))
+    if workers <= 1 or len(reader.pages) < min_parallel_pages:
+        yield from _iter_pages(reader, None, workers, min_parallel_pages)
+        return
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="pm_os_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        yield from _iter_pages(reader, path, workers, min_parallel_pages)
+    finally:
+        os.unlink(path)
+
+def _iter_pages(reader: PdfReader, path: str | None, workers: int,
+                min_parallel_pages: int) -> Iterator[tuple[int, int, str]]:
+    pages = len(reader.pages)
+    if path is None or workers <= 1 or pages < min_parallel_pages:
+        for i, page in enumerate(reader.pages):
+            yield i + 1, pages, page.extract_text() or ""
+        return
+
+    # A few ranges per worker keeps the pool busy when pages differ in cost,
+    # and small ranges get the first pages back quickly.
+    pool = _get_pool(workers)
+    futures = [(a, pool.submit(_extract_range, path, a, b)) for a, b in _page_ranges(pages, workers * 3)]
+    try:
+        for start, fut in futures:
+            for i, text in enumerate(fut.result()):
+                yield start + i + 1, pages, text
+    finally:
+        for _, fut in futures:
+            fut.cancel()
+
+def extract_pdf_text(source: PdfSource, *, workers: int = 4, min_parallel_pages: int = 24) -> PdfText:
+    """Extract the text of every page of the PDF in ``source`` (see ``iter_pdf_pages``)."""
+    return assemble_pages([text for _, _, text in iter_pdf_pages(source, workers=workers,
+                                                                 min_parallel_pages=min_parallel_pages)])
@@ -0,0 +1,182 @@
+"""
+Passage retrieval for document Q&A.
+
+Every document is chunked once into section-aware, overlapping passages
+(``chunking.chunk_text``) stored in ``doc_chunks``; an FTS5 index over them
+is kept current by triggers, so questions are answered by a BM25 query
+rather than by scanning text. Indexing is incremental: a source whose text
+hash is unchanged is skipped, a changed one is replaced. Triggers on
+``documents`` (migration 13) drop a Document's passages when its text is
+edited or the row deleted, so the next ``index_documents`` re-chunks it.
+
+Sources are strings: ``document:<id>`` for Document rows,
+``upload:<sha256>`` for uploaded PDFs and ``text:<sha256>`` for any other
+text. Only the QA_ADHOC_SOURCES most recently indexed upload and text
+sources are kept; ``answer_question`` re-indexes an evicted one on its
+next question.
+"""
+import hashlib
+from dataclasses import asdict, dataclass
+from sqlalchemy import String, bindparam, cast, delete, exists, insert, select, text
+from sqlalchemy.engine import Connection
+from pm_os.config import settings
+from pm_os.db import engine, write_transaction
+from pm_os.fts import CHUNK_INDEX
+from pm_os.models import DocChunk, Document
+from pm_os.services.chunking import chunk_text
+from pm_os.services.pdf_text import PdfText
+from pm_os.services.search import to_match_expr, tokenize
+
+PASSAGE_TOKENS = 220
+PASSAGE_OVERLAP_TOKENS = 60
+
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been before being between both but by can could did do
+does doing during each for from had has have having how i if in into is it its itself me more most my
+no nor not of off on once only or other our out over own same she should so some such than that the
+their them then there these they this those through to too under until up very was we were what when
+where which while who whom why will with would you your
+""".split())
+
+@dataclass
+class Passage:
+    source: str
+    chunk_index: int
+    start: int        # character offsets into the source text
+    end: int
+    page: int | None
+    text: str
+    score: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def document_source(document_id: int) -> str:
+    return f"document:{document_id}"
+
+def upload_source(digest: str) -> str:
+    return f"upload:{digest}"
+
+def text_source(doc_text: str) -> str:
+    return f"text:{text_hash(doc_text)}"
+
+def text_hash(doc_text: str) -> str:
+    return hashlib.sha256(doc_text.encode("utf-8")).hexdigest()
+
+def query_terms(question: str) -> list[str]:
+    """Lower-cased question words without stopwords (all words if every one is a stopword)."""
+    words = tokenize(question)
+    return [w for w in words if w not in STOPWORDS] or words
+
+def passage_rows(source: str, doc_text: str, page_offsets: list[int] | None = None) -> list[dict]:
+    """``doc_chunks`` rows for ``doc_text``; pages are filled in when ``page_offsets`` are known."""
+    pages = PdfText(doc_text, page_offsets) if page_offsets else None
+    digest = text_hash(doc_text)
+    return [
+        {"source": source, "source_hash": digest, "chunk_index": c.index, "start_offset": c.start,
+         "end_offset": c.end, "page": pages.page_for_offset(c.start) if pages else None, "text": c.text}
+        for c in chunk_text(doc_text, max_tokens=PASSAGE_TOKENS, overlap_tokens=PASSAGE_OVERLAP_TOKENS)
+    ]
+
+# Index ranges holding the ad-hoc (non-Document) sources.
+_ADHOC_RANGES = " OR ".join(f"(source >= '{p}:' AND source < '{p};')" for p in ("text", "upload"))
+
+def _prune_adhoc(conn: Connection, keep: int) -> int:
+    """Drop the passages of all but the ``keep`` most recently indexed upload/text sources."""
+    return conn.execute(text(
+        f"DELETE FROM doc_chunks WHERE ({_ADHOC_RANGES}) AND source IN ("
+        f"SELECT source FROM doc_chunks WHERE {_ADHOC_RANGES} "
+        f"GROUP BY source ORDER BY max(id) DESC LIMIT -1 OFFSET :keep)"
+    ), {"keep": keep}).rowcount
+
+def _index_source(conn: Connection, source: str, doc_text: str, page_offsets: list[int] | None) -> int:
+    current = conn.execute(select(DocChunk.source_hash).where(DocChunk.source == source).limit(1)).scalar()
+    if current == text_hash(doc_text):
+        return 0
+    if current is not None:
+        conn.execute(delete(DocChunk).where(DocChunk.source == source))
+    rows = passage_rows(source, doc_text, page_offsets)
+    if rows:
+        conn.execute(insert(DocChunk), rows)
+        if not source.startswith("document:"):
+            _prune_adhoc(conn, settings.qa_adhoc_sources)
+    return len(rows)
+
+def index_source(source: str, doc_text: str, page_offsets: list[int] | None = None, *,
+                 conn: Connection | None = None) -> int:
+    """
+    Make sure ``source`` is indexed with the passages of ``doc_text``.
+    Returns the number of passages written (0 if it was already current).
+    Pass ``conn`` to index inside a caller's write transaction.
+    """
+    if conn is not None:
+        return _index_source(conn, source, doc_text, page_offsets)
+    with engine.connect() as read:
+        current = read.execute(select(DocChunk.source_hash).where(DocChunk.source == source).limit(1)).scalar()
+    if current == text_hash(doc_text):
+        return 0
+    with write_transaction() as conn:
+        return _index_source(conn, source, doc_text, page_offsets)
+
+def index_documents(document_ids: list[int] | None = None, *, conn: Connection | None = None) -> int:
+    """
+    Index Document rows (all, or ``document_ids``) that have no passages:
+    new rows and rows whose text changed since they were chunked. Returns
+    passages written.
+    """
+    indexed = exists().where(DocChunk.source == "document:" + cast(Document.id, String))
+    query = select(Document.id, Document.text).where(~indexed)
+    if document_ids is not None:
+        query = query.where(Document.id.in_(document_ids))
+    if conn is not None:
+        rows = conn.execute(query).all()
+        return sum(_index_source(conn, document_source(r.id), r.text or "", None) for r in rows)
+    with engine.connect() as read:
+        rows = read.execute(query).all()
+    if not rows:
+        return 0
+    with write_transaction() as conn:
+        return sum(_index_source(conn, document_source(r.id), r.text or "", None) for r in rows)
+
+def _overlap(a: Passage, b: Passage) -> int:
+    return max(0, min(a.end, b.end) - max(a.start, b.start))
+
+def retrieve(question: str, sources: list[str] | None = None, *, k: int = 5) -> list[Passage]:
+    """
+    Top ``k`` passages for ``question`` by BM25 over the passage index,
+    optionally restricted to ``sources``. Any question term may match;
+    passages mostly covered by a better-ranked one from the same source
+    (the overlap between neighbouring chunks) are skipped.
+    """
+    match = to_match_expr(" ".join(query_terms(question)), "OR")
+    if not match or (sources is not None and not sources):
+        return []
+    idx = CHUNK_INDEX
+    where = [f"{idx.name} MATCH :match"]
+    params = {"match": match, "limit": k * 3}
+    binds = []
+    if sources is not None:
+        where.append("c.source IN :sources")
+        params["sources"] = list(sources)
+        binds.append(bindparam("sources", expanding=True))
+    sql = text(f"""
+        SELECT c.source, c.chunk_index, c.start_offset, c.end_offset, c.page, c.text,
+               bm25({idx.name}) AS rank
+        FROM {idx.name}
+        JOIN {idx.table} AS c ON c.id = {idx.name}.rowid
+        WHERE {' AND '.join(where)}
+        ORDER BY rank
+        LIMIT :limit
+    """).bindparams(*binds)
+    with engine.connect() as conn:
+        rows = conn.execute(sql, params).all()
+
+    passages: list[Passage] = []
+    for r in rows:
+        p = Passage(r.source, r.chunk_index, r.start_offset, r.end_offset, r.page, r.text, -r.rank)
+        if any(q.source == p.source and _overlap(p, q) * 2 > p.end - p.start for q in passages):
+            continue
+        passages.append(p)
+        if len(passages) == k:
+            break
+    return passages
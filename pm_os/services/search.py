@@ -0,0 +1,120 @@
+import re
+from datetime import date, datetime
+from sqlalchemy import text, bindparam, DateTime
+from pm_os.db import engine
+from pm_os.fts import FTS_INDEXES
+
+HIGHLIGHT = ("**", "**")
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Per-kind SQL fragments: display title, optional deal column, optional date column.
+KIND_SQL = {
+    "document": {
+        "title": "src.doc_type || ' ' || src.version",
+        "deal": "src.deal_id",
+        "date": None,
+    },
+    "email": {
+        "title": "src.subject",
+        "deal": "src.linked_deal_id",
+        "date": "src.received_at",
+    },
+    "snippet": {
+        "title": "src.source || ': ' || src.title",
+        "deal": None,
+        "date": "src.published_at",
+    },
+}
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word terms of ``text``, split the way the FTS5 queries are built."""
+    return _TERM_RE.findall(text.lower())
+
+def to_match_expr(query: str, mode: str = "AND") -> str:
+    """Turn free text into a safe FTS5 MATCH expression (quoted terms, last term prefix-matched)."""
+    terms = tokenize(query)
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return f" {mode} ".join(quoted)
+
+def _as_datetime(value):
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+def _search_kind(conn, kind: str, match: str, deal_id, since, until, limit: int) -> list[dict]:
+    idx = FTS_INDEXES[kind]
+    frag = KIND_SQL[kind]
+    if deal_id is not None and frag["deal"] is None:
+        return []
+    if (since or until) and frag["date"] is None:
+        return []
+
+    weights = ", ".join(str(w) for w in idx.weights)
+    where = [f"{idx.name} MATCH :match"]
+    params = {"match": match, "limit": limit}
+    binds = []
+    if deal_id is not None:
+        where.append(f"{frag['deal']} = :deal_id")
+        params["deal_id"] = deal_id
+    if since:
+        where.append(f"{frag['date']} >= :since")
+        params["since"] = _as_datetime(since)
+        binds.append(bindparam("since", type_=DateTime))
+    if until:
+        where.append(f"{frag['date']} < :until")
+        params["until"] = _as_datetime(until)
+        binds.append(bindparam("until", type_=DateTime))
+
+    sql = text(f"""
+        SELECT src.id AS id,
+               {frag['title']} AS title,
+               {frag['deal'] or 'NULL'} AS deal_id,
+               {frag['date'] or 'NULL'} AS dated,
+               snippet({idx.name}, -1, '{HIGHLIGHT[0]}', '{HIGHLIGHT[1]}', ' … ', 16) AS snippet,
+               bm25({idx.name}, {weights}) AS rank
+        FROM {idx.name}
+        JOIN {idx.table} AS src ON src.id = {idx.name}.rowid
+        WHERE {' AND '.join(where)}
+        ORDER BY rank
+        LIMIT :limit
+    """).bindparams(*binds).columns(dated=DateTime)
+    return [
+        {
+            "kind": kind,
+            "id": r.id,
+            "title": r.title,
+            "deal_id": r.deal_id,
+            "date": r.dated,
+            "snippet": r.snippet,
+            "score": -r.rank,
+        }
+        for r in conn.execute(sql, params)
+    ]
+
+def search(query: str, *, kinds: tuple[str, ...] = ("document", "email", "snippet"),
+           deal_id: int | None = None, since: date | datetime | None = None,
+           until: date | datetime | None = None, limit: int = 20) -> list[dict]:
+    """
+    Full-text search across documents, emails and market snippets.
+
+    Hits are BM25-ranked (higher score is better) with the matching passage
+    highlighted in ``snippet``. ``deal_id`` restricts to documents and linked
+    emails; ``since``/``until`` restrict to dated kinds (emails, snippets).
+    If every term together matches nothing, the search falls back to any term.
+    """
+    hits = []
+    with engine.connect() as conn:
+        for mode in ("AND", "OR"):
+            match = to_match_expr(query, mode)
+            if not match:
+                return []
+            hits = []
+            for kind in kinds:
+                hits.extend(_search_kind(conn, kind, match, deal_id, since, until, limit))
+            if hits:
+                break
+    hits.sort(key=lambda h: h["score"], reverse=True)
+    return hits[:limit]
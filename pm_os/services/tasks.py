@@ -0,0 +1,142 @@
+"""
+Background job handlers (see pm_os.jobs).
+
+Each handler takes the job's JSON payload and a JobContext and returns a
+JSON-serialisable result. Service-level failures come back as
+``{"error": ...}`` like the services themselves; exceptions are retried.
+"""
+import os
+import time
+from contextlib import suppress
+from sqlalchemy import select
+from pm_os.db import engine
+from pm_os.jobs import JobContext, job_handler
+from pm_os.models import Email
+from pm_os.services import document_store
+from pm_os.services.covenants import extract_library_covenants
+from pm_os.services.document_parser import iter_parse_pdf
+from pm_os.services.email_agent import iter_triage_emails
+from pm_os.services.near_duplicates import find_near_duplicates
+from pm_os.services.pdf_text import extract_pdf_text
+from pm_os.services.retrieval import index_source, upload_source
+from pm_os.services.terms import extract_terms
+from pm_os.services.vectors import vector_index
+from pm_os.services.web_search import search_investment_opportunities, search_portfolio_news
+
+def _remove_upload(path: str):
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+@job_handler("documents.parse")
+def parse_document(payload: dict, ctx: JobContext) -> dict:
+    """
+    Stream-parse a saved upload (``path``, ``digest``, ``kind``), reporting
+    page extraction and merged partial results as progress, index its
+    passages for Q&A and extract its numeric terms. The saved file is
+    removed once the parse finishes or runs out of attempts.
+    """
+    pages_done = chunks_done = 0.0
+    finished = False
+    try:
+        for event in iter_parse_pdf(payload["path"], payload["kind"], digest=payload["digest"]):
+            name = event["event"]
+            if name == "page":
+                pages_done = event["page"] / event["pages"]
+                ctx.progress(0.5 * pages_done + 0.5 * chunks_done, f"Extracted page {event['page']} of {event['pages']}")
+            elif name == "partial":
+                chunks_done = event["chunks_done"] / event["chunks_submitted"]
+                ctx.progress(0.5 * pages_done + 0.5 * chunks_done,
+                             f"{event['chunks_done']} of {event['chunks_submitted']} section(s) analysed",
+                             partial=event["result"])
+            elif name == "error":
+                finished = True
+                return {"error": event["error"]}
+            elif name == "done":
+                finished = True
+                index_source(upload_source(event["digest"]), event["text"], event["page_offsets"])
+                meta = event["result"].get("_meta", {})
+                if event["cached"]:
+                    summary = "Parsed before; loaded the stored result"
+                else:
+                    summary = (f"Parsed {len(event['page_offsets'])} page(s) in {meta.get('elapsed_s', 0):.1f}s; "
+                               f"{meta.get('chunks', 0)} section(s) analysed, first results after "
+                               f"{meta.get('first_result_s') or 0:.1f}s")
+                return {"result": event["result"], "digest": event["digest"],
+                        "pages": len(event["page_offsets"]), "cached": event["cached"], "summary": summary,
+                        "terms": [t.to_dict() for t in extract_terms(event["text"])]}
+        finished = True
+        return {"error": "Parsing ended without a result"}
+    finally:
+        if finished or ctx.final_attempt:
+            _remove_upload(payload["path"])
+
+@job_handler("documents.extract_text", pool="process")
+def extract_document_text(payload: dict, ctx: JobContext) -> dict:
+    """Extract, store and index the text of a saved PDF (``path``, ``digest``) without any LLM parsing."""
+    finished = False
+    try:
+        pdf = document_store.get_text(payload["digest"])
+        if pdf is None:
+            ctx.progress(0.0, "Extracting text")
+            pdf = extract_pdf_text(payload["path"], workers=1)
+            document_store.put_text(payload["digest"], pdf)
+        index_source(upload_source(payload["digest"]), pdf.text, pdf.page_offsets)
+        finished = True
+        return {"digest": payload["digest"], "pages": pdf.page_count, "chars": len(pdf.text)}
+    finally:
+        if finished or ctx.final_attempt:
+            _remove_upload(payload["path"])
+
+@job_handler("library.near_duplicates", pool="process")
+def near_duplicates(payload: dict, ctx: JobContext) -> dict:
+    """Near-duplicate clusters among ``kinds``; ``version`` (see library_version) only keys the job for dedupe."""
+    return find_near_duplicates(tuple(payload["kinds"]), threshold=payload.get("threshold", 0.9),
+                                progress=ctx.progress)
+
+@job_handler("vectors.update")
+def update_vectors(payload: dict, ctx: JobContext) -> dict:
+    """
+    Build or update the semantic search index; ``version`` (see
+    library_version) only keys the job for dedupe. Runs on a thread so the
+    index's writer lock covers every update in this process.
+    """
+    embedded = vector_index.update(progress=lambda note: ctx.progress(0.0, note))
+    return {"embedded": embedded, **vector_index.stats()}
+
+@job_handler("covenants.extract")
+def extract_covenants(payload: dict, ctx: JobContext) -> dict:
+    """Covenant extraction over the stored documents of ``deal_ids`` (all deals if absent); returns the report."""
+    report = extract_library_covenants(payload.get("deal_ids"), use_llm=payload.get("use_llm", True),
+                                       progress=ctx.progress)
+    return report.as_dict()
+
+@job_handler("web_search.portfolio_news")
+def portfolio_news(payload: dict, ctx: JobContext) -> dict:
+    ctx.progress(0.0, "Searching trusted financial sources...")
+    return search_portfolio_news(payload["company_names"], payload["themes"], payload.get("verticals"))
+
+@job_handler("web_search.investment_opportunities")
+def investment_opportunities(payload: dict, ctx: JobContext) -> dict:
+    ctx.progress(0.0, "Searching for opportunities...")
+    return search_investment_opportunities(payload["thesis"], payload["sectors"], payload["regions"],
+                                           payload["portfolio_companies"])
+
+@job_handler("reporting.weekly_update")
+def weekly_update(payload: dict, ctx: JobContext) -> dict:
+    """Weekly LP update email; the CRM pull is simulated (about three seconds)."""
+    for step in range(3):
+        ctx.progress(step / 3, "Extracting investor calls from Salesforce...")
+        time.sleep(1)
+    return {"generated": True}
+
+@job_handler("emails.triage")
+def triage_emails(payload: dict, ctx: JobContext) -> dict:
+    """Triage the emails with ids ``email_ids``; results are keyed by email id."""
+    with engine.connect() as conn:
+        rows = conn.execute(select(Email.id, Email.subject, Email.body)
+                            .where(Email.id.in_(payload["email_ids"]))).all()
+    results = {}
+    for done, (index, result) in enumerate(iter_triage_emails([(r.subject, r.body) for r in rows]), start=1):
+        results[str(rows[index].id)] = result
+        ctx.progress(done / len(rows), f"Triaged {done} of {len(rows)} email(s)")
+    return {"results": results}
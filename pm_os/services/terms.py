@@ -0,0 +1,335 @@
+"""
+Deterministic numeric term extraction for credit agreements and amendments.
+
+One regex pass over the text picks up typed terms: leverage-style ratios
+("5.0x", "5.00 to 1.00"), currency ("$10,000,000", "$15M"), margins
+("S+575", "SOFR + 5.75%"), basis points, percentages, day/month periods and
+test frequencies. Each term is labelled from a small glossary of credit
+terms found next to it in the same sentence and gets the section its
+clause cites ("New Section 3(d) is added: ...") or, failing that, the
+section it sits in. Amendment language that states the old value ("increased from
+$10,000,000 to $12,000,000", "(changed from 45 days)", "increased by 25
+basis points to S+575") is folded into the new term as ``was``.
+
+``diff_terms`` lines the terms of two versions up by (kind, label) and
+returns a before/after table; no LLM is involved, so it can run on every
+upload.
+"""
+import re
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import asdict, dataclass
+from pm_os.services.compare import SECTION_HEADING_RE
+
+_NUM = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+# The leading guard rejects most positions (inside words and numbers) before the alternatives are tried.
+TERM_RE = re.compile(
+    r"(?<![\w.,])(?=[$(\dslpbtdwmqaeu])"
+    r"(?:(?P<margin>\b(?P<index>Term\s+SOFR|SOFR|LIBOR|Prime|Base\s+Rate|S|L)\s*\+\s*"
+    rf"(?P<spread>{_NUM})\s*(?P<spread_unit>%|bps|basis\s+points)?)"
+    rf"|(?P<currency>(?:\$|USD\s?)\s?(?P<amount>{_NUM})(?:\s*(?P<scale>billion|million|thousand|bn|mm|[BMK])\b)?)"
+    rf"|(?P<ratio>\b(?P<times>{_NUM})\s*(?:x\b|:\s*1(?:\.0+)?\b|to\s+1(?:\.0+)?\b))"
+    rf"|(?P<bps>\b(?P<points>{_NUM})\s*(?:bps|basis\s+points)\b)"
+    rf"|(?P<percent>\b(?P<pct>{_NUM})\s*(?:%|percent\b))"
+    r"|(?P<period>\(?\b(?P<count>\d+)\)?\s*(?:calendar\s+|business\s+)?(?P<period_unit>days?|months?)\b)"
+    r"|(?P<frequency>\b(?:daily|weekly|monthly|quarterly|semi-annual(?:ly)?|annual(?:ly)?"
+    r"|each\s+(?:fiscal\s+)?(?:month|quarter|year)|per\s+annum)\b))",
+    re.IGNORECASE,
+)
+
+# Glossary of credit terms used as labels; the first pattern that matches wins at a given position.
+GLOSSARY = (
+    (r"debt\s+to\s+ebitda|(?:total\s+|senior\s+|net\s+|consolidated\s+)?leverage(?:\s+ratio)?", "Leverage Ratio"),
+    (r"fixed\s+charge\s+coverage(?:\s+ratio)?", "Fixed Charge Coverage Ratio"),
+    (r"interest\s+coverage(?:\s+ratio)?", "Interest Coverage Ratio"),
+    (r"(?:project\s+)?dscr|debt\s+service\s+coverage(?:\s+ratio)?", "DSCR"),
+    (r"(?:minimum\s+)?liquidity|minimum\s+cash|unrestricted\s+cash", "Minimum Liquidity"),
+    (r"(?:applicable\s+)?margin|(?:interest\s+)?spread|interest\s+rate|pricing", "Applicable Margin"),
+    (r"commitment\s+fee|unused\s+fee", "Commitment Fee"),
+    (r"term\s+loan|revolving\s+(?:credit\s+)?facility|revolver|credit\s+facility|commitments?", "Facility Size"),
+    (r"capex|capital\s+expenditures?", "CapEx Limit"),
+    (r"add-?backs?", "EBITDA Add-backs"),
+    (r"cross-?default", "Cross-Default Threshold"),
+    (r"cure(?:\s+period)?|equity\s+cure", "Cure Period"),
+    (r"make-?whole|prepayment(?:\s+premium|\s+penalty)?|call\s+protection", "Prepayment Protection"),
+    (r"excess\s+cash\s+flow(?:\s+sweep)?|cash\s+sweep", "Excess Cash Flow Sweep"),
+    (r"compliance\s+certificates?", "Compliance Certificate"),
+    (r"annual\s+(?:audited\s+)?financials?(?:\s+statements)?", "Annual Financial Statements"),
+    (r"financial\s+statements|financials", "Financial Statements"),
+    (r"(?:ar/ap\s+)?aging\s+reports?", "AR/AP Aging Reports"),
+    (r"maturity(?:\s+date)?", "Maturity"),
+)
+GLOSSARY_RE = re.compile(r"(?<![\w-])(?=[acdefilmnprstu])(?:"        # first letters of the glossary phrases
+                         + "|".join(f"(?P<g{i}>{p})" for i, (p, _) in enumerate(GLOSSARY)) + ")", re.IGNORECASE)
+SENTENCE_END_RE = re.compile(r"[.!?](?=\s+[\"(A-Z0-9])|;\s|\n\s*\n")
+_LE_RE = re.compile(r"(?:(?:not\s+|to\s+)exceed|no\s+(?:greater|more)\s+than|not\s+more\s+than|at\s+most"
+                    r"|maximum|less\s+than|within|up\s+to|≤|<=)\W*(?:\w+\W+){0,6}$", re.IGNORECASE)
+_GE_RE = re.compile(r"(?:at\s+least|not\s+less\s+than|no\s+less\s+than|minimum|≥|>=)\W*(?:\w+\W+){0,6}$",
+                    re.IGNORECASE)
+_OLD_RE = re.compile(r"\b(?:from|previously|formerly|was)\s+(?:[^\s;,()]+\s+){0,3}$", re.IGNORECASE)
+_NEW_RE = re.compile(r"\bto\s+(?:[^\s;,()]+\s+){0,2}$", re.IGNORECASE)
+_CITED_SECTION_RE = re.compile(r"\b(?:Section|§)\s*(\d+[A-Za-z]?(?:\.\d+)*(?:\([A-Za-z0-9]{1,4}\))*)(?!\w)")
+# Running amendment text ("Section 4 is hereby amended to ...", "Section 3(c) Minimum Liquidity threshold
+# is increased ...") cites a section; it does not start one.
+_AMENDING_RE = re.compile(r"[^\n.;]{0,100}?\b(?:is|are)\s+(?:hereby\s+)?(?:amended|restated|replaced|deleted|added"
+                          r"|modified|changed|increased|decreased|reduced|raised|lowered)\b", re.IGNORECASE)
+_DELTA_RE = re.compile(r"\b(?P<dir>increased|raised|decreased|reduced|lowered)\s+by\s+$", re.IGNORECASE)
+
+LABEL_WINDOW = 160      # characters before a term searched for its label
+QUALIFIER_WINDOW = 60   # characters before a term searched for "at least" / "not to exceed"
+_SCALES = {"b": 1e9, "billion": 1e9, "bn": 1e9, "m": 1e6, "mm": 1e6, "million": 1e6, "k": 1e3, "thousand": 1e3}
+_INDEXES = {"s": "SOFR", "term sofr": "SOFR", "sofr": "SOFR", "l": "LIBOR", "libor": "LIBOR",
+            "prime": "Prime", "base rate": "Base Rate"}
+_DEFAULT_LABELS = {"margin": "Applicable Margin"}
+_FREQUENCIES = {"daily": 0, "weekly": 1, "monthly": 2, "quarterly": 3, "semi-annually": 4, "annually": 5}
+_FREQUENCY_WORDS = {"daily": "daily", "weekly": "weekly", "monthly": "monthly", "month": "monthly",
+                    "quarterly": "quarterly", "quarter": "quarterly", "semi-annual": "semi-annually",
+                    "semi-annually": "semi-annually", "annual": "annually", "annually": "annually",
+                    "year": "annually", "annum": "annually"}
+
+@dataclass
+class Term:
+    kind: str                  # ratio, currency, margin, bps, percent, period, frequency
+    label: str                 # "Minimum Liquidity", "Leverage Ratio", ... or the section label
+    value: float | str         # number in the unit below, or the canonical frequency
+    unit: str                  # "x", "USD", "bps", "%", "days", "months", benchmark name for margins
+    qualifier: str             # "≥", "≤" or ""
+    section: str               # section cited earlier in its sentence, else the one it appears in ("" if neither)
+    text: str                  # the matched text
+    start: int
+    was: float | str | None = None   # previous value stated in amendment language
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.kind, self.label
+
+    def display(self, value: float | str | None = None) -> str:
+        return format_value(self.kind, self.value if value is None else value, self.unit, self.qualifier)
+
+def _num(value: float) -> str:
+    s = f"{value:,.2f}".rstrip("0")
+    return s + "0" if s.endswith(".") else s
+
+def format_value(kind: str, value: float | str, unit: str, qualifier: str = "") -> str:
+    if kind == "frequency":
+        text = str(value)
+    elif kind == "ratio":
+        text = f"{_num(value)}x"
+    elif kind == "currency":
+        for scale, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+            if abs(value) >= scale:
+                text = f"${_num(value / scale)}{suffix}"
+                break
+        else:
+            text = f"${_num(value)}"
+    elif kind == "margin":
+        text = f"{unit}+{value:g}"
+    elif kind == "bps":
+        text = f"{value:g} bps"
+    elif kind == "percent":
+        text = f"{_num(value)}%"
+    else:
+        text = f"{value:g} {unit}"
+    return f"{qualifier} {text}" if qualifier else text
+
+def glossary_label(match: re.Match) -> str:
+    """Label of the glossary phrase a ``GLOSSARY_RE`` match found."""
+    return GLOSSARY[int(match.lastgroup[1:])][1]
+
+def _number(raw: str) -> float:
+    return float(raw.replace(",", ""))
+
+def _parse(m: re.Match) -> tuple[str, float | str, str]:
+    """(kind, value, unit) of a TERM_RE match."""
+    if m["margin"]:
+        spread = _number(m["spread"])
+        if m["spread_unit"] == "%" or (m["spread_unit"] is None and spread < 20):
+            spread *= 100
+        return "margin", round(spread, 2), _INDEXES[" ".join(m["index"].lower().split())]
+    if m["currency"]:
+        return "currency", _number(m["amount"]) * _SCALES.get((m["scale"] or "").lower(), 1.0), "USD"
+    if m["ratio"]:
+        return "ratio", _number(m["times"]), "x"
+    if m["bps"]:
+        return "bps", _number(m["points"]), "bps"
+    if m["percent"]:
+        return "percent", _number(m["pct"]), "%"
+    if m["period"]:
+        unit = m["period_unit"].lower().rstrip("s") + "s"
+        return "period", float(m["count"]), unit
+    return "frequency", _FREQUENCY_WORDS[m["frequency"].lower().split()[-1]], ""
+
+def _label(glossary: list[tuple[int, int, str]], starts: list[int], text: str, start: int, end: int,
+           sentence_start: int, sentence_end: int) -> str | None:
+    """
+    Glossary label right after the term (an adjective use: "quarterly
+    compliance certificates"), else the nearest one before it in the same
+    sentence, else the next one after it.
+    """
+    i = bisect_left(starts, start)
+    if i < len(glossary):
+        g_start, _, label = glossary[i]
+        gap = text[end:g_start]
+        if g_start < min(sentence_end, end + 30) and (g_start < end or (len(gap.split()) <= 1 and "," not in gap)):
+            return label
+    if i and glossary[i - 1][0] >= max(sentence_start, start - LABEL_WINDOW):
+        return glossary[i - 1][2]
+    i = bisect_left(starts, end)
+    if i < len(glossary) and glossary[i][0] < min(sentence_end, end + 60):
+        return glossary[i][2]
+    return None
+
+def extract_terms(text: str) -> list[Term]:
+    """Typed numeric terms of ``text`` in document order, with amendment "from X to Y" folded into ``was``."""
+    bounds = [m.end() for m in SENTENCE_END_RE.finditer(text)]
+    heads = [(m.start(), m["number"]) for m in SECTION_HEADING_RE.finditer(text)
+             if not _AMENDING_RE.match(text, m.end("number"))]
+    head_starts = [h[0] for h in heads]
+    glossary = [(g.start(), g.end(), glossary_label(g)) for g in GLOSSARY_RE.finditer(text)]
+    glossary_starts = [g[0] for g in glossary]
+    cited = [(m.start(), m[1]) for m in _CITED_SECTION_RE.finditer(text)]
+    cited_starts = [c[0] for c in cited]
+    raw: list[tuple[int, Term, str]] = []     # (sentence index, term, role: "", "new", "old", "delta+" or "delta-")
+    for m in TERM_RE.finditer(text):
+        kind, value, unit = _parse(m)
+        start, end = m.start(kind), m.end(kind)
+        s = bisect_right(bounds, start)
+        sentence_start, sentence_end = (bounds[s - 1] if s else 0), (bounds[s] if s < len(bounds) else len(text))
+        before = text[max(sentence_start, start - QUALIFIER_WINDOW):start]
+        qualifier = "" if kind == "frequency" else "≤" if _LE_RE.search(before) else "≥" if _GE_RE.search(before) else ""
+        c = bisect_left(cited_starts, start)
+        h = bisect_right(head_starts, start)
+        section = (cited[c - 1][1] if c and cited[c - 1][0] >= sentence_start
+                   else heads[h - 1][1] if h else "")
+        label = (_label(glossary, glossary_starts, text, start, end, sentence_start, sentence_end)
+                 or _DEFAULT_LABELS.get(kind) or (f"Section {section}" if section else kind.title()))
+        delta = _DELTA_RE.search(before)
+        role = ("delta-" if delta["dir"].lower() in ("decreased", "reduced", "lowered") else "delta+") if delta \
+            else "new" if _NEW_RE.search(before) else "old" if _OLD_RE.search(before) else ""
+        raw.append((s, Term(kind, label, value, unit, qualifier, section, text[start:end], start), role))
+    return _fold_amendments(raw)
+
+def _fold_amendments(raw: list[tuple[int, Term, str]]) -> list[Term]:
+    """Attach stated old values (and "increased by N bps" deltas) to the new term of the same kind and sentence."""
+    by_sentence: dict[int, list[int]] = {}
+    for i, (sentence, _, _) in enumerate(raw):
+        by_sentence.setdefault(sentence, []).append(i)
+    dropped: set[int] = set()
+    for i, (sentence, term, role) in enumerate(raw):
+        if role not in ("old", "delta+", "delta-"):
+            continue
+        candidates = [j for j in by_sentence[sentence]
+                      if raw[j][2] in ("", "new") and raw[j][1].was is None
+                      and (raw[j][1].kind == term.kind or (role != "old" and term.kind == "bps" and raw[j][1].kind == "margin"))]
+        if not candidates:
+            continue
+        j = min(candidates, key=lambda j: (raw[j][1].label != term.label, abs(j - i)))
+        target = raw[j][1]
+        if role == "old":
+            target.was = term.value
+            target.qualifier = target.qualifier or term.qualifier
+        elif isinstance(target.value, float):
+            target.was = target.value - term.value if role == "delta+" else target.value + term.value
+        dropped.add(i)
+    return [t for i, (_, t, _) in enumerate(raw) if i not in dropped]
+
+def _distinct(terms: list[Term]) -> list[Term]:
+    """Terms with repeats of the same kind, label, section and value dropped."""
+    seen, out = set(), []
+    for t in terms:
+        if (t.key, t.section, t.value) not in seen:
+            seen.add((t.key, t.section, t.value))
+            out.append(t)
+    return out
+
+def _match(old: list[Term], new: list[Term]) -> list[int | None]:
+    """
+    For each new term, the index of its old counterpart (or None): same
+    kind, label and section first, then same kind and label anywhere (an
+    amendment's "Section 3(a)" restating a term of the agreement's Section
+    3), in document order.
+    """
+    matched: list[int | None] = [None] * len(new)
+    used: set[int] = set()
+    for key in (lambda t: (t.key, t.section), lambda t: t.key):
+        candidates: dict = {}
+        for i, t in enumerate(old):
+            if i not in used:
+                candidates.setdefault(key(t), []).append(i)
+        for indices in candidates.values():
+            indices.reverse()
+        for j, t in enumerate(new):
+            if matched[j] is None and candidates.get(key(t)):
+                matched[j] = candidates[key(t)].pop()
+                used.add(matched[j])
+    return matched
+
+def _direction(kind: str, qualifier: str, before: float | str, after: float | str) -> str:
+    if kind == "frequency":
+        a, b = _FREQUENCIES.get(str(before)), _FREQUENCIES.get(str(after))
+        if a is None or b is None:
+            return "changed"
+        return "tightened" if b < a else "loosened"
+    if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+        return "changed"
+    up = after > before
+    if qualifier == "≥":
+        return "tightened" if up else "loosened"
+    if qualifier == "≤":
+        return "loosened" if up else "tightened"
+    return "increased" if up else "decreased"
+
+def diff_terms(before: list[Term], after: list[Term], *, partial: bool = False) -> list[dict]:
+    """
+    Before/after rows ``{"term", "kind", "section", "before", "after", "change"}``
+    for two versions' terms, matched on kind, label and section. ``change`` is
+    unchanged, added, removed, tightened/loosened (for "at least"/"not to
+    exceed" thresholds and frequencies) or increased/decreased. With
+    ``partial`` (``after`` is an amendment that only restates what changes)
+    terms missing from ``after`` are left out rather than reported removed.
+    """
+    old, new = _distinct(before), _distinct(after)
+    matched = _match(old, new)
+    rows = []
+    for t, i in zip(new, matched):
+        prior = old[i] if i is not None else None
+        previous = prior.value if prior is not None else t.was
+        qualifier = t.qualifier or (prior.qualifier if prior else "")
+        if previous is None:
+            change = "added"
+        elif previous == t.value:
+            change = "unchanged"
+        else:
+            change = _direction(t.kind, qualifier, previous, t.value)
+        rows.append({"term": t.label, "kind": t.kind, "section": t.section or (prior.section if prior else ""),
+                     "before": format_value(t.kind, previous, t.unit, qualifier) if previous is not None else None,
+                     "after": format_value(t.kind, t.value, t.unit, qualifier), "change": change})
+    if not partial:
+        kept = set(matched)
+        rows += [{"term": t.label, "kind": t.kind, "section": t.section, "before": t.display(), "after": None,
+                  "change": "removed"} for i, t in enumerate(old) if i not in kept]
+    return rows
+
+def is_amendment(text: str) -> bool:
+    """True when the opening of ``text`` calls itself an amendment (it then restates only what changes)."""
+    return re.search(r"\bamendment\b", text[:500], re.IGNORECASE) is not None
+
+def term_changes(text_a: str, text_b: str, *, partial: bool | None = None) -> dict:
+    """
+    Numeric term changes from ``text_a`` to ``text_b``: ``{"changes": rows,
+    "stats": {...}}``. ``partial`` defaults to whether ``text_b`` is an
+    amendment.
+    """
+    t0 = time.perf_counter()
+    terms_a, terms_b = extract_terms(text_a), extract_terms(text_b)
+    partial = is_amendment(text_b) if partial is None else partial
+    rows = diff_terms(terms_a, terms_b, partial=partial)
+    counts: dict[str, int] = {}
+    for r in rows:
+        counts[r["change"]] = counts.get(r["change"], 0) + 1
+    return {"changes": rows,
+            "stats": {"terms_a": len(terms_a), "terms_b": len(terms_b), "partial": partial, **counts,
+                      "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}}
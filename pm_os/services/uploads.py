@@ -0,0 +1,54 @@
+"""
+Spooling of Streamlit uploads to disk.
+
+``st.file_uploader`` hands us an in-memory buffer; copying it with
+``read()``/``getvalue()`` doubles the footprint for every concurrent upload.
+``spool_upload`` streams it to a temporary file in fixed-size blocks,
+hashing as it goes, so extraction can work from a memory-mapped file and
+the document store can key on the digest without another pass.
+``save_upload`` keeps the file for background jobs, which outlive the
+request that submitted them.
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
+from typing import Iterator
+from pm_os.config import settings
+
+SPOOL_BLOCK = 1024 * 1024
+
+@dataclass(frozen=True)
+class SpooledUpload:
+    name: str
+    path: str
+    size: int
+    digest: str   # sha256 of the file contents
+
+@contextmanager
+def spool_upload(uploaded_file, *, spool_dir: str | None = None) -> Iterator[SpooledUpload]:
+    """Copy ``uploaded_file`` to a temporary file for the duration of the block."""
+    spool_dir = spool_dir or settings.upload_spool_dir or None
+    if spool_dir:
+        os.makedirs(spool_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="pm_os_upload_", dir=spool_dir)
+    try:
+        digest, size = hashlib.sha256(), 0
+        uploaded_file.seek(0)
+        with os.fdopen(fd, "wb") as out:
+            while block := uploaded_file.read(SPOOL_BLOCK):
+                digest.update(block)
+                out.write(block)
+                size += len(block)
+        yield SpooledUpload(getattr(uploaded_file, "name", os.path.basename(path)), path, size, digest.hexdigest())
+    finally:
+        with suppress(FileNotFoundError):
+            os.unlink(path)
+
+def save_upload(uploaded_file, *, spool_dir: str | None = None) -> SpooledUpload:
+    """Spool ``uploaded_file`` to ``<digest>.pdf`` in the spool directory and keep it; the caller removes it."""
+    with spool_upload(uploaded_file, spool_dir=spool_dir) as upload:
+        path = os.path.join(os.path.dirname(upload.path), f"pm_os_upload_{upload.digest}.pdf")
+        os.replace(upload.path, path)
+    return SpooledUpload(upload.name, path, upload.size, upload.digest)
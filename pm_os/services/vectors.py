@@ -0,0 +1,413 @@
+"""
+Local semantic search over documents, emails and market snippets.
+
+Text is embedded without a GPU or network call: word and bigram counts are
+hashed into a fixed feature space, weighted by TF-IDF and projected onto an
+LSA basis (truncated SVD fitted on a sample of the library), so texts that
+share context ("leverage test", "Debt to EBITDA") land near each other.
+
+The index is a directory:
+
+- ``model.npz``      IDF weights and the SVD basis
+- ``vectors.f32``    row-major float32 matrix, one unit vector per row (memory-mapped)
+- ``keys.i64``       the row's kind code and id, packed into one int64
+- ``dead.i64``       positions of superseded rows (edited or deleted since embedded)
+- ``manifest.json``  row and dead counts, dimension, the highest id indexed
+                     per kind and the last ``content_changes`` id applied
+
+New rows are appended to the end of the files and the manifest is
+replaced last, so a crash mid-append leaves the previous rows readable.
+Rows edited or deleted in the database (logged by triggers, see
+pm_os.revisions) are marked dead and, if they still exist, re-embedded and
+appended again. Search scans the matrix in blocks with one matrix product
+per block, skips dead rows and keeps a running top-k, so memory stays flat
+at any index size. Searching never writes: ``build`` and ``update`` run as
+the ``vectors.update`` background job or from the command line.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from sqlalchemy import DateTime, bindparam, text
+from pm_os.config import settings
+from pm_os.db import engine
+from pm_os.fts import FTS_INDEXES
+from pm_os.revisions import changes_since, last_change_id, prune_changes
+from pm_os.services.search import KIND_SQL
+
+N_FEATURES = 2 ** 15
+MODEL_VERSION = 2
+KIND_CODES = {"document": 1, "email": 2, "snippet": 3}
+SEARCH_KINDS = tuple(KIND_CODES)
+KIND_NAMES = {code: kind for kind, code in KIND_CODES.items()}
+_KEY_SHIFT = 40           # key = kind code << 40 | row id
+SEARCH_BLOCK_ROWS = 65_536
+
+_hasher = HashingVectorizer(n_features=N_FEATURES, ngram_range=(1, 2), stop_words="english",
+                            alternate_sign=False, norm=None, dtype=np.float32)
+
+def _text_sql(kind: str) -> str:
+    return " || ' ' || ".join(f"coalesce(src.{c}, '')" for c in FTS_INDEXES[kind].columns)
+
+def pack_keys(kind: str, ids) -> np.ndarray:
+    return (np.int64(KIND_CODES[kind]) << _KEY_SHIFT) | np.asarray(ids, dtype=np.int64)
+
+def unpack_key(key: int) -> tuple[str, int]:
+    return KIND_NAMES[int(key) >> _KEY_SHIFT], int(key) & ((1 << _KEY_SHIFT) - 1)
+
+class TextEmbedder:
+    """Hashed TF-IDF features projected onto a fitted LSA basis; output rows are unit vectors."""
+
+    def __init__(self, idf: np.ndarray, components: np.ndarray):
+        self.idf = idf.astype(np.float32)
+        self.components = components.astype(np.float32)     # (dim, N_FEATURES)
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @staticmethod
+    def _tf(texts: list[str]):
+        counts = _hasher.transform(texts)
+        counts.data = 1.0 + np.log(counts.data)    # sublinear term frequency
+        return counts
+
+    @classmethod
+    def fit(cls, texts: list[str], dim: int = settings.vector_dim) -> "TextEmbedder":
+        tf = cls._tf(texts)
+        df = np.bincount(tf.indices, minlength=N_FEATURES)
+        idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+        weighted = normalize(tf.multiply(idf.astype(np.float32)).tocsr())
+        svd = TruncatedSVD(n_components=max(1, min(dim, len(texts) - 1, N_FEATURES - 1)),
+                           algorithm="randomized", random_state=0)
+        svd.fit(weighted)
+        return cls(idf, svd.components_)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        weighted = normalize(self._tf(texts).multiply(self.idf).tocsr())
+        return normalize(np.asarray(weighted @ self.components.T, dtype=np.float32))
+
+    def save(self, path: str):
+        np.savez(path, idf=self.idf, components=self.components, version=MODEL_VERSION)
+
+    @classmethod
+    def load(cls, path: str) -> "TextEmbedder":
+        with np.load(path) as data:
+            return cls(data["idf"], data["components"])
+
+class VectorIndex:
+    """Persistent float32 vector index; see the module docstring for the file layout."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()         # one writer at a time
+        self._embedder: TextEmbedder | None = None
+        self._manifest: dict | None = None
+        self._vectors: np.ndarray | None = None
+        self._keys: np.ndarray | None = None
+        self._dead: np.ndarray | None = None  # bool mask over rows
+
+    def _file(self, name: str, root: str | None = None) -> str:
+        return os.path.join(root or self.path, name)
+
+    # --- loading ----------------------------------------------------------
+
+    def _read_manifest(self) -> dict | None:
+        try:
+            with open(self._file("manifest.json")) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        return manifest if manifest.get("version") == MODEL_VERSION else None
+
+    def _open(self):
+        """(Re)map the files if the manifest changed since they were last mapped."""
+        manifest = self._read_manifest()
+        if manifest is None:
+            self._manifest = self._embedder = self._vectors = self._keys = self._dead = None
+            return
+        if self._manifest and all(manifest[f] == self._manifest[f] for f in ("built_at", "count", "dead")):
+            return
+        if self._embedder is None or manifest["built_at"] != (self._manifest or {}).get("built_at"):
+            self._embedder = TextEmbedder.load(self._file("model.npz"))
+        count, dim = manifest["count"], manifest["dim"]
+        if count:
+            self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim))
+            self._keys = np.memmap(self._file("keys.i64"), dtype=np.int64, mode="r", shape=(count,))
+        else:
+            self._vectors = np.zeros((0, dim), dtype=np.float32)
+            self._keys = np.zeros(0, dtype=np.int64)
+        self._dead = np.zeros(count, dtype=bool)
+        self._dead[np.fromfile(self._file("dead.i64"), dtype=np.int64, count=manifest["dead"])] = True
+        self._manifest = manifest
+
+    @property
+    def count(self) -> int:
+        self._open()
+        return self._manifest["count"] if self._manifest else 0
+
+    def stats(self) -> dict:
+        self._open()
+        if self._manifest is None:
+            return {"rows": 0, "dim": 0, "mb": 0.0}
+        m = self._manifest
+        return {"rows": m["count"], "dead": m["dead"], "dim": m["dim"],
+                "mb": round(m["count"] * m["dim"] * 4 / 1024 ** 2, 1), "built_at": m["built_at"],
+                "high_water": m["high_water"]}
+
+    # --- writing ----------------------------------------------------------
+
+    @staticmethod
+    def _write_manifest(root: str, manifest: dict):
+        tmp = os.path.join(root, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(root, "manifest.json"))
+
+    @contextmanager
+    def _appender(self, root: str, manifest: dict):
+        """
+        Yield ``write(keys, vectors, dead=())``: appends rows (and positions of
+        rows they supersede) to the files, then commits them in the manifest.
+        """
+        with open(self._file("vectors.f32", root), "r+b") as vf, open(self._file("keys.i64", root), "r+b") as kf, \
+                open(self._file("dead.i64", root), "r+b") as df:
+            # Bytes past the manifest's counts belong to an append that never committed.
+            vf.truncate(manifest["count"] * manifest["dim"] * 4)
+            kf.truncate(manifest["count"] * 8)
+            df.truncate(manifest["dead"] * 8)
+            for f in (vf, kf, df):
+                f.seek(0, os.SEEK_END)
+
+            def write(keys: np.ndarray, vectors: np.ndarray, dead=()):
+                vf.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                kf.write(np.asarray(keys, dtype=np.int64).tobytes())
+                df.write(np.asarray(dead, dtype=np.int64).tobytes())
+                for f in (vf, kf, df):
+                    f.flush()
+                manifest["count"] += len(keys)
+                manifest["dead"] += len(dead)
+                self._write_manifest(root, manifest)
+
+            yield write
+
+    def _append_rows(self, root: str, manifest: dict, embedder: TextEmbedder, kind: str,
+                     batch_size: int, progress: Callable[[str], None] | None) -> int:
+        table = FTS_INDEXES[kind].table
+        sql = text(f"SELECT src.id AS id, {_text_sql(kind)} AS body FROM {table} AS src "
+                   f"WHERE src.id > :after ORDER BY src.id LIMIT :limit")
+        added = 0
+        with self._appender(root, manifest) as write:
+            while True:
+                with engine.connect() as conn:
+                    rows = conn.execute(sql, {"after": manifest["high_water"][kind], "limit": batch_size}).all()
+                if not rows:
+                    break
+                manifest["high_water"][kind] = rows[-1].id
+                write(pack_keys(kind, [r.id for r in rows]), embedder.embed([r.body for r in rows]))
+                added += len(rows)
+                if progress:
+                    progress(f"{kind}: {added:,} row(s) embedded")
+        return added
+
+    def _apply_changes(self, manifest: dict, embedder: TextEmbedder, batch_size: int,
+                       progress: Callable[[str], None] | None) -> int:
+        """Mark rows edited or deleted since the last update dead and re-embed the edited ones; returns rows embedded."""
+        with engine.connect() as conn:
+            last, changed = changes_since(conn, manifest["changes"])
+        if last == manifest["changes"]:
+            return 0
+        # Rows above the high-water mark have never been embedded; the append picks them up.
+        ids = {kind: sorted(i for i in changed.get(FTS_INDEXES[kind].table, ())
+                            if i <= manifest["high_water"][kind])
+               for kind in KIND_CODES}
+        stale = np.concatenate([pack_keys(kind, row_ids) for kind, row_ids in ids.items()])
+        dead = np.flatnonzero(np.isin(self._keys, stale) & ~self._dead)
+        keys, vectors = [], []
+        with engine.connect() as conn:
+            for kind, row_ids in ids.items():
+                sql = text(f"SELECT src.id AS id, {_text_sql(kind)} AS body FROM {FTS_INDEXES[kind].table} AS src "
+                           f"WHERE src.id IN :ids ORDER BY src.id").bindparams(bindparam("ids", expanding=True))
+                for start in range(0, len(row_ids), batch_size):
+                    rows = conn.execute(sql, {"ids": row_ids[start:start + batch_size]}).all()
+                    if rows:
+                        keys.append(pack_keys(kind, [r.id for r in rows]))
+                        vectors.append(embedder.embed([r.body for r in rows]))
+        manifest["changes"] = last
+        with self._appender(self.path, manifest) as write:
+            write(np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64),
+                  np.concatenate(vectors) if vectors else np.zeros((0, manifest["dim"]), dtype=np.float32), dead)
+        with engine.begin() as conn:
+            prune_changes(conn, last)
+        if progress:
+            progress(f"{len(dead):,} edited or deleted row(s) dropped, {sum(map(len, keys)):,} re-embedded")
+        return sum(map(len, keys))
+
+    def _create(self, root: str, embedder: TextEmbedder, changes: int = 0) -> dict:
+        shutil.rmtree(root, ignore_errors=True)
+        os.makedirs(root)
+        embedder.save(self._file("model.npz", root))
+        for name in ("vectors.f32", "keys.i64", "dead.i64"):
+            open(self._file(name, root), "wb").close()
+        manifest = {"version": MODEL_VERSION, "dim": embedder.dim, "count": 0, "dead": 0, "changes": changes,
+                    "built_at": time.time(), "high_water": {kind: 0 for kind in KIND_CODES}}
+        self._write_manifest(root, manifest)
+        return manifest
+
+    def create(self, embedder: TextEmbedder):
+        """Start an empty index with ``embedder`` at this path, replacing any existing one."""
+        with self._lock:
+            self._create(self.path, embedder)
+
+    def append(self, keys: np.ndarray, vectors: np.ndarray):
+        """Append precomputed unit ``vectors`` under packed ``keys`` (see ``pack_keys``)."""
+        with self._lock:
+            manifest = self._read_manifest()
+            with self._appender(self.path, manifest) as write:
+                write(keys, vectors)
+
+    def _sample_texts(self, sample: int) -> list[str]:
+        counts, texts = {}, []
+        with engine.connect() as conn:
+            for kind in KIND_CODES:
+                counts[kind] = conn.exec_driver_sql(f"SELECT count(*) FROM {FTS_INDEXES[kind].table}").scalar()
+            total = sum(counts.values()) or 1
+            for kind in KIND_CODES:
+                n = max(1, round(sample * counts[kind] / total)) if counts[kind] else 0
+                texts.extend(conn.execute(text(
+                    f"SELECT {_text_sql(kind)} FROM {FTS_INDEXES[kind].table} AS src "
+                    f"ORDER BY random() LIMIT :n"), {"n": n}).scalars())
+        return [t for t in texts if t.strip()]
+
+    def _build(self, sample: int, batch_size: int, progress: Callable[[str], None] | None) -> int:
+        texts = self._sample_texts(sample)
+        if not texts:
+            return 0
+        t0 = time.perf_counter()
+        embedder = TextEmbedder.fit(texts)
+        if progress:
+            progress(f"Fitted a {embedder.dim}-dimension model on {len(texts):,} texts "
+                     f"in {time.perf_counter() - t0:.1f}s")
+        # Changes logged from here on are applied by the next update; earlier ones are in the rows read now.
+        with engine.connect() as conn:
+            changes = last_change_id(conn)
+        tmp = self.path + ".tmp"
+        manifest = self._create(tmp, embedder, changes)
+        for kind in KIND_CODES:
+            self._append_rows(tmp, manifest, embedder, kind, batch_size, progress)
+        old = self.path + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old)
+        os.rename(tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)   # open maps keep reading the unlinked files
+        with engine.begin() as conn:
+            prune_changes(conn, changes)
+        return manifest["count"]
+
+    def build(self, *, sample: int = settings.vector_fit_sample, batch_size: int = 2000,
+              progress: Callable[[str], None] | None = None) -> int:
+        """Fit a new model on a sample of the library and re-embed every row. Returns the row count."""
+        with self._lock:
+            return self._build(sample, batch_size, progress)
+
+    def update(self, *, batch_size: int = 2000, progress: Callable[[str], None] | None = None) -> int:
+        """
+        Bring the index up to date with the database: re-embed rows edited
+        since the last build or update, drop deleted ones and embed new rows.
+        Builds the index if there is none. Returns rows embedded.
+        """
+        with self._lock:
+            # Checked under the lock, so concurrent first updates build the index once.
+            if self._read_manifest() is None:
+                return self._build(settings.vector_fit_sample, batch_size, progress)
+            self._open()
+            manifest, embedder = dict(self._manifest), self._embedder
+            manifest["high_water"] = dict(manifest["high_water"])
+            reembedded = self._apply_changes(manifest, embedder, batch_size, progress)
+            return reembedded + sum(self._append_rows(self.path, manifest, embedder, kind, batch_size, progress)
+                                    for kind in KIND_CODES)
+
+    # --- search -----------------------------------------------------------
+
+    def embed(self, texts: list[str]) -> np.ndarray | None:
+        self._open()
+        return self._embedder.embed(texts) if self._embedder else None
+
+    def top_k(self, queries: np.ndarray, k: int = 10, *, kinds: tuple[str, ...] | None = None,
+              block_rows: int = SEARCH_BLOCK_ROWS) -> list[list[tuple[int, float]]]:
+        """
+        Cosine top-``k`` ``(key, score)`` pairs for each row of ``queries``
+        (unit vectors), best first. The matrix is scanned in blocks of
+        ``block_rows``; each block is scored against every query at once.
+        """
+        self._open()
+        vectors, keys, dead = self._vectors, self._keys, self._dead
+        queries = np.atleast_2d(queries).astype(np.float32)
+        if vectors is None or not len(vectors):
+            return [[] for _ in queries]
+        codes = np.array([KIND_CODES[kind] for kind in kinds]) if kinds else None
+        rows = np.arange(len(queries))[:, None]
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        best_keys = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(vectors), block_rows):
+            scores = queries @ vectors[start:start + block_rows].T           # (queries, rows)
+            block_keys = np.asarray(keys[start:start + block_rows])
+            scores[:, dead[start:start + block_rows]] = -np.inf
+            if codes is not None:
+                scores[:, ~np.isin(block_keys >> _KEY_SHIFT, codes)] = -np.inf
+            if scores.shape[1] > k:
+                top = np.argpartition(scores, -k, axis=1)[:, -k:]
+                scores, block_top = scores[rows, top], block_keys[top]
+            else:
+                block_top = np.broadcast_to(block_keys, scores.shape)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_keys = np.concatenate([best_keys, block_top], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(best_scores, -k, axis=1)[:, -k:]
+                best_scores, best_keys = best_scores[rows, keep], best_keys[rows, keep]
+        order = np.argsort(-best_scores, axis=1)
+        return [[(int(best_keys[q, i]), float(best_scores[q, i])) for i in order[q] if np.isfinite(best_scores[q, i])]
+                for q in range(len(queries))]
+
+vector_index = VectorIndex(settings.vector_index_dir)
+
+def _hydrate(hits: list[tuple[int, float]]) -> list[dict]:
+    by_kind: dict[str, dict[int, float]] = {}
+    for key, score in hits:
+        kind, row_id = unpack_key(key)
+        by_kind.setdefault(kind, {})[row_id] = score
+    out = []
+    with engine.connect() as conn:
+        for kind, scores in by_kind.items():
+            frag = KIND_SQL[kind]
+            sql = text(f"""
+                SELECT src.id AS id, {frag['title']} AS title, {frag['deal'] or 'NULL'} AS deal_id,
+                       {frag['date'] or 'NULL'} AS dated, substr({_text_sql(kind)}, 1, 240) AS snippet
+                FROM {FTS_INDEXES[kind].table} AS src
+                WHERE src.id IN :ids
+            """).bindparams(bindparam("ids", expanding=True)).columns(dated=DateTime)
+            for r in conn.execute(sql, {"ids": list(scores)}):
+                out.append({"kind": kind, "id": r.id, "title": r.title, "deal_id": r.deal_id,
+                            "date": r.dated, "snippet": r.snippet, "score": round(scores[r.id], 4)})
+    out.sort(key=lambda h: h["score"], reverse=True)
+    return out
+
+def semantic_search(query: str, *, kinds: tuple[str, ...] = SEARCH_KINDS,
+                    limit: int = 20) -> list[dict]:
+    """
+    Nearest rows to ``query`` by cosine similarity, in the same shape as
+    ``search.search`` (``snippet`` is the opening of the text). Reads the
+    index as last built or updated; empty until the first build.
+    """
+    vectors = vector_index.embed([query])
+    if vectors is None or not np.any(vectors):
+        return []
+    return _hydrate(vector_index.top_k(vectors, limit, kinds=kinds)[0])
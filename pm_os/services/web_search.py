@@ -1,6 +1,8 @@
-from openai import OpenAI
 from pm_os.config import settings
-import json
+from pm_os.llm.client import LLMClient
+from pm_os.singleflight import singleflight
+
+llm = LLMClient(demo_mode=False, service="web_search")
 
 def _get_domains_for_verticals(verticals: list[str]) -> list[str]:
     """Get relevant domains based on selected verticals."""
@@ -40,6 +42,7 @@ def _get_domains_for_verticals(verticals: list[str]) -> list[str]:
     
     return list(set(domains))
 
+@singleflight("web_search")
 def search_portfolio_news(company_names: list[str], themes: list[str], verticals: list[str] = None) -> dict:
     """
     Search for equity research news relevant to portfolio companies
@@ -50,8 +53,6 @@ def search_portfolio_news(company_names: list[str], themes: list[str], verticals
             "error": "OpenAI API key not configured. Please add OPENAI_API_KEY to .streamlit/secrets.toml file."
         }
     
-    client = OpenAI(api_key=settings.openai_api_key)
-    
     company_list = ", ".join(company_names[:10])
     theme_list = ", ".join(set(themes[:15]))
     
@@ -114,25 +115,12 @@ For each relevant article:
 Keep all content brief and focused on quantitative market developments."""
     
     try:
-        response = client.responses.create(
-            model="gpt-4o",
-            tools=[
-                {
-                    "type": "web_search",
-                    "filters": {
-                        "allowed_domains": allowed_domains
-                    },
-                }
-            ],
-            tool_choice="auto",
-            include=["web_search_call.action.sources"],
-            input=search_query,
-        )
+        result = llm.web_search(search_query, allowed_domains=allowed_domains)
         
         return {
             "success": True,
-            "output": response.output_text,
-            "sources": getattr(response, 'sources', []) if hasattr(response, 'sources') else []
+            "output": result["output"],
+            "sources": result["sources"]
         }
         
     except Exception as e:
@@ -175,6 +163,7 @@ def _get_domains_for_sectors(sectors: list[str]) -> list[str]:
     
     return list(set(domains))
 
+@singleflight("web_search")
 def search_investment_opportunities(thesis: str, sectors: list[str], regions: list[str], portfolio_companies: list[dict]) -> dict:
     """
     Search for new investment opportunities - actual companies with portfolio fit scores.
@@ -184,8 +173,6 @@ def search_investment_opportunities(thesis: str, sectors: list[str], regions: li
             "error": "OpenAI API key not configured. Please add OPENAI_API_KEY to .streamlit/secrets.toml file."
         }
     
-    client = OpenAI(api_key=settings.openai_api_key)
-    
     portfolio_summary = []
     for c in portfolio_companies[:10]:
         portfolio_summary.append(f"{c.get('name')} - {c.get('sector')}: {', '.join(c.get('themes', []))}")
@@ -258,25 +245,12 @@ Search for companies with:
 - Clear alignment with investment thesis and sector focus"""
     
     try:
-        response = client.responses.create(
-            model="gpt-4o",
-            tools=[
-                {
-                    "type": "web_search",
-                    "filters": {
-                        "allowed_domains": allowed_domains
-                    },
-                }
-            ],
-            tool_choice="auto",
-            include=["web_search_call.action.sources"],
-            input=search_query,
-        )
+        result = llm.web_search(search_query, allowed_domains=allowed_domains)
         
         return {
             "success": True,
-            "output": response.output_text,
-            "sources": getattr(response, 'sources', []) if hasattr(response, 'sources') else []
+            "output": result["output"],
+            "sources": result["sources"]
         }
         
     except Exception as e:
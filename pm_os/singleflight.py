@@ -0,0 +1,94 @@
+"""
+Process-wide single-flight de-duplication.
+
+When several Streamlit sessions ask for the same expensive result at the
+same time (same document parse, same web search, same LLM prompt), only
+the first caller runs it; the others wait on its future and receive a copy
+of the same result. Nothing is remembered once the call finishes; caching
+is the response cache's job.
+"""
+import copy
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Callable
+from pm_os.cache import stable_key
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executed": 0, "merged": 0, "errors": 0}
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> tuple[object, bool]:
+        """
+        Run ``fn(*args, **kwargs)`` unless a call with ``key`` is already in
+        flight, in which case wait for it. Returns ``(result, shared)`` where
+        ``shared`` is True for callers that were merged into another's call.
+        Exceptions propagate to every waiter.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self._stats["executed"] += 1
+            else:
+                self._stats["merged"] += 1
+
+        if not leader:
+            # Followers get their own copy so no session can mutate another's result.
+            return copy.deepcopy(future.result()), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["in_flight"] = self.in_flight()
+        return out
+
+_groups: dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+def flight_group(name: str) -> SingleFlight:
+    """The shared group called ``name``, created on first use."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+def singleflight(group: str):
+    """Decorator: identical concurrent calls (same function, same arguments) share one execution."""
+    def decorate(fn: Callable):
+        flights = flight_group(group)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = stable_key(fn.__module__, fn.__qualname__, args, kwargs)
+            return flights.do(key, fn, *args, **kwargs)[0]
+        return wrapper
+    return decorate
+
+def singleflight_stats() -> dict[str, dict]:
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
@@ -0,0 +1,127 @@
+"""
+Normalized tag storage and SQL-side tag filters.
+
+The comma-joined tag columns (``Company.tags``, ``Deal.thesis_tags``,
+``Email.tags``, ``MarketSnippet.tags``) stay the write interface; SQLite
+triggers installed by migration 3 mirror them into the shared ``tags``
+table and one link table per entity, so every write path (ORM, Core bulk
+inserts, raw SQL) keeps the index current.
+"""
+from dataclasses import dataclass
+from typing import Iterable
+from sqlalchemy import Select, Table, select, func
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql.elements import ColumnElement
+from pm_os.models import (
+    Company, Deal, Email, MarketSnippet, Tag,
+    company_tags, deal_tags, email_tags, market_snippet_tags,
+)
+
+@dataclass(frozen=True)
+class TagLink:
+    table: str          # entity table, e.g. "emails"
+    column: str         # comma-joined source column
+    link: Table         # association table
+    entity_col: str     # association column pointing at the entity
+
+TAG_LINKS = {
+    Company: TagLink("companies", "tags", company_tags, "company_id"),
+    Deal: TagLink("deals", "thesis_tags", deal_tags, "deal_id"),
+    Email: TagLink("emails", "tags", email_tags, "email_id"),
+    MarketSnippet: TagLink("market_snippets", "tags", market_snippet_tags, "snippet_id"),
+}
+
+def normalize_tags(tags: Iterable[str] | str | None) -> list[str]:
+    """Split/trim/lowercase tags, dropping blanks and duplicates while keeping order."""
+    if tags is None:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    seen = []
+    for t in tags:
+        t = str(t).strip().lower()
+        if t and t not in seen:
+            seen.append(t)
+    return seen
+
+def join_tags(tags: Iterable[str] | str | None) -> str:
+    return ",".join(normalize_tags(tags))
+
+def _split_sql(expr: str) -> str:
+    # Turn 'a, b,c' into a JSON array and explode it with json_each (usable inside triggers,
+    # unlike recursive CTEs). json_quote escapes quotes, backslashes and control characters,
+    # and never emits a comma inside an escape, so splitting the quoted string on ',' is safe.
+    return f"json_each('[' || replace(json_quote({expr}), ',', '\",\"') || ']')"
+
+def _link_rows_sql(link: TagLink, row: str) -> list[str]:
+    split = _split_sql(f"{row}.{link.column}")
+    # ON CONFLICT DO NOTHING rather than INSERT OR IGNORE: an outer upsert's ABORT policy
+    # overrides OR IGNORE inside triggers, but not an explicit upsert clause.
+    return [
+        f"INSERT INTO tags (name) SELECT DISTINCT lower(trim(value)) FROM {split} "
+        f"WHERE trim(value) <> '' ON CONFLICT DO NOTHING",
+        f"INSERT INTO {link.link.name} (tag_id, {link.entity_col}) "
+        f"SELECT tags.id, {row}.id FROM tags WHERE tags.name IN "
+        f"(SELECT lower(trim(value)) FROM {split}) ON CONFLICT DO NOTHING",
+    ]
+
+def _trigger_prefix(link: TagLink) -> str:
+    return f"trg_{link.table}_{link.column}"
+
+def drop_tag_triggers(conn: Connection, link: TagLink):
+    """Suspend trigger maintenance for a bulk load; follow with install + backfill."""
+    for suffix in ("ai", "au", "ad"):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {_trigger_prefix(link)}_{suffix}")
+
+def install_tag_triggers(conn: Connection, link: TagLink):
+    prefix = _trigger_prefix(link)
+    unlink = f"DELETE FROM {link.link.name} WHERE {link.entity_col} = OLD.id"
+    bodies = {
+        "ai": (f"AFTER INSERT ON {link.table}", _link_rows_sql(link, "NEW")),
+        "au": (f"AFTER UPDATE OF {link.column} ON {link.table}", [unlink] + _link_rows_sql(link, "NEW")),
+        "ad": (f"AFTER DELETE ON {link.table}", [unlink]),
+    }
+    for suffix, (when, stmts) in bodies.items():
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {prefix}_{suffix}")
+        conn.exec_driver_sql(f"CREATE TRIGGER {prefix}_{suffix} {when} BEGIN {'; '.join(stmts)}; END")
+
+def backfill_tags(conn: Connection, link: TagLink):
+    """Rebuild one link table from its comma-joined column in two set-based statements."""
+    split = _split_sql(f"e.{link.column}")
+    conn.exec_driver_sql(f"DELETE FROM {link.link.name}")
+    conn.exec_driver_sql(
+        f"INSERT OR IGNORE INTO tags (name) SELECT DISTINCT lower(trim(j.value)) "
+        f"FROM {link.table} e, {split} j WHERE trim(j.value) <> ''"
+    )
+    conn.exec_driver_sql(
+        f"INSERT OR IGNORE INTO {link.link.name} (tag_id, {link.entity_col}) "
+        f"SELECT t.id, e.id FROM {link.table} e, {split} j "
+        f"JOIN tags t ON t.name = lower(trim(j.value))"
+    )
+
+def _tagged_ids(model, tags: Iterable[str] | str):
+    link = TAG_LINKS[model]
+    names = normalize_tags(tags)
+    entity = link.link.c[link.entity_col]
+    stmt = (select(entity)
+            .join(Tag, Tag.id == link.link.c.tag_id)
+            .where(Tag.name.in_(names)))
+    return stmt, entity, names
+
+def any_tags(model, tags: Iterable[str] | str) -> ColumnElement[bool]:
+    """WHERE clause matching rows of ``model`` carrying at least one of ``tags``."""
+    stmt, _, _ = _tagged_ids(model, tags)
+    return model.id.in_(stmt)
+
+def all_tags(model, tags: Iterable[str] | str) -> ColumnElement[bool]:
+    """WHERE clause matching rows of ``model`` carrying every one of ``tags``."""
+    stmt, entity, names = _tagged_ids(model, tags)
+    return model.id.in_(stmt.group_by(entity).having(func.count() == len(names)))
+
+def tag_counts(model) -> Select:
+    """SELECT (tag name, row count) for ``model``, most used first."""
+    link = TAG_LINKS[model]
+    return (select(Tag.name, func.count().label("n"))
+            .join(link.link, link.link.c.tag_id == Tag.id)
+            .group_by(Tag.name)
+            .order_by(func.count().desc()))
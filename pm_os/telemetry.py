@@ -0,0 +1,168 @@
+"""
+LLM call telemetry: per-call latency, tokens, estimated cost, retries and
+cache status, tagged by calling service and schema, stored in ``llm_calls``.
+
+Records are buffered in memory and written in batches by a daemon thread,
+so instrumenting a call never waits on SQLite. Telemetry failures (for
+example a database that has not been migrated yet) drop the batch rather
+than failing the LLM call.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, bindparam, insert, text
+from sqlalchemy.engine import Engine
+from pm_os.config import settings
+from pm_os.db import engine as default_engine
+from pm_os.models import LLMCall
+
+# USD per 1M tokens (prompt, completion); matched on the longest model-name prefix.
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "o4-mini": (1.10, 4.40),
+}
+WEB_SEARCH_CALL_USD = 0.025   # per web_search tool call, on top of tokens
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, *, kind: str = "chat") -> float:
+    prefix = max((p for p in MODEL_PRICES if model.startswith(p)), key=len, default=None)
+    if prefix is None:
+        return 0.0
+    prompt_price, completion_price = MODEL_PRICES[prefix]
+    cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+    if kind == "web_search":
+        cost += WEB_SEARCH_CALL_USD
+    return round(cost, 6)
+
+class TelemetryRecorder:
+    FLUSH_EVERY_S = 2.0
+    MAX_BUFFER = 200
+
+    def __init__(self, eng: Engine = default_engine):
+        self.engine = eng
+        self.enabled = settings.llm_telemetry_enabled
+        self.dropped = 0
+        self._buffer: list[dict] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def record(self, *, service: str, kind: str, schema_name: str = "", model: str = "",
+               cache_status: str = "off", latency_s: float = 0.0, usage: dict | None = None,
+               retries: int = 0, error: str | None = None):
+        if not self.enabled:
+            return
+        usage = usage or {}
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        row = {
+            "created_at": datetime.utcnow(),
+            "service": service,
+            "kind": kind,
+            "schema_name": schema_name,
+            "model": model,
+            "cache_status": cache_status,
+            "latency_ms": round(latency_s * 1000, 2),
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            # Cache hits and demo responses cost nothing.
+            "cost_usd": estimate_cost(model, prompt, completion, kind=kind) if cache_status != "hit" and usage else 0.0,
+            "retries": retries,
+            "error": error[:500] if error else None,
+        }
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.MAX_BUFFER
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-telemetry", daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.FLUSH_EVERY_S)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered records now; returns the number written."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(LLMCall), rows)
+        except Exception:
+            self.dropped += len(rows)
+            return 0
+        return len(rows)
+
+recorder = TelemetryRecorder()
+atexit.register(recorder.flush)
+
+class CallTimer:
+    """Context manager measuring one call; ``cache_status`` / ``usage`` / ``retries`` are set inside the block."""
+
+    def __init__(self, rec: TelemetryRecorder | None, **tags):
+        self.recorder = rec
+        self.tags = tags
+        self.cache_status = "off"
+        self.usage: dict = {}
+        self.retries = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.recorder is not None:
+            self.recorder.record(
+                **self.tags, cache_status=self.cache_status, latency_s=time.perf_counter() - self.started,
+                usage=self.usage, retries=self.retries, error=f"{exc_type.__name__}: {exc}" if exc else None,
+            )
+        return False
+
+_PERCENTILE_SQL = text("""
+WITH calls AS (
+    SELECT service, latency_ms, cache_status, prompt_tokens, completion_tokens, cost_usd, retries, error,
+           ROW_NUMBER() OVER (PARTITION BY service ORDER BY latency_ms) AS rn,
+           COUNT(*) OVER (PARTITION BY service) AS n
+    FROM llm_calls
+    WHERE created_at >= :since
+)
+SELECT service,
+       COUNT(*) AS calls,
+       SUM(cache_status = 'hit') AS cache_hits,
+       SUM(cache_status = 'merged') AS merged,
+       MAX(CASE WHEN rn = MAX(1, CAST(0.50 * n + 0.999999 AS INTEGER)) THEN latency_ms END) AS p50_ms,
+       MAX(CASE WHEN rn = MAX(1, CAST(0.95 * n + 0.999999 AS INTEGER)) THEN latency_ms END) AS p95_ms,
+       SUM(prompt_tokens) AS prompt_tokens,
+       SUM(completion_tokens) AS completion_tokens,
+       SUM(cost_usd) AS cost_usd,
+       SUM(retries) AS retries,
+       SUM(error IS NOT NULL) AS errors
+FROM calls
+GROUP BY service
+ORDER BY cost_usd DESC, calls DESC
+""").bindparams(bindparam("since", type_=DateTime))
+
+def usage_summary(*, since: datetime | None = None, hours: float = 24 * 7,
+                  eng: Engine = default_engine) -> list[dict]:
+    """Per-service call counts, cache hit rate, single-flight merges, p50/p95 latency (nearest rank), tokens, cost and errors."""
+    recorder.flush()
+    since = since or datetime.utcnow() - timedelta(hours=hours)
+    with eng.connect() as conn:
+        rows = conn.execute(_PERCENTILE_SQL, {"since": since}).mappings().all()
+    return [
+        {
+            **row,
+            "cache_hit_rate": round(row["cache_hits"] / row["calls"], 3) if row["calls"] else 0.0,
+            "cost_usd": round(row["cost_usd"] or 0.0, 4),
+        }
+        for row in rows
+    ]
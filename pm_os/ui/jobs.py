@@ -0,0 +1,84 @@
+"""
+Streamlit helpers for background jobs (see pm_os.jobs).
+
+A page submits a job under a session key, then calls ``poll_job`` with that
+key on every run. While the job is active a fragment re-renders its
+progress (and any partial result) every second without rerunning the
+page. Once the job finishes the page reruns and ``poll_job`` returns the
+finished job exactly once. Only the job id lives in session state, so a
+rerun or a reloaded page picks the job up where it is.
+"""
+import os
+from contextlib import suppress
+from typing import Callable
+import streamlit as st
+from pm_os import jobs
+from pm_os.services.uploads import save_upload
+
+JOB_POLL_S = 1.0
+
+def _tracked() -> dict[str, int]:
+    return st.session_state.setdefault("jobs", {})
+
+def submit_job(key: str, kind: str, payload: dict, *, priority: int = 0) -> int:
+    """Queue (or join an identical) ``kind`` job and track it under ``key``."""
+    job_id = jobs.submit(kind, payload, priority=priority)
+    _tracked()[key] = job_id
+    return job_id
+
+def submit_parse_upload(key: str, uploaded_file, kind: str, *, priority: int = 0) -> int:
+    """Save ``uploaded_file`` to the spool directory and queue a ``documents.parse`` job for it."""
+    upload = save_upload(uploaded_file)
+    job_id = submit_job(key, "documents.parse",
+                        {"path": upload.path, "digest": upload.digest, "kind": kind, "name": upload.name},
+                        priority=priority)
+    job = jobs.get(job_id)
+    if job and job["status"] in jobs.FINISHED:
+        # Joined an earlier parse of the same file; its job no longer needs the copy.
+        with suppress(FileNotFoundError):
+            os.remove(upload.path)
+    return job_id
+
+def job_active(key: str) -> bool:
+    return key in _tracked()
+
+@st.fragment(run_every=JOB_POLL_S)
+def _job_progress(job_id: int, label: str, render_partial: Callable[[dict], None] | None):
+    job = jobs.get(job_id)
+    if job is None or job["status"] in jobs.FINISHED:
+        st.rerun()
+    if job["status"] == "queued":
+        retry = f" (retrying after: {job['error']})" if job["error"] else ""
+        st.progress(0.0, text=f"{label}: waiting for a worker{retry}")
+    else:
+        st.progress(job["progress"], text=f"{label}: {job['note'] or 'running'}")
+    if render_partial is not None and job["partial"]:
+        render_partial(job["partial"])
+    if st.button("Cancel", key=f"cancel_job_{job_id}"):
+        jobs.cancel(job_id)
+        st.rerun()
+
+def poll_job(key: str, *, label: str = "Working",
+             render_partial: Callable[[dict], None] | None = None) -> dict | None:
+    """
+    Show progress for the job tracked under ``key``. Returns the job dict
+    (with ``result``) the first time it is seen finished successfully, and
+    None otherwise; failed and cancelled jobs are reported and forgotten.
+    """
+    job_id = _tracked().get(key)
+    if job_id is None:
+        return None
+    job = jobs.get(job_id)
+    if job is None or job["status"] in jobs.FINISHED:
+        _tracked().pop(key, None)
+        if job is None:
+            return None
+        if job["status"] == "failed":
+            st.error(f"{label} failed after {job['attempts']} attempt(s): {job['error']}")
+            return None
+        if job["status"] == "cancelled":
+            st.info(f"{label} was cancelled.")
+            return None
+        return job
+    _job_progress(job_id, label, render_partial)
+    return None
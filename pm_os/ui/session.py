@@ -0,0 +1,53 @@
+"""
+Per-session memory reporting.
+
+Uploaded documents are kept in session state as digests pointing at the
+shared document store (see document_store.load_text); this panel shows
+what each session actually holds, so regressions to storing full text or
+file bytes per session are easy to spot.
+"""
+import os
+import sys
+import streamlit as st
+
+def deep_sizeof(obj, _seen: set[int] | None = None) -> int:
+    """Approximate bytes held by ``obj`` and everything reachable from its containers."""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+def session_memory() -> dict[str, int]:
+    """Approximate bytes per session_state key, largest first."""
+    sizes = {str(k): deep_sizeof(v) for k, v in st.session_state.items()}
+    return dict(sorted(sizes.items(), key=lambda kv: kv[1], reverse=True))
+
+def process_rss() -> int | None:
+    """Resident set size of this server process in bytes (Linux), else None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.2f} MB"
+
+def render_session_memory():
+    """Sidebar expander with this session's state size and the server's RSS."""
+    sizes = session_memory()
+    with st.sidebar.expander("Session memory"):
+        st.metric("This session", _mb(sum(sizes.values())))
+        for key, size in list(sizes.items())[:5]:
+            st.caption(f"{key}: {_mb(size)}")
+        rss = process_rss()
+        if rss is not None:
+            st.caption(f"Server process (all sessions): {_mb(rss)}")
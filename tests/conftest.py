@@ -0,0 +1,27 @@
+"""Shared fixtures: a throwaway SQLite database per test."""
+import pytest
+from sqlalchemy import insert
+from pm_os.db import create_db_engine
+from pm_os.migrations import run_migrations
+from pm_os.models import Company, Deal
+
+@pytest.fixture
+def blank_engine(tmp_path):
+    """Engine on an empty database file, before any migration."""
+    eng = create_db_engine(str(tmp_path / "pm.sqlite"))
+    yield eng
+    eng.dispose()
+
+@pytest.fixture
+def engine(blank_engine):
+    """Engine on a database migrated to the latest version."""
+    run_migrations(blank_engine)
+    return blank_engine
+
+@pytest.fixture
+def deal(engine) -> int:
+    """Id of a company's deal for tests that insert documents."""
+    with engine.begin() as conn:
+        conn.execute(insert(Company).values(id=1, name="GridFlex", sector="Energy", tags=""))
+        conn.execute(insert(Deal).values(id=1, company_id=1, deal_type="credit", stage="ic"))
+    return 1
@@ -0,0 +1,14 @@
+"""Bulk ingestion: document-type detection."""
+import pytest
+from pm_os.ingest import detect_kind
+
+@pytest.mark.parametrize("text, filename, expected", [
+    ("The Borrower irrevocably agrees, to navigate the decimal rounding, that the Lender may act.",
+     "facility.pdf", ("credit_agreement", "credit_agreement")),
+    ("First Amendment to Credit Agreement among the Borrower and the Lenders.", "a.pdf",
+     ("credit_agreement", "amendment")),
+    ("NAV per unit rose and the fund IRR reached 18%.", "q3.pdf", ("portfolio_report", "portfolio_report")),
+    ("Company overview and investment highlights.", "acme_cim.pdf", ("deal_document", "deal_document")),
+])
+def test_detect_kind_matches_whole_words(text, filename, expected):
+    assert detect_kind(text, filename) == expected
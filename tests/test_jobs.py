@@ -0,0 +1,37 @@
+"""Job queue: jobs run and report progress on the queue's own database, with or without worker processes."""
+import time
+from pm_os import jobs
+
+@jobs.job_handler("tests.cpu_bound", pool="process")
+def _square(payload: dict, ctx: jobs.JobContext) -> dict:
+    return {"square": payload["n"] ** 2}
+
+@jobs.job_handler("tests.progress")
+def _halves(payload: dict, ctx: jobs.JobContext) -> dict:
+    ctx.progress(0.5, "halfway", partial={"seen": 1})
+    return {"seen": 2}
+
+def _run(engine, kind: str, payload: dict) -> dict:
+    workers = jobs.JobQueue(threads=1, processes=0, eng=engine)
+    workers.start()
+    try:
+        job_id = jobs.submit(kind, payload, eng=engine)
+        workers.wake()
+        deadline = time.monotonic() + 10
+        while jobs.get(job_id, eng=engine)["status"] not in jobs.FINISHED and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        workers.stop()
+    return jobs.get(job_id, eng=engine)
+
+def test_process_kind_runs_on_threads_without_processes(engine):
+    job = _run(engine, "tests.cpu_bound", {"n": 7})
+    assert job["status"] == "done"
+    assert job["result"] == {"square": 49}
+
+def test_progress_is_written_to_the_queue_database(engine):
+    job = _run(engine, "tests.progress", {})
+    assert job["status"] == "done", job["error"]
+    assert job["note"] == "halfway"
+    assert job["partial"] == {"seen": 1}
+    assert job["result"] == {"seen": 2}
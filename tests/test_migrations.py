@@ -0,0 +1,79 @@
+"""Schema migrations: fresh and in-place upgrades, and the access-path indexes the queries rely on."""
+from sqlalchemy import inspect
+from pm_os.migrations import MIGRATIONS, current_version, run_migrations
+from pm_os.revisions import table_revision
+
+# Schema of a pm_os.sqlite created before migrations existed (no deal foreign keys, no indexes).
+BASELINE_DDL = """
+CREATE TABLE companies (id INTEGER NOT NULL, name VARCHAR(200) NOT NULL, sector VARCHAR(100) NOT NULL,
+    tags VARCHAR(500) NOT NULL, PRIMARY KEY (id));
+CREATE TABLE deals (id INTEGER NOT NULL, company_id INTEGER NOT NULL, deal_type VARCHAR(20) NOT NULL,
+    stage VARCHAR(50) NOT NULL, thesis_tags VARCHAR(500) NOT NULL, score FLOAT NOT NULL, owner VARCHAR(80) NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(company_id) REFERENCES companies (id));
+CREATE TABLE emails (id INTEGER NOT NULL, sender VARCHAR(200) NOT NULL, subject VARCHAR(300) NOT NULL,
+    body TEXT NOT NULL, received_at DATETIME NOT NULL, tags VARCHAR(500) NOT NULL, linked_deal_id INTEGER,
+    linked_lp_id INTEGER, PRIMARY KEY (id));
+CREATE TABLE market_snippets (id INTEGER NOT NULL, source VARCHAR(100) NOT NULL, title VARCHAR(300) NOT NULL,
+    text TEXT NOT NULL, published_at DATETIME NOT NULL, tags VARCHAR(500) NOT NULL, PRIMARY KEY (id));
+CREATE TABLE documents (id INTEGER NOT NULL, deal_id INTEGER NOT NULL, doc_type VARCHAR(60) NOT NULL,
+    version VARCHAR(40) NOT NULL, text TEXT NOT NULL, PRIMARY KEY (id));
+CREATE TABLE covenants (id INTEGER NOT NULL, deal_id INTEGER NOT NULL, covenant_type VARCHAR(80) NOT NULL,
+    threshold VARCHAR(80) NOT NULL, test_frequency VARCHAR(40) NOT NULL, next_due_date VARCHAR(20) NOT NULL,
+    source_note VARCHAR(200) NOT NULL, PRIMARY KEY (id));
+INSERT INTO companies VALUES (1, 'GridFlex', 'Energy', 'grid, storage');
+INSERT INTO deals VALUES (1, 1, 'credit', 'Diligence', 'grid', 80.0, 'AZ');
+INSERT INTO documents VALUES (1, 1, 'credit_agreement', 'v1', 'Section 1. Leverage Ratio not to exceed 4.0x.');
+INSERT INTO covenants VALUES (1, 1, 'Debt/EBITDA', '<= 4.0x', 'Quarterly', '2025-03-31', '');
+INSERT INTO emails VALUES (1, 'a@b.com', 'Update', 'Body', '2025-01-02 09:00:00', 'grid', 1, NULL);
+INSERT INTO market_snippets VALUES (1, 'Wire', 'Power prices', 'Text', '2025-01-02 09:00:00', 'power');
+"""
+
+PLANS = {
+    "ix_documents_deal_id_doc_type_version": "SELECT id, version FROM documents WHERE deal_id = 1",
+    "ix_covenants_deal_id_next_due_date": "SELECT * FROM covenants WHERE deal_id = 1 ORDER BY next_due_date",
+    "ix_emails_received_at": "SELECT id FROM emails WHERE received_at >= '2025-01-01' ORDER BY received_at DESC",
+    "ix_emails_linked_deal_id_received_at":
+        "SELECT id FROM emails WHERE linked_deal_id = 1 ORDER BY received_at DESC",
+    "ix_market_snippets_published_at":
+        "SELECT id FROM market_snippets WHERE published_at >= '2025-01-01' ORDER BY published_at DESC",
+}
+
+def _plan(conn, sql: str) -> str:
+    return " | ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+def _assert_indexed(eng):
+    with eng.connect() as conn:
+        for index, sql in PLANS.items():
+            assert index in _plan(conn, sql), f"{index} not used by: {sql}"
+
+def test_fresh_database_migrates_to_latest(blank_engine):
+    assert run_migrations(blank_engine) == [version for version, _, _ in MIGRATIONS]
+    with blank_engine.connect() as conn:
+        assert current_version(conn) == MIGRATIONS[-1][0]
+    assert run_migrations(blank_engine) == []
+    _assert_indexed(blank_engine)
+
+def test_baseline_database_upgrades_in_place(blank_engine):
+    with blank_engine.connect() as conn:
+        conn.connection.executescript(BASELINE_DDL)
+    run_migrations(blank_engine)
+    with blank_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM documents").scalar() == 1
+        assert conn.exec_driver_sql("SELECT threshold FROM covenants").scalar() == "<= 4.0x"
+        assert conn.exec_driver_sql("PRAGMA foreign_key_check").all() == []
+        assert any(fk["referred_table"] == "deals" for fk in inspect(conn).get_foreign_keys("documents"))
+        assert conn.exec_driver_sql(
+            "SELECT t.name FROM tags t JOIN email_tags et ON et.tag_id = t.id").scalars().all() == ["grid"]
+    _assert_indexed(blank_engine)
+
+def test_content_revisions_follow_edits(engine):
+    revisions = []
+    for sql in ("INSERT INTO companies VALUES (1, 'GridFlex', 'Energy', '')",
+                "INSERT INTO deals VALUES (1, 1, 'credit', 'ic', '', 0, '')",
+                "INSERT INTO documents (id, deal_id, doc_type, version, text) VALUES (1, 1, 'cim', 'v1', 'a')",
+                "UPDATE documents SET text = 'b' WHERE id = 1",
+                "DELETE FROM documents WHERE id = 1"):
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql)
+            revisions.append(table_revision(conn, "documents"))
+    assert revisions == [0, 0, 1, 2, 3]
@@ -0,0 +1,20 @@
+"""Near-duplicates: MinHash signatures live in their own cache and round-trip exactly."""
+import numpy as np
+from pm_os.cache import SQLiteCache
+from pm_os.services import near_duplicates
+
+BASE = ("The Borrower shall maintain a Leverage Ratio of not more than 5.00 to 1.00 as of the last day "
+        "of each fiscal quarter, tested on a trailing four quarter basis commencing with the first full quarter. ")
+
+def test_signatures_cached_in_own_store(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / "minhash.sqlite"))
+    monkeypatch.setattr(near_duplicates, "signature_cache", cache)
+    texts = [BASE * 3, BASE * 3 + "Signed.", "Solar interconnection queue update for the grid operator."]
+    first = near_duplicates.cached_minhashes(texts)
+    assert cache.stats()["entries"] == 3
+    again = near_duplicates.cached_minhashes(texts)
+    assert np.array_equal(first, again)
+    assert np.array_equal(first[2], near_duplicates.minhash(texts[2]))
+    assert cache.stats()["hits"] == 3
+    clusters = near_duplicates.cluster_texts(texts, threshold=0.9)
+    assert [c["members"] for c in clusters] == [[0, 1]]
@@ -0,0 +1,10 @@
+"""LLM rate limiter: a call that times out waiting for tokens does not use up a request slot."""
+import pytest
+from pm_os.llm.provider import RateLimiter
+
+def test_token_timeout_refunds_request():
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=100)
+    limiter.acquire(100, timeout=0.05)
+    with pytest.raises(TimeoutError):
+        limiter.acquire(100, timeout=0.05)
+    assert limiter.requests.tokens >= 1.0
@@ -0,0 +1,40 @@
+"""Document passages follow edits and deletes of their Document rows; ad-hoc passages are capped."""
+from dataclasses import replace
+import pytest
+from sqlalchemy import delete, insert, select, update
+from pm_os.models import DocChunk, Document
+from pm_os.services import retrieval
+from pm_os.services.retrieval import document_source, index_documents, index_source, text_hash, text_source
+
+@pytest.fixture
+def conn(engine, deal):
+    with engine.begin() as conn:
+        conn.execute(insert(Document).values(id=1, deal_id=deal, doc_type="credit_agreement", version="v1",
+                                             text="Section 1. Leverage Ratio not to exceed 4.0x."))
+        yield conn
+
+def _hashes(conn) -> set[str]:
+    return set(conn.execute(select(DocChunk.source_hash).where(DocChunk.source == document_source(1))).scalars())
+
+def test_edited_document_is_rechunked(conn):
+    assert index_documents(conn=conn) > 0
+    assert index_documents(conn=conn) == 0
+    edited = "Section 1. Leverage Ratio not to exceed 4.5x."
+    conn.execute(update(Document).where(Document.id == 1).values(text=edited))
+    assert _hashes(conn) == set()
+    assert index_documents(conn=conn) > 0
+    assert _hashes(conn) == {text_hash(edited)}
+
+def test_deleted_document_leaves_no_passages(conn):
+    index_documents(conn=conn)
+    conn.execute(delete(Document).where(Document.id == 1))
+    assert _hashes(conn) == set()
+
+def test_only_recent_adhoc_sources_are_kept(conn, monkeypatch):
+    monkeypatch.setattr(retrieval, "settings", replace(retrieval.settings, qa_adhoc_sources=2))
+    index_documents(conn=conn)
+    texts = [f"Upload {n}: the Minimum Liquidity covenant is {n} million dollars." for n in range(4)]
+    for t in texts:
+        index_source(text_source(t), t, conn=conn)
+    sources = set(conn.execute(select(DocChunk.source).distinct()).scalars())
+    assert sources == {document_source(1), text_source(texts[2]), text_source(texts[3])}
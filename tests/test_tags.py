@@ -0,0 +1,25 @@
+"""Tag triggers mirror the comma-joined columns into the link tables for any tag text."""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from pm_os.models import Email, Tag, email_tags
+
+def _tags(session: Session, email_id: int) -> set[str]:
+    return set(session.scalars(select(Tag.name).join(email_tags, email_tags.c.tag_id == Tag.id)
+                               .where(email_tags.c.email_id == email_id)))
+
+@pytest.mark.parametrize("tags, expected", [
+    ("Grid, Storage,grid", {"grid", "storage"}),
+    ('say "hi", back\\slash', {'say "hi"', "back\\slash"}),
+    ("a\tb, c\nd, \x01e", {"a\tb", "c\nd", "\x01e"}),
+    ("", set()),
+])
+def test_tags_are_linked_on_insert_and_update(engine, tags, expected):
+    with Session(engine) as session:
+        email = Email(sender="a@b.com", subject="s", body="b", tags=tags)
+        session.add(email)
+        session.commit()
+        assert _tags(session, email.id) == expected
+        email.tags = "power"
+        session.commit()
+        assert _tags(session, email.id) == {"power"}
@@ -0,0 +1,16 @@
+"""Term extraction: sections come from the clause's own citation, and amending text is not a heading."""
+from pm_os.services.terms import extract_terms
+
+AMENDMENT = ("AMENDMENTS: Section 4 is amended to add requirement for weekly AR/AP aging reports. "
+             "New Section 3(d) is added: Minimum Project DSCR of 1.15x measured quarterly. "
+             "PRICING: applicable margin is increased by 25 basis points to S+575.")
+
+def test_cited_section_beats_heading():
+    sections = {(t.label, t.kind): t.section for t in extract_terms(AMENDMENT)}
+    assert sections[("DSCR", "ratio")] == "3(d)"
+    assert sections[("DSCR", "frequency")] == "3(d)"
+    assert sections[("AR/AP Aging Reports", "frequency")] == "4"
+
+def test_amending_clause_is_not_a_heading():
+    sections = {(t.label, t.kind): t.section for t in extract_terms(AMENDMENT)}
+    assert sections[("Applicable Margin", "margin")] == ""
@@ -0,0 +1,68 @@
+"""Vector index: updates follow edits and deletes, build once under concurrency, and search never writes."""
+import threading
+import numpy as np
+import pytest
+from sqlalchemy import delete, insert, update
+from pm_os.models import Document
+from pm_os.services import vectors
+
+TEXTS = {
+    1: "Leverage ratio of Debt to EBITDA shall not exceed 5.0x tested quarterly under the credit agreement",
+    2: "Solar power purchase agreements with utilities across the grid interconnection queue",
+    3: "Electric vehicle charging network utilization and fleet depot buildout",
+}
+
+@pytest.fixture
+def unbuilt(tmp_path, monkeypatch, engine, deal):
+    monkeypatch.setattr(vectors, "engine", engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Document), [{"id": i, "deal_id": deal, "doc_type": "cim", "version": "v1", "text": t}
+                                        for i, t in TEXTS.items()])
+    return vectors.VectorIndex(str(tmp_path / "vectors")), engine
+
+@pytest.fixture
+def index(unbuilt):
+    unbuilt[0].build(sample=10)
+    return unbuilt
+
+def _live(idx) -> dict[int, np.ndarray]:
+    """Document id -> vector for every row search can return."""
+    idx.stats()
+    alive = np.flatnonzero(~idx._dead)
+    return {vectors.unpack_key(idx._keys[i])[1]: np.asarray(idx._vectors[i]) for i in alive}
+
+def test_update_reembeds_edited_and_drops_deleted_rows(index):
+    idx, eng = index
+    assert sorted(_live(idx)) == [1, 2, 3]
+    with eng.begin() as conn:
+        conn.execute(update(Document).where(Document.id == 2).values(text=TEXTS[1]))
+        conn.execute(update(Document).where(Document.id == 1).values(text=TEXTS[3]))
+        conn.execute(delete(Document).where(Document.id == 3))
+    assert idx.update() == 2
+    live = _live(idx)
+    assert sorted(live) == [1, 2]
+    assert np.allclose(live[2], idx.embed([TEXTS[1]])[0], atol=1e-5)
+    assert np.allclose(live[1], idx.embed([TEXTS[3]])[0], atol=1e-5)
+    hits = [vectors.unpack_key(key)[1] for key, _ in idx.top_k(idx.embed([TEXTS[1]]), k=5)[0]]
+    assert sorted(hits) == [1, 2]
+    assert idx.update() == 0
+    assert idx.stats()["dead"] == 3
+
+def test_concurrent_first_updates_build_once(unbuilt, monkeypatch):
+    idx, _ = unbuilt
+    builds = []
+    build = idx._build
+    monkeypatch.setattr(idx, "_build", lambda *args: builds.append(1) or build(*args))
+    threads = [threading.Thread(target=idx.update) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(builds) == 1
+    assert idx.count == 3
+
+def test_search_reads_without_building(unbuilt, monkeypatch):
+    idx, _ = unbuilt
+    monkeypatch.setattr(vectors, "vector_index", idx)
+    assert vectors.semantic_search("leverage") == []
+    assert idx.count == 0